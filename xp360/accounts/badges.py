@@ -3,71 +3,95 @@ Sistema de Badges Automáticas
 Verifica e concede badges quando o usuário atinge determinados marcos
 """
 
-from .models import Badge, BadgeUsuario
+from django.db import transaction
+
+from .models import BadgeUsuario
+from core.catalogo import badges_por_tipo
+from core.metricas import BADGES_CONCEDIDAS
 from core.models import MissaoAluno
 
 
-def verificar_e_conceder_badges(usuario):
+# Tipos de badge que cada evento pode alterar.
+# Ex.: concluir uma tarefa não muda PRECISAO e errar uma questão não muda NIVEL.
+TIPOS_BADGE = ('MISSOES', 'STREAK', 'NIVEL', 'PRECISAO')
+
+TIPOS_POR_EVENTO = {
+    'TAREFA_CONCLUIDA': ('MISSOES', 'STREAK', 'NIVEL'),
+    'QUESTAO_CERTA': ('MISSOES', 'STREAK', 'NIVEL', 'PRECISAO'),
+    'QUESTAO_ERRADA': ('MISSOES',),
+}
+
+
+def catalogo_badges():
+    """
+    Retorna {tipo: [badges em ordem de condicao_valor]} do catálogo em cache
+    (core.catalogo), sem consulta enquanto nenhuma Badge mudar
+    """
+    return badges_por_tipo()
+
+
+# ==========================================
+# AVALIAÇÃO
+# ==========================================
+
+# Como obter o valor atual do aluno para cada tipo de badge
+# (todos são contadores do Usuario, sem consulta extra)
+METRICAS = {
+    'MISSOES': lambda usuario: usuario.total_concluidas,
+    'STREAK': lambda usuario: usuario.streak_atual,
+    'NIVEL': lambda usuario: usuario.nivel,
+    'PRECISAO': lambda usuario: usuario.acertos_seguidos,
+}
+
+
+def verificar_e_conceder_badges(usuario, evento=None):
     """
-    Verifica todas as condições de badges e concede as que o usuário merece
+    Verifica as condições de badges e concede as que o usuário merece.
+    Com `evento` (chave de TIPOS_POR_EVENTO) só avalia os tipos que ele pode alterar.
     Retorna lista de badges recém conquistadas (para notificações)
     """
-    badges_novas = []
-    
-    # 1. BADGES DE MISSÕES
-    total_missoes = MissaoAluno.objects.filter(aluno=usuario, concluida=True).count()
-    badges_missoes = Badge.objects.filter(tipo='MISSOES', condicao_valor__lte=total_missoes)
-    
-    for badge in badges_missoes:
-        badge_conquistada, created = BadgeUsuario.objects.get_or_create(
-            usuario=usuario,
-            badge=badge
-        )
-        if created:
-            badges_novas.append(badge)
-    
-    # 2. BADGES DE STREAK
-    streak_atual = usuario.streak_atual
-    badges_streak = Badge.objects.filter(tipo='STREAK', condicao_valor__lte=streak_atual)
-    
-    for badge in badges_streak:
-        badge_conquistada, created = BadgeUsuario.objects.get_or_create(
-            usuario=usuario,
-            badge=badge
-        )
-        if created:
-            badges_novas.append(badge)
-    
-    # 3. BADGES DE NÍVEL
-    nivel_atual = usuario.nivel
-    badges_nivel = Badge.objects.filter(tipo='NIVEL', condicao_valor__lte=nivel_atual)
-    
-    for badge in badges_nivel:
-        badge_conquistada, created = BadgeUsuario.objects.get_or_create(
-            usuario=usuario,
-            badge=badge
-        )
-        if created:
-            badges_novas.append(badge)
-    
-    # 4. BADGES DE PRECISÃO (Questões corretas seguidas)
-    acertos_seguidos = calcular_acertos_seguidos(usuario)
-    badges_precisao = Badge.objects.filter(tipo='PRECISAO', condicao_valor__lte=acertos_seguidos)
-    
-    for badge in badges_precisao:
-        badge_conquistada, created = BadgeUsuario.objects.get_or_create(
+    tipos = TIPOS_POR_EVENTO.get(evento, TIPOS_BADGE)
+    catalogo = catalogo_badges()
+
+    candidatas = {tipo: catalogo[tipo] for tipo in tipos if catalogo.get(tipo)}
+    if not candidatas:
+        return []
+
+    # Uma consulta para saber o que o aluno já tem
+    ja_conquistadas = set(
+        BadgeUsuario.objects.filter(
             usuario=usuario,
-            badge=badge
+            badge__tipo__in=list(candidatas)
+        ).values_list('badge_id', flat=True)
+    )
+
+    badges_novas = []
+    for tipo, badges in candidatas.items():
+        pendentes = [badge for badge in badges if badge.pk not in ja_conquistadas]
+        if not pendentes:
+            continue  # Nada a ganhar: nem calcula a métrica
+
+        valor = METRICAS[tipo](usuario)
+        badges_novas.extend(badge for badge in pendentes if badge.condicao_valor <= valor)
+
+    if badges_novas:
+        BadgeUsuario.objects.bulk_create(
+            [BadgeUsuario(usuario=usuario, badge=badge) for badge in badges_novas],
+            ignore_conflicts=True,
         )
-        if created:
-            badges_novas.append(badge)
-    
+
+        def contar():
+            for badge in badges_novas:
+                BADGES_CONCEDIDAS.inc(tipo=badge.tipo)
+        transaction.on_commit(contar)
+
     return badges_novas
 
 
 def calcular_acertos_seguidos(usuario):
     """
-    Calcula quantas questões o usuário acertou seguidas
+    Calcula quantas questões o usuário acertou seguidas a partir do histórico.
+    No dia a dia use usuario.acertos_seguidos, que já é mantido nas conclusões.
     """
     missoes_questao = MissaoAluno.objects.filter(
         aluno=usuario,
@@ -91,13 +115,22 @@ def get_progresso_badges(usuario):
     Retorna informações sobre progresso em badges não conquistadas
     Útil para mostrar "falta X para desbloquear"
     """
-    badges_conquistadas_ids = BadgeUsuario.objects.filter(
+    badges_conquistadas_ids = set(BadgeUsuario.objects.filter(
         usuario=usuario
-    ).values_list('badge_id', flat=True)
-    
-    badges_pendentes = Badge.objects.exclude(id__in=badges_conquistadas_ids)
+    ).values_list('badge_id', flat=True))
+    
+    badges_pendentes = sorted(
+        (
+            badge
+            for badges in catalogo_badges().values()
+            for badge in badges
+            if badge.pk not in badges_conquistadas_ids
+        ),
+        key=lambda badge: (badge.ordem, badge.condicao_valor)
+    )
     
     progresso = []
+    valores = {}
     
     for badge in badges_pendentes:
         info = {
@@ -107,14 +140,11 @@ def get_progresso_badges(usuario):
             'porcentagem': 0
         }
         
-        if badge.tipo == 'MISSOES':
-            info['atual'] = MissaoAluno.objects.filter(aluno=usuario, concluida=True).count()
-        elif badge.tipo == 'STREAK':
-            info['atual'] = usuario.streak_atual
-        elif badge.tipo == 'NIVEL':
-            info['atual'] = usuario.nivel
-        elif badge.tipo == 'PRECISAO':
-            info['atual'] = calcular_acertos_seguidos(usuario)
+        # Cada métrica é calculada uma única vez, mesmo com várias badges do mesmo tipo
+        if badge.tipo in METRICAS:
+            if badge.tipo not in valores:
+                valores[badge.tipo] = METRICAS[badge.tipo](usuario)
+            info['atual'] = valores[badge.tipo]
         
         if info['necessario'] > 0:
             info['porcentagem'] = min(100, int((info['atual'] / info['necessario']) * 100))
@@ -122,3 +152,21 @@ def get_progresso_badges(usuario):
         progresso.append(info)
     
     return progresso
+
+
+def coletar_badges_novas(usuario):
+    """
+    Retorna as badges concedidas que o aluno ainda não viu (nome e ícone)
+    e marca todas como visualizadas
+    """
+    novas = list(
+        BadgeUsuario.objects.filter(usuario=usuario, visualizada=False)
+        .select_related('badge')
+        .order_by('data_conquista')
+    )
+    if not novas:
+        return []
+
+    BadgeUsuario.objects.filter(pk__in=[b.pk for b in novas]).update(visualizada=True)
+
+    return [{'nome': b.badge.nome, 'icone': b.badge.icone} for b in novas]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:40
+
+from django.db import migrations
+
+
+def marcar_visualizadas(apps, schema_editor):
+    # As badges já conquistadas não devem aparecer como novas no dashboard
+    BadgeUsuario = apps.get_model('accounts', 'BadgeUsuario')
+    BadgeUsuario.objects.filter(visualizada=False).update(visualizada=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_usuario_aceitou_termos_usuario_data_aceite_termos_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(marcar_visualizadas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_marcar_badges_visualizadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='acertos_seguidos',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='melhor_acertos_seguidos',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='total_acertos',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='total_concluidas',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='total_questoes',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import DenseRank
+
+
+def preencher_ranking(apps, schema_editor):
+    # Mesmo cálculo de accounts.ranking.reconstruir_ranking, com os models históricos
+    Usuario = apps.get_model('accounts', 'Usuario')
+    Turma = apps.get_model('core', 'Turma')
+    PosicaoRanking = apps.get_model('accounts', 'PosicaoRanking')
+
+    escopos = [None] + list(Turma.objects.values_list('pk', flat=True))
+    for turma_id in escopos:
+        alunos = Usuario.objects.filter(tipo='ALUNO')
+        if turma_id is not None:
+            alunos = alunos.filter(turmas_aluno=turma_id)
+        linhas = alunos.annotate(
+            posicao=models.Window(DenseRank(), order_by=models.F('xp_total').desc()),
+        ).values_list('pk', 'xp_total', 'posicao')
+        PosicaoRanking.objects.bulk_create(
+            [
+                PosicaoRanking(turma_id=turma_id, aluno_id=aluno_id, xp=xp, posicao=posicao)
+                for aluno_id, xp, posicao in linhas
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_usuario_contadores'),
+        ('core', '0012_progressoturma'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PosicaoRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('xp', models.IntegerField(default=0)),
+                ('posicao', models.IntegerField()),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posicoes_ranking', to=settings.AUTH_USER_MODEL)),
+                ('turma', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.turma')),
+            ],
+            options={
+                'verbose_name': 'Posição no Ranking',
+                'verbose_name_plural': 'Posições no Ranking',
+                'indexes': [models.Index(fields=['turma', 'posicao', 'aluno'], name='accounts_ranking_posicao_idx')],
+                'constraints': [models.UniqueConstraint(fields=('turma', 'aluno'), name='accounts_ranking_turma_aluno_unico'), models.UniqueConstraint(condition=models.Q(('turma__isnull', True)), fields=('aluno',), name='accounts_ranking_geral_aluno_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_ranking, migrations.RunPython.noop),
+    ]
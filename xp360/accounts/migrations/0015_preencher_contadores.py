@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:10
+
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+LOTE = 2000
+
+
+def preencher_contadores(apps, schema_editor):
+    # Os contadores entraram zerados (0013): totais e sequências de acertos
+    # a partir do histórico de MissaoAluno, lidos pelas badges
+    Usuario = apps.get_model('accounts', 'Usuario')
+    MissaoAluno = apps.get_model('core', 'MissaoAluno')
+
+    questao = Q(missao__tipo='QUESTAO')
+    contadores = {
+        aluno_id: Usuario(
+            pk=aluno_id,
+            total_concluidas=total,
+            total_questoes=questoes,
+            total_acertos=acertos,
+            acertos_seguidos=0,
+            melhor_acertos_seguidos=0,
+        )
+        for aluno_id, total, questoes, acertos in (
+            MissaoAluno.objects.filter(concluida=True)
+            .values('aluno_id')
+            .annotate(
+                total=Count('id'),
+                questoes=Count('id', filter=questao),
+                acertos=Count('id', filter=questao & Q(acertou=True)),
+            )
+            .values_list('aluno_id', 'total', 'questoes', 'acertos')
+            .order_by('aluno_id')
+        )
+    }
+
+    respostas = (
+        MissaoAluno.objects.filter(questao, concluida=True)
+        .order_by('aluno_id', 'data_conclusao', 'id')
+        .values_list('aluno_id', 'acertou')
+    )
+    for aluno_id, acertou in respostas.iterator(chunk_size=LOTE):
+        usuario = contadores[aluno_id]
+        usuario.acertos_seguidos = usuario.acertos_seguidos + 1 if acertou else 0
+        usuario.melhor_acertos_seguidos = max(usuario.melhor_acertos_seguidos, usuario.acertos_seguidos)
+
+    Usuario.objects.bulk_update(
+        list(contadores.values()),
+        ['total_concluidas', 'total_questoes', 'total_acertos', 'acertos_seguidos', 'melhor_acertos_seguidos'],
+        batch_size=LOTE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_posicaoranking'),
+        ('core', '0015_indices_missao'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
@@ -30,6 +30,13 @@ class Usuario(AbstractUser):
     ultimo_acesso = models.DateField(null=True, blank=True)
     ultima_missao_concluida = models.DateField(null=True, blank=True)
     
+    # 🆕 Contadores mantidos nas conclusões (recompute_counters reconstrói)
+    acertos_seguidos = models.IntegerField(default=0)
+    melhor_acertos_seguidos = models.IntegerField(default=0)
+    total_concluidas = models.IntegerField(default=0)
+    total_questoes = models.IntegerField(default=0)
+    total_acertos = models.IntegerField(default=0)
+    
     # 🆕 LGPD - Termos e Consentimento
     aceitou_termos = models.BooleanField(default=False)
     data_aceite_termos = models.DateTimeField(null=True, blank=True)
@@ -50,7 +57,8 @@ class Usuario(AbstractUser):
         nivel_anterior = self.nivel
         self.nivel = (self.xp_total // 100) + 1
         
-        self.save()
+        # update_fields: não sobrescrever os contadores mantidos com F()
+        self.save(update_fields=['xp_total', 'nivel'])
         
         # Retorna True se subiu de nível
         return self.nivel > nivel_anterior
@@ -81,7 +89,7 @@ class Usuario(AbstractUser):
         if not self.ultimo_acesso:
             self.streak_atual = 1
             self.ultimo_acesso = hoje
-            self.save()
+            self.save(update_fields=['streak_atual', 'melhor_streak', 'ultimo_acesso'])
             return
         
         # Já acessou hoje - não faz nada
@@ -99,7 +107,7 @@ class Usuario(AbstractUser):
             self.streak_atual = 1
         
         self.ultimo_acesso = hoje
-        self.save()
+        self.save(update_fields=['streak_atual', 'melhor_streak', 'ultimo_acesso'])
 
     def atualizar_streak_missao(self):
         """Atualiza streak quando completa uma missão"""
@@ -109,7 +117,7 @@ class Usuario(AbstractUser):
         if not self.ultima_missao_concluida:
             self.streak_atual = 1
             self.ultima_missao_concluida = hoje
-            self.save()
+            self.save(update_fields=['streak_atual', 'melhor_streak', 'ultima_missao_concluida'])
             return
         
         # Já completou missão hoje
@@ -127,7 +135,7 @@ class Usuario(AbstractUser):
             self.streak_atual = 1
         
         self.ultima_missao_concluida = hoje
-        self.save()
+        self.save(update_fields=['streak_atual', 'melhor_streak', 'ultima_missao_concluida'])
 
     def get_titulo_streak(self):
         """Retorna título baseado no streak"""
@@ -185,3 +193,35 @@ class BadgeUsuario(models.Model):
     
     def __str__(self):
         return f"{self.usuario.username} - {self.badge.nome}"
+
+
+# ==========================================
+# 🆕 RANKING MATERIALIZADO
+# Uma linha por (turma, aluno) e uma por aluno no ranking geral (turma vazia).
+# Reconstruído na fila quando o XP ou as matrículas mudam (ver accounts/ranking.py)
+# ==========================================
+
+class PosicaoRanking(models.Model):
+    turma = models.ForeignKey('core.Turma', on_delete=models.CASCADE, null=True, blank=True)
+    aluno = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='posicoes_ranking')
+    xp = models.IntegerField(default=0)
+    posicao = models.IntegerField()  # DENSE_RANK por XP: empates têm a mesma posição
+    
+    class Meta:
+        verbose_name = "Posição no Ranking"
+        verbose_name_plural = "Posições no Ranking"
+        constraints = [
+            models.UniqueConstraint(fields=['turma', 'aluno'], name='accounts_ranking_turma_aluno_unico'),
+            models.UniqueConstraint(
+                fields=['aluno'],
+                condition=models.Q(turma__isnull=True),
+                name='accounts_ranking_geral_aluno_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['turma', 'posicao', 'aluno'], name='accounts_ranking_posicao_idx'),
+        ]
+    
+    def __str__(self):
+        escopo = self.turma.nome if self.turma_id else 'Geral'
+        return f"{escopo} - #{self.posicao} {self.aluno.username}"
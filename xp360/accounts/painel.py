@@ -0,0 +1,270 @@
+"""
+Dados dos dashboards do aluno e do professor em cache
+
+Tudo o que o dashboard mostra (nível, missões de hoje, gráfico de 7 dias,
+disciplinas, radar e acertos) depende só das MissaoAluno e dos contadores
+do próprio aluno. O resultado fica no cache do Django por aluno, junto com
+a versão com que foi calculado. A versão muda quando o aluno conclui uma
+missão ou recebe novas missões (painel_alterado).
+
+Quando a cópia em cache está desatualizada, só uma requisição recalcula
+(trava no cache); as outras recebem a cópia anterior enquanto isso
+(stale-while-revalidate), então vários refreshes ao mesmo tempo não
+repetem as consultas.
+
+O resumo do professor (alunos, missões e taxa de conclusão por turma) vem
+de uma consulta anotada e fica em cache por professor; a versão muda
+quando turmas, matrículas ou missões dele mudam (painel_professor_alterado).
+"""
+
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.estatisticas import xp_ultimos_dias, totais_questoes, progresso_disciplinas
+from core.metricas import CACHE
+from core.models import Missao, MissaoAluno
+
+
+# Depois disso a cópia é recalculada mesmo sem mudança de versão (ex.: missão editada)
+VALIDADE = 5 * 60  # segundos
+
+# Quanto tempo a cópia (e a versão) ficam no cache
+TEMPO_MAXIMO = 24 * 60 * 60
+
+# Tempo máximo da trava de recálculo, caso a requisição que recalcula caia
+TEMPO_TRAVA = 30
+
+
+def _chave_versao(aluno_id):
+    return f'xp360:painel:{aluno_id}:versao'
+
+
+def _chave_dados(aluno_id):
+    return f'xp360:painel:{aluno_id}:dados'
+
+
+def _chave_trava(aluno_id):
+    return f'xp360:painel:{aluno_id}:trava'
+
+
+def painel_alterado(*alunos_ids):
+    """Nova versão do dashboard dos alunos: a próxima leitura recalcula"""
+    cache.set_many(
+        {_chave_versao(aluno_id): uuid.uuid4().hex for aluno_id in alunos_ids},
+        timeout=TEMPO_MAXIMO,
+    )
+
+
+def calcular_painel(usuario):
+    """Dados do dashboard do aluno (só tipos serializáveis em JSON)"""
+    xp_total = usuario.xp_total
+    nivel = usuario.nivel
+
+    # Calcular XP necessário para próximo nível
+    xp_proximo = (nivel * 100) + 50
+    progresso_nivel = int((xp_total / xp_proximo) * 100) if xp_proximo > 0 else 0
+
+    # Missões de hoje
+    hoje = timezone.localdate()
+    missoes = [
+        {
+            'id': m.id,
+            'concluida': m.concluida,
+            'acertou': m.acertou,
+            'resposta_escolhida': m.resposta_escolhida,
+            'missao': {
+                'titulo': m.missao.titulo,
+                'xp': m.missao.xp,
+                'tipo': m.missao.tipo,
+                'data_criacao': m.missao.data_criacao,
+            },
+        }
+        for m in MissaoAluno.objects.filter(
+            aluno=usuario,
+            missao__data_criacao__date=hoje
+        ).select_related('missao')
+    ]
+
+    concluidas_hoje = sum(1 for m in missoes if m['concluida'])
+    total_hoje = len(missoes)
+    progresso_dia = int((concluidas_hoje / total_hoje) * 100) if total_hoje > 0 else 0
+
+    # === DADOS PARA GRÁFICOS ===
+
+    # 1. XP dos últimos 7 dias (consolidado diário, uma consulta)
+    ultimos_7_dias, xp_por_dia = xp_ultimos_dias(usuario, dias=7)
+
+    # 2. XP por disciplina (progresso por disciplina, uma consulta)
+    progresso = progresso_disciplinas(usuario)
+
+    disciplinas_stats = [
+        {
+            'nome': p.disciplina.nome,
+            'xp': p.xp,
+            'cor': p.disciplina.cor or '#667eea'
+        }
+        for p in progresso
+        if p.xp > 0
+    ]
+
+    # 3. Taxa de acerto (para gráfico de pizza)
+    total_questoes, acertos = totais_questoes(usuario)
+
+    # 4. Desempenho por disciplina (para gráfico radar), limitado a 6 para não poluir
+    com_missoes = [p for p in progresso if p.atribuidas > 0][:6]
+    desempenho_radar = {
+        'labels': [p.disciplina.nome[:15] for p in com_missoes],
+        'data': [p.percentual_concluido() for p in com_missoes],
+    }
+
+    return {
+        'data': hoje.isoformat(),
+        'xp_total': xp_total,
+        'nivel': nivel,
+        'streak_atual': usuario.streak_atual,
+        'melhor_streak': usuario.melhor_streak,
+        'xp_proximo': xp_proximo,
+        'progresso_nivel': progresso_nivel,
+        'missoes': missoes,
+        'concluidas_hoje': concluidas_hoje,
+        'total_hoje': total_hoje,
+        'progresso_dia': progresso_dia,
+        'pendentes': total_hoje - concluidas_hoje,
+        'grafico_dias': ultimos_7_dias,
+        'grafico_xp': xp_por_dia,
+        'disciplinas_stats': disciplinas_stats,
+        'acertos': acertos,
+        'erros': total_questoes - acertos,
+        'desempenho_radar': desempenho_radar,
+    }
+
+
+def painel_aluno(usuario):
+    """Dados do dashboard do aluno, do cache sempre que possível"""
+    versao = cache.get(_chave_versao(usuario.pk))
+    hoje = timezone.localdate().isoformat()
+
+    entrada = cache.get(_chave_dados(usuario.pk))
+    # A cópia de outro dia não serve nem como cópia antiga ("missões de hoje")
+    if entrada is not None and entrada['payload']['data'] != hoje:
+        entrada = None
+
+    if (
+        entrada is not None
+        and entrada['versao'] == versao
+        and time.time() - entrada['gerado_em'] < VALIDADE
+    ):
+        CACHE.inc(cache='painel_aluno', resultado='acerto')
+        return entrada['payload']
+
+    trava = _chave_trava(usuario.pk)
+    travou = cache.add(trava, 1, timeout=TEMPO_TRAVA)
+    if not travou and entrada is not None:
+        # Outra requisição já está recalculando: serve a cópia anterior
+        CACHE.inc(cache='painel_aluno', resultado='antiga')
+        return entrada['payload']
+
+    CACHE.inc(cache='painel_aluno', resultado='falha')
+
+    # Sem cópia nenhuma, calcula mesmo sem a trava
+    try:
+        payload = calcular_painel(usuario)
+        # Guarda com a versão lida antes do cálculo: se ela mudou no meio, a próxima leitura recalcula
+        cache.set(
+            _chave_dados(usuario.pk),
+            {'versao': versao, 'gerado_em': time.time(), 'payload': payload},
+            timeout=TEMPO_MAXIMO,
+        )
+    finally:
+        if travou:
+            cache.delete(trava)
+
+    return payload
+
+
+# ==========================================
+# PAINEL DO PROFESSOR
+# ==========================================
+
+def _chave_professor(professor_id, parte):
+    return f'xp360:painel_professor:{professor_id}:{parte}'
+
+
+def painel_professor_alterado(*professores_ids):
+    """Nova versão do resumo dos professores: a próxima leitura recalcula"""
+    cache.set_many(
+        {_chave_professor(professor_id, 'versao'): uuid.uuid4().hex for professor_id in professores_ids},
+        timeout=TEMPO_MAXIMO,
+    )
+
+
+def _contagem_por_turma(queryset, campo_turma):
+    """Subquery correlacionada com a contagem do queryset na turma (OuterRef('pk'))"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{campo_turma: OuterRef('pk')})
+            .order_by()
+            .values(campo_turma)
+            .annotate(total=Count('id'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def calcular_painel_professor(professor):
+    """
+    Resumo das turmas do professor em uma consulta: alunos, missões,
+    atribuições, conclusões e taxa de conclusão de cada turma
+    """
+    turmas = list(
+        professor.turmas_professor.annotate(
+            total_alunos=Count('alunos'),
+            total_missoes=_contagem_por_turma(Missao.objects.all(), 'turma'),
+            atribuidas=_contagem_por_turma(MissaoAluno.objects.all(), 'missao__turma'),
+            concluidas=_contagem_por_turma(MissaoAluno.objects.filter(concluida=True), 'missao__turma'),
+        ).values(
+            'id', 'nome', 'serie', 'ano_letivo',
+            'total_alunos', 'total_missoes', 'atribuidas', 'concluidas',
+        )
+    )
+
+    for turma in turmas:
+        turma['taxa_conclusao'] = (
+            int((turma['concluidas'] / turma['atribuidas']) * 100) if turma['atribuidas'] > 0 else 0
+        )
+
+    return {
+        'turmas': turmas,
+        'total_turmas': len(turmas),
+        'total_alunos': sum(turma['total_alunos'] for turma in turmas),
+        'total_missoes': sum(turma['total_missoes'] for turma in turmas),
+    }
+
+
+def painel_professor(professor):
+    """
+    Resumo das turmas do professor, do cache enquanto a versão não mudar.
+    Conclusões de missões não mudam a versão: a taxa de conclusão pode
+    ficar até VALIDADE segundos atrasada.
+    """
+    versao = cache.get(_chave_professor(professor.pk, 'versao'))
+
+    entrada = cache.get(_chave_professor(professor.pk, 'dados'))
+    if entrada is not None and entrada['versao'] == versao:
+        CACHE.inc(cache='painel_professor', resultado='acerto')
+        return entrada['payload']
+
+    CACHE.inc(cache='painel_professor', resultado='falha')
+    payload = calcular_painel_professor(professor)
+    cache.set(
+        _chave_professor(professor.pk, 'dados'),
+        {'versao': versao, 'payload': payload},
+        timeout=VALIDADE,
+    )
+    return payload
@@ -0,0 +1,163 @@
+"""
+Ranking materializado (tabela PosicaoRanking)
+
+As posições são calculadas com DENSE_RANK quando o XP ou as matrículas
+mudam, na fila de tarefas. O ranking geral passa por todos os alunos, então
+é reconstruído no máximo uma vez a cada ATRASO_RECALCULO_GERAL segundos. A página de ranking só faz buscas pelo índice
+(turma, posicao, aluno): o top N e os vizinhos de um aluno.
+
+Os rankings da semana/mês leem os baldes de core.models.XPPeriodo.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import DenseRank
+
+from .models import Usuario, PosicaoRanking
+
+
+# Espera antes de recalcular, para juntar várias mudanças de XP em uma reconstrução
+ATRASO_RECALCULO = 10  # segundos
+
+# O ranking geral custa O(todos os alunos): o job fica pendente (e absorve as
+# mudanças de XP da escola inteira) por mais tempo
+ATRASO_RECALCULO_GERAL = 5 * 60  # segundos
+
+TAMANHO_LOTE = 1000
+
+
+def reconstruir_ranking(turma_id=None):
+    """
+    Recalcula as posições de uma turma (ou do ranking geral, com turma_id=None).
+    Retorna quantos alunos entraram no ranking.
+    """
+    if turma_id is None:
+        alunos = Usuario.objects.filter(tipo='ALUNO')
+    else:
+        # Filtra pela tabela de matrícula de uma turma só: cada aluno aparece uma vez
+        alunos = Usuario.objects.filter(tipo='ALUNO', turmas_aluno=turma_id)
+
+    linhas = alunos.annotate(
+        posicao=Window(DenseRank(), order_by=F('xp_total').desc()),
+    ).values_list('pk', 'xp_total', 'posicao')
+
+    posicoes = [
+        PosicaoRanking(turma_id=turma_id, aluno_id=aluno_id, xp=xp, posicao=posicao)
+        for aluno_id, xp, posicao in linhas
+    ]
+
+    with transaction.atomic():
+        PosicaoRanking.objects.filter(turma_id=turma_id).delete()
+        # ignore_conflicts: outra reconstrução da mesma turma pode estar rodando
+        PosicaoRanking.objects.bulk_create(posicoes, batch_size=TAMANHO_LOTE, ignore_conflicts=True)
+
+    return len(posicoes)
+
+
+def agendar_recalculo(turmas_ids, geral=True):
+    """
+    Enfileira a reconstrução das turmas (e do ranking geral). Na fila
+    síncrona, que não espera o atraso, o ranking geral só é reconstruído
+    se a última reconstrução tiver mais de ATRASO_RECALCULO_GERAL segundos.
+    """
+    from core.fila import enfileirar, fila_sincrona
+
+    for turma_id in turmas_ids:
+        enfileirar(
+            'atualizar_ranking',
+            {'turma_id': turma_id},
+            chave=f'atualizar_ranking:turma:{turma_id}',
+            atraso=ATRASO_RECALCULO,
+        )
+
+    if not geral:
+        return
+    if fila_sincrona() and not cache.add('xp360:ranking:geral:recente', True, timeout=ATRASO_RECALCULO_GERAL):
+        return
+    enfileirar(
+        'atualizar_ranking',
+        {'turma_id': None},
+        chave='atualizar_ranking:geral',
+        atraso=ATRASO_RECALCULO_GERAL,
+    )
+
+
+def xp_alterado(usuario):
+    """Chamado quando o XP do aluno muda: recalcula as turmas dele e o ranking geral"""
+    turmas_ids = list(usuario.turmas_aluno.values_list('pk', flat=True))
+    agendar_recalculo(turmas_ids)
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+
+def top(turma_id=None, quantidade=10):
+    """As `quantidade` primeiras posições da turma (ou do ranking geral)"""
+    return list(
+        PosicaoRanking.objects.filter(turma_id=turma_id)
+        .select_related('aluno')
+        .order_by('posicao', 'aluno_id')[:quantidade]
+    )
+
+
+def ao_redor(usuario, turma_id=None, quantidade=5):
+    """
+    Retorna (posição do usuário, lista com até `quantidade` alunos acima,
+    o próprio usuário e até `quantidade` abaixo), ou (None, []) se ele
+    ainda não está no ranking.
+    """
+    minha = (
+        PosicaoRanking.objects.filter(turma_id=turma_id, aluno=usuario)
+        .select_related('aluno')
+        .first()
+    )
+    if minha is None:
+        return None, []
+
+    escopo = PosicaoRanking.objects.filter(turma_id=turma_id).select_related('aluno')
+
+    acima = escopo.filter(
+        Q(posicao__lt=minha.posicao) | Q(posicao=minha.posicao, aluno_id__lt=minha.aluno_id)
+    ).order_by('-posicao', '-aluno_id')[:quantidade]
+
+    abaixo = escopo.filter(
+        Q(posicao__gt=minha.posicao) | Q(posicao=minha.posicao, aluno_id__gt=minha.aluno_id)
+    ).order_by('posicao', 'aluno_id')[:quantidade]
+
+    return minha.posicao, list(reversed(acima)) + [minha] + list(abaixo)
+
+
+# ==========================================
+# RANKINGS POR PERÍODO (semana / mês, geral ou por disciplina)
+# ==========================================
+
+def _baldes(periodo, inicio, disciplina_id=None, turma_id=None):
+    from core.models import XPPeriodo
+
+    baldes = XPPeriodo.objects.filter(periodo=periodo, inicio=inicio, disciplina_id=disciplina_id)
+    if turma_id is not None:
+        baldes = baldes.filter(aluno__turmas_aluno=turma_id)
+    return baldes
+
+
+def top_periodo(periodo, inicio, disciplina_id=None, turma_id=None, quantidade=10):
+    """Top do período, com `posicao` (DENSE_RANK) anotada em cada balde"""
+    return list(
+        _baldes(periodo, inicio, disciplina_id, turma_id)
+        .annotate(posicao=Window(DenseRank(), order_by=F('xp').desc()))
+        .select_related('aluno')
+        .order_by('-xp', 'aluno_id')[:quantidade]
+    )
+
+
+def posicao_periodo(usuario, periodo, inicio, disciplina_id=None, turma_id=None):
+    """Posição do usuário no período (None se ele não ganhou XP no período)"""
+    baldes = _baldes(periodo, inicio, disciplina_id, turma_id)
+
+    xp = baldes.filter(aluno=usuario).values_list('xp', flat=True).first()
+    if xp is None:
+        return None
+
+    return baldes.filter(xp__gt=xp).values('xp').distinct().count() + 1
@@ -2,37 +2,54 @@
 Signals para criar automaticamente MissaoAluno quando:
 1. Um novo aluno é cadastrado
 2. Uma nova missão é criada para uma turma
+E para recalcular o ranking e o resumo do professor quando as
+matrículas, turmas ou missões mudam.
+
+A criação em si roda na fila de tarefas (core.fila), fora da requisição.
 """
 
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from accounts.models import Usuario
-from core.models import Missao, MissaoAluno
+from accounts.painel import painel_professor_alterado
+from accounts.ranking import agendar_recalculo
+from core.models import Missao, Turma
+from core.fila import enfileirar
 
 
 @receiver(m2m_changed, sender=Usuario.turmas_aluno.through)
-def criar_missoes_para_novo_aluno(sender, instance, action, pk_set, **kwargs):
+def criar_missoes_para_novo_aluno(sender, instance, action, reverse, pk_set, **kwargs):
     """
     Quando um aluno é associado a turmas, cria MissaoAluno
     para todas as missões existentes nessas turmas.
     """
-    if action == "post_add" and instance.tipo == 'ALUNO':
-        # pk_set contém os IDs das turmas que foram adicionadas
-        from core.models import Turma
-        
-        for turma_id in pk_set:
-            # Buscar todas as missões dessa turma
-            missoes = Missao.objects.filter(turma_id=turma_id)
-            
-            # Criar MissaoAluno para cada missão
-            for missao in missoes:
-                MissaoAluno.objects.get_or_create(
-                    aluno=instance,
-                    missao=missao,
-                    defaults={'concluida': False}
-                )
-            
-            print(f"✅ Criadas {missoes.count()} missões para {instance.username} na turma {turma_id}")
+    if action != "post_add" or not pk_set:
+        return
+
+    if reverse:
+        # turma.alunos.add(...): instance é a Turma e pk_set os alunos
+        enfileirar('distribuir_missoes', {
+            'alunos_ids': sorted(pk_set),
+            'turmas_ids': [instance.pk],
+        })
+
+    elif instance.tipo == 'ALUNO':
+        enfileirar('distribuir_missoes', {
+            'alunos_ids': [instance.pk],
+            'turmas_ids': sorted(pk_set),
+        })
+
+
+@receiver(m2m_changed, sender=Usuario.turmas_aluno.through)
+def recalcular_ranking_matriculas(sender, instance, action, reverse, pk_set, **kwargs):
+    """Matrículas mudaram: os rankings das turmas envolvidas precisam ser recalculados"""
+    if action not in ("post_add", "post_remove") or not pk_set:
+        return
+
+    if reverse:
+        agendar_recalculo([instance.pk])
+    elif instance.tipo == 'ALUNO':
+        agendar_recalculo(sorted(pk_set))
 
 
 @receiver(post_save, sender=Missao)
@@ -42,18 +59,39 @@ def criar_missao_aluno_para_todos_alunos(sender, instance, created, **kwargs):
     para todos os alunos da turma.
     """
     if created:
-        turma = instance.turma
-        alunos = turma.alunos.all()
-        
-        # Criar MissaoAluno para cada aluno
-        missoes_criadas = []
-        for aluno in alunos:
-            missao_aluno, criada = MissaoAluno.objects.get_or_create(
-                aluno=aluno,
-                missao=instance,
-                defaults={'concluida': False}
-            )
-            if criada:
-                missoes_criadas.append(missao_aluno)
-        
-        print(f"✅ Missão '{instance.titulo}' atribuída a {len(missoes_criadas)} alunos")
+        enfileirar(
+            'distribuir_missoes',
+            {'missao_id': instance.pk},
+            chave=f'distribuir_missoes:missao:{instance.pk}'
+        )
+
+
+# ==========================================
+# RESUMO DO PROFESSOR (accounts.painel)
+# ==========================================
+
+@receiver(m2m_changed, sender=Usuario.turmas_aluno.through)
+def atualizar_painel_professor_matriculas(sender, instance, action, reverse, pk_set, **kwargs):
+    """Matrículas mudaram: o resumo dos professores das turmas envolvidas muda"""
+    if action not in ("post_add", "post_remove") or not pk_set:
+        return
+
+    if reverse:
+        painel_professor_alterado(instance.professor_id)
+    elif instance.tipo == 'ALUNO':
+        painel_professor_alterado(*set(
+            Turma.objects.filter(pk__in=pk_set).values_list('professor_id', flat=True)
+        ))
+
+
+@receiver([post_save, post_delete], sender=Turma)
+def atualizar_painel_professor_turma(sender, instance, **kwargs):
+    painel_professor_alterado(instance.professor_id)
+
+
+@receiver([post_save, post_delete], sender=Missao)
+def atualizar_painel_professor_missao(sender, instance, origin=None, **kwargs):
+    # Exclusão em cascata de uma turma: o signal da turma já atualizou o resumo
+    if isinstance(origin, Turma):
+        return
+    painel_professor_alterado(instance.turma.professor_id)
@@ -1,3 +1,396 @@
-from django.test import TestCase
+import time
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.estatisticas import inicio_periodo, registrar_xp_periodos
+from core.models import Disciplina, Job, Turma
+from core.orcamento import limite_consultas
+from core.tests import DadosEscola
+from . import painel
+from .badges import coletar_badges_novas, get_progresso_badges, verificar_e_conceder_badges
+from .models import Badge, BadgeUsuario, Usuario
+from .ranking import (
+    ATRASO_RECALCULO, ATRASO_RECALCULO_GERAL, agendar_recalculo, ao_redor, reconstruir_ranking, top,
+    posicao_periodo, top_periodo,
+)
+
+
+# ==========================================
+# ORÇAMENTO DE CONSULTAS DAS VIEWS
+# ==========================================
+
+class OrcamentoViewsAccountsTests(DadosEscola):
+
+    def test_login(self):
+        with limite_consultas(9):
+            response = self.client.post(reverse('login'), {'username': 'aluno0', 'password': 'senha'})
+        self.assertRedirects(response, reverse('dashboard_aluno'), fetch_redirect_response=False)
+
+    def test_logout(self):
+        self.entrar(self.aluno)
+        with limite_consultas(4):
+            response = self.client.get(reverse('logout'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_cadastro_aluno_get(self):
+        with limite_consultas(1):
+            response = self.client.get(reverse('cadastro_aluno'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_cadastro_aluno_post(self):
+        dados = {
+            'username': 'novo_aluno', 'email': 'novo@escola.com', 'password': 'senha123',
+            'turmas': [self.turma.pk], 'aceito_termos': 'on',
+        }
+        with limite_consultas(20):
+            response = self.client.post(reverse('cadastro_aluno'), dados)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Usuario.objects.filter(username='novo_aluno').exists())
+
+    def test_cadastro_professor(self):
+        dados = {'username': 'nova_prof', 'email': 'prof@escola.com', 'password': 'senha123', 'aceito_termos': 'on'}
+        with limite_consultas(2):
+            response = self.client.post(reverse('cadastro_professor'), dados)
+        self.assertEqual(response.status_code, 302)
+
+    def test_dashboard_aluno(self):
+        self.entrar(self.aluno)
+        with limite_consultas(7):
+            response = self.client.get(reverse('dashboard_aluno'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_dashboard_aluno(self):
+        self.entrar(self.aluno)
+        with limite_consultas(6):
+            response = self.client.get(reverse('api_dashboard_aluno'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_professor(self):
+        self.entrar(self.professor)
+        with limite_consultas(5):
+            response = self.client.get(reverse('dashboard_professor'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_criar_turma(self):
+        self.entrar(self.professor)
+        with limite_consultas(6):
+            response = self.client.post(reverse('criar_turma'), {'nome': 'Turma B', 'serie': '2º ano', 'ano_letivo': 2026})
+        self.assertEqual(response.status_code, 302)
+
+    def test_editar_turma(self):
+        self.entrar(self.professor)
+        dados = {'nome': 'Turma A1', 'serie': '1º ano', 'ano_letivo': 2026}
+        with limite_consultas(8):
+            response = self.client.post(reverse('editar_turma', args=[self.turma.pk]), dados)
+        self.assertEqual(response.status_code, 302)
+
+    def test_deletar_turma(self):
+        self.entrar(self.professor)
+        with limite_consultas(23):
+            response = self.client.post(reverse('deletar_turma', args=[self.turma.pk]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_detalhes_turma(self):
+        self.entrar(self.professor)
+        with limite_consultas(6):
+            response = self.client.get(reverse('detalhes_turma', args=[self.turma.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_ranking(self):
+        self.entrar(self.aluno)
+        with limite_consultas(7):
+            response = self.client.get(reverse('ranking'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_ranking_periodo(self):
+        self.entrar(self.aluno)
+        with limite_consultas(7):
+            response = self.client.get(reverse('ranking'), {'periodo': 'semana', 'disciplina': self.disciplina.pk})
+        self.assertEqual(response.status_code, 200)
+
+    def test_conquistas(self):
+        self.entrar(self.aluno)
+        with limite_consultas(7):
+            response = self.client.get(reverse('conquistas'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_paginas_estaticas(self):
+        for nome in ('politica_privacidade', 'termos_uso'):
+            with limite_consultas(0):
+                response = self.client.get(reverse(nome))
+            self.assertEqual(response.status_code, 200)
+
+
+# ==========================================
+# RANKING MATERIALIZADO
+# ==========================================
+
+class RankingTests(TestCase):
+    XP = {'ana': 50, 'bia': 30, 'caio': 30, 'duda': 20, 'eli': 0}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = Usuario.objects.create_user('prof', password='x', tipo='PROFESSOR', xp_total=999)
+        cls.alunos = {
+            nome: Usuario.objects.create_user(nome, password='x', tipo='ALUNO', xp_total=xp)
+            for nome, xp in cls.XP.items()
+        }
+        cls.turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=cls.professor)
+        cls.turma.alunos.add(cls.alunos['bia'], cls.alunos['duda'], cls.alunos['eli'])
+
+    def setUp(self):
+        cache.clear()
+        reconstruir_ranking(None)
+        reconstruir_ranking(self.turma.pk)
+
+    def nomes(self, posicoes):
+        return [(p.aluno.username, p.posicao) for p in posicoes]
+
+    def test_top_com_empates(self):
+        # DENSE_RANK: empatados dividem a posição e a seguinte não é pulada
+        self.assertEqual(
+            self.nomes(top()),
+            [('ana', 1), ('bia', 2), ('caio', 2), ('duda', 3), ('eli', 4)],
+        )
+        self.assertEqual(self.nomes(top(quantidade=2)), [('ana', 1), ('bia', 2)])
+
+    def test_top_da_turma(self):
+        self.assertEqual(self.nomes(top(self.turma.pk)), [('bia', 1), ('duda', 2), ('eli', 3)])
+
+    def test_ao_redor(self):
+        posicao, vizinhos = ao_redor(self.alunos['caio'], quantidade=1)
+        self.assertEqual(posicao, 2)
+        self.assertEqual(self.nomes(vizinhos), [('bia', 2), ('caio', 2), ('duda', 3)])
+
+        posicao, vizinhos = ao_redor(self.alunos['ana'], quantidade=2)
+        self.assertEqual(self.nomes(vizinhos), [('ana', 1), ('bia', 2), ('caio', 2)])
+
+    def test_ao_redor_fora_do_ranking(self):
+        self.assertEqual(ao_redor(self.alunos['ana'], turma_id=self.turma.pk), (None, []))
+
+    @override_settings(XP360_FILA_SINCRONA=False)
+    def test_ranking_geral_com_atraso_maior(self):
+        agora = timezone.now()
+        agendar_recalculo([self.turma.pk])
+        agendar_recalculo([self.turma.pk])
+
+        jobs = {job.payload['turma_id']: job for job in Job.objects.filter(tarefa='atualizar_ranking')}
+        self.assertEqual(sorted(jobs, key=repr), sorted([self.turma.pk, None], key=repr))
+        self.assertAlmostEqual((jobs[self.turma.pk].executar_apos - agora).total_seconds(), ATRASO_RECALCULO, delta=5)
+        self.assertAlmostEqual((jobs[None].executar_apos - agora).total_seconds(), ATRASO_RECALCULO_GERAL, delta=5)
+
+    @override_settings(XP360_FILA_SINCRONA=True)
+    def test_ranking_geral_limitado_na_fila_sincrona(self):
+        with mock.patch('accounts.ranking.reconstruir_ranking') as reconstruir:
+            agendar_recalculo([self.turma.pk])
+            agendar_recalculo([self.turma.pk])
+        self.assertEqual(
+            [chamada.args for chamada in reconstruir.call_args_list],
+            [(self.turma.pk,), (None,), (self.turma.pk,)],
+        )
+
+
+class RankingPeriodoTests(TestCase):
+    DOMINGO = date(2026, 10, 18)
+
+    @classmethod
+    def setUpTestData(cls):
+        professor = Usuario.objects.create_user('prof', password='x', tipo='PROFESSOR')
+        cls.disciplina = Disciplina.objects.create(nome='Matemática', icone='📐')
+        cls.alunos = {
+            nome: Usuario.objects.create_user(nome, password='x', tipo='ALUNO')
+            for nome in ('ana', 'bia', 'caio')
+        }
+        cls.turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=professor)
+        cls.turma.alunos.add(cls.alunos['bia'], cls.alunos['caio'])
+
+        for nome, data, disciplina, xp in (
+            ('ana', date(2026, 10, 18), cls.disciplina.pk, 30),  # domingo
+            ('ana', date(2026, 10, 19), None, 10),  # segunda: outra semana
+            ('bia', date(2026, 10, 19), None, 40),
+            ('caio', date(2026, 10, 31), None, 20),  # sábado
+            ('caio', date(2026, 11, 1), None, 5),  # domingo: mesma semana, outro mês
+        ):
+            registrar_xp_periodos(cls.alunos[nome].pk, data, disciplina, xp)
+
+    def top(self, *args, **kwargs):
+        return [(balde.aluno.username, balde.xp, balde.posicao) for balde in top_periodo(*args, **kwargs)]
+
+    def test_inicio_periodo(self):
+        self.assertEqual(inicio_periodo('SEMANA', self.DOMINGO), date(2026, 10, 12))
+        self.assertEqual(inicio_periodo('SEMANA', date(2026, 10, 19)), date(2026, 10, 19))
+        self.assertEqual(inicio_periodo('SEMANA', date(2026, 11, 1)), date(2026, 10, 26))
+        self.assertEqual(inicio_periodo('MES', date(2026, 10, 31)), date(2026, 10, 1))
+        self.assertEqual(inicio_periodo('MES', date(2026, 11, 1)), date(2026, 11, 1))
+
+    def test_semanas(self):
+        self.assertEqual(self.top('SEMANA', date(2026, 10, 12)), [('ana', 30, 1)])
+        self.assertEqual(self.top('SEMANA', date(2026, 10, 19)), [('bia', 40, 1), ('ana', 10, 2)])
+        self.assertEqual(self.top('SEMANA', date(2026, 10, 26)), [('caio', 25, 1)])
+
+    def test_meses_com_empate(self):
+        self.assertEqual(
+            self.top('MES', date(2026, 10, 1)),
+            [('ana', 40, 1), ('bia', 40, 1), ('caio', 20, 2)],
+        )
+        self.assertEqual(self.top('MES', date(2026, 11, 1)), [('caio', 5, 1)])
+
+    def test_disciplina_e_turma(self):
+        self.assertEqual(self.top('MES', date(2026, 10, 1), disciplina_id=self.disciplina.pk), [('ana', 30, 1)])
+        self.assertEqual(
+            self.top('MES', date(2026, 10, 1), turma_id=self.turma.pk),
+            [('bia', 40, 1), ('caio', 20, 2)],
+        )
+
+    def test_posicao_periodo(self):
+        mes = date(2026, 10, 1)
+        self.assertEqual(posicao_periodo(self.alunos['bia'], 'MES', mes), 1)
+        self.assertEqual(posicao_periodo(self.alunos['caio'], 'MES', mes), 2)
+        self.assertIsNone(posicao_periodo(self.alunos['bia'], 'SEMANA', date(2026, 10, 12)))
+        self.assertIsNone(posicao_periodo(self.alunos['ana'], 'MES', mes, turma_id=self.turma.pk))
+
+
+# ==========================================
+# PAINEL EM CACHE
+# ==========================================
+
+class PainelTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.aluno = Usuario.objects.create_user('aluno', password='x', tipo='ALUNO', xp_total=10)
+        cls.professor = Usuario.objects.create_user('professor', password='x', tipo='PROFESSOR')
+
+    def setUp(self):
+        cache.clear()
+        calcular = mock.patch.object(painel, 'calcular_painel', wraps=painel.calcular_painel)
+        self.calcular = calcular.start()
+        self.addCleanup(calcular.stop)
+
+    def alterar_xp(self, xp):
+        Usuario.objects.filter(pk=self.aluno.pk).update(xp_total=xp)
+        self.aluno.refresh_from_db()
+        painel.painel_alterado(self.aluno.pk)
+
+    def test_acerto_e_nova_versao(self):
+        self.assertEqual(painel.painel_aluno(self.aluno)['xp_total'], 10)
+        self.assertEqual(painel.painel_aluno(self.aluno)['xp_total'], 10)
+        self.assertEqual(self.calcular.call_count, 1)
+
+        self.alterar_xp(25)
+        self.assertEqual(painel.painel_aluno(self.aluno)['xp_total'], 25)
+        self.assertEqual(self.calcular.call_count, 2)
+
+    def test_copia_antiga_enquanto_outro_recalcula(self):
+        painel.painel_aluno(self.aluno)
+        self.alterar_xp(25)
+
+        # Outra requisição tem a trava: as demais recebem a cópia anterior, sem consultas
+        cache.add(painel._chave_trava(self.aluno.pk), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(painel.painel_aluno(self.aluno)['xp_total'], 10)
+            self.assertEqual(painel.painel_aluno(self.aluno)['xp_total'], 10)
+        self.assertEqual(self.calcular.call_count, 1)
+
+        cache.delete(painel._chave_trava(self.aluno.pk))
+        self.assertEqual(painel.painel_aluno(self.aluno)['xp_total'], 25)
+        self.assertEqual(self.calcular.call_count, 2)
+        # A requisição que recalculou solta a trava
+        self.assertIsNone(cache.get(painel._chave_trava(self.aluno.pk)))
+
+    def test_sem_copia_calcula_mesmo_travado(self):
+        trava = painel._chave_trava(self.aluno.pk)
+        cache.add(trava, 'outra')
+        self.assertEqual(painel.painel_aluno(self.aluno)['xp_total'], 10)
+        self.assertEqual(self.calcular.call_count, 1)
+        # A trava é de outra requisição: continua com ela
+        self.assertEqual(cache.get(trava), 'outra')
+
+    def test_copia_vencida(self):
+        painel.painel_aluno(self.aluno)
+        agora = time.time() + painel.VALIDADE + 1
+        with mock.patch.object(painel.time, 'time', return_value=agora):
+            painel.painel_aluno(self.aluno)
+        self.assertEqual(self.calcular.call_count, 2)
+
+    def test_copia_de_outro_dia(self):
+        painel.painel_aluno(self.aluno)
+        cache.add(painel._chave_trava(self.aluno.pk), 1)
+        amanha = timezone.localdate() + timedelta(days=1)
+        with mock.patch.object(painel.timezone, 'localdate', return_value=amanha):
+            self.assertEqual(painel.painel_aluno(self.aluno)['data'], amanha.isoformat())
+        self.assertEqual(self.calcular.call_count, 2)
+
+    def test_painel_professor(self):
+        self.assertEqual(painel.painel_professor(self.professor)['total_turmas'], 0)
+        with self.assertNumQueries(0):
+            painel.painel_professor(self.professor)
+
+        turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=self.professor)
+        turma.alunos.add(self.aluno)
+        resumo = painel.painel_professor(self.professor)
+        self.assertEqual((resumo['total_turmas'], resumo['total_alunos']), (1, 1))
+
+        turma.delete()
+        self.assertEqual(painel.painel_professor(self.professor)['total_turmas'], 0)
+
+
+# ==========================================
+# BADGES
+# ==========================================
+
+class BadgesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.aluno = Usuario.objects.create_user('aluno', password='x', tipo='ALUNO')
+        def badge(nome, tipo, valor):
+            return Badge.objects.create(nome=nome, descricao=nome, icone='🏅', tipo=tipo, condicao_valor=valor)
+
+        cls.primeira = badge('Primeira', 'MISSOES', 1)
+        cls.tres = badge('Três', 'MISSOES', 3)
+        cls.nivel = badge('Nível 2', 'NIVEL', 2)
+        cls.precisao = badge('Certeiro', 'PRECISAO', 2)
+
+    def setUp(self):
+        cache.clear()
+
+    def conceder(self, evento=None, **contadores):
+        Usuario.objects.filter(pk=self.aluno.pk).update(**contadores)
+        self.aluno.refresh_from_db()
+        return {badge.nome for badge in verificar_e_conceder_badges(self.aluno, evento)}
+
+    def conquistadas(self):
+        return set(BadgeUsuario.objects.filter(usuario=self.aluno).values_list('badge__nome', flat=True))
+
+    def test_concede_ao_atingir_o_limite(self):
+        self.assertEqual(self.conceder(total_concluidas=0), set())
+        self.assertEqual(self.conceder(total_concluidas=1), {'Primeira'})
+        self.assertEqual(self.conceder(total_concluidas=2), set())
+        self.assertEqual(self.conceder(total_concluidas=5), {'Três'})
+        self.assertEqual(self.conquistadas(), {'Primeira', 'Três'})
+
+    def test_idempotente(self):
+        self.assertEqual(self.conceder(total_concluidas=3), {'Primeira', 'Três'})
+        self.assertEqual(self.conceder(), set())
+        self.assertEqual(BadgeUsuario.objects.filter(usuario=self.aluno).count(), 2)
+
+    def test_so_os_tipos_do_evento(self):
+        # Errar uma questão só pode mudar o total de missões
+        self.assertEqual(self.conceder('QUESTAO_ERRADA', nivel=2, acertos_seguidos=2), set())
+        self.assertEqual(self.conceder('TAREFA_CONCLUIDA'), {'Nível 2'})
+        self.assertEqual(self.conceder('QUESTAO_CERTA'), {'Certeiro'})
+
+    def test_progresso_e_novas(self):
+        self.conceder(total_concluidas=2)
+        progresso = {info['badge'].nome: info['porcentagem'] for info in get_progresso_badges(self.aluno)}
+        self.assertEqual(progresso, {'Três': 66, 'Nível 2': 50, 'Certeiro': 0})
+
+        self.assertEqual(coletar_badges_novas(self.aluno), [{'nome': 'Primeira', 'icone': '🏅'}])
+        self.assertEqual(coletar_badges_novas(self.aluno), [])
 
-# Create your tests here.
@@ -14,6 +14,7 @@ urlpatterns = [
     # Dashboards
     path('dashboard/aluno/', views.dashboard_aluno, name='dashboard_aluno'),
     path('dashboard/professor/', views.dashboard_professor, name='dashboard_professor'),
+    path('api/dashboard/aluno/', views.api_dashboard_aluno, name='api_dashboard_aluno'),
     
     # Gerenciar Turmas
     path('criar-turma/', views.criar_turma, name='criar_turma'),
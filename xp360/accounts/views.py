@@ -2,10 +2,17 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse
 from django.utils import timezone
 from django.views.generic import TemplateView  # 🆕 NOVO
 from .models import Usuario
-from core.models import MissaoAluno, Missao, Turma, Disciplina
+from .badges import coletar_badges_novas
+from .painel import painel_aluno, painel_professor
+from core.models import Missao, Turma
+from core import catalogo
+from core.paginacao import paginar, CursorInvalido
+from core.replicas import ler_da_replica
+from core.estatisticas import progresso_alunos_turma, inicio_periodo
 from datetime import date
 from django.db.models import Sum, Count  
 from datetime import timedelta 
@@ -72,33 +79,33 @@ def cadastro_aluno(request):
             # 🆕 NOVO: Validar aceite dos termos
             if not aceito_termos:
                 return render(request, 'accounts/cadastro_aluno.html', {
-                    'turmas': Turma.objects.all().order_by('serie', 'nome'),
+                    'turmas': catalogo.turmas(),
                     'erro': 'Você deve aceitar os Termos de Uso e a Política de Privacidade para se cadastrar.'
                 })
             
             # Validações básicas
             if not username or not email or not password:
                 return render(request, 'accounts/cadastro_aluno.html', {
-                    'turmas': Turma.objects.all().order_by('serie', 'nome'),
+                    'turmas': catalogo.turmas(),
                     'erro': 'Por favor, preencha todos os campos obrigatórios.'
                 })
             
             if not turmas_ids:
                 return render(request, 'accounts/cadastro_aluno.html', {
-                    'turmas': Turma.objects.all().order_by('serie', 'nome'),
+                    'turmas': catalogo.turmas(),
                     'erro': 'Por favor, selecione pelo menos uma turma.'
                 })
             
             # Verificar se usuário já existe
             if Usuario.objects.filter(username=username).exists():
                 return render(request, 'accounts/cadastro_aluno.html', {
-                    'turmas': Turma.objects.all().order_by('serie', 'nome'),
+                    'turmas': catalogo.turmas(),
                     'erro': 'Este nome de usuário já está em uso.'
                 })
             
             if Usuario.objects.filter(email=email).exists():
                 return render(request, 'accounts/cadastro_aluno.html', {
-                    'turmas': Turma.objects.all().order_by('serie', 'nome'),
+                    'turmas': catalogo.turmas(),
                     'erro': 'Este e-mail já está cadastrado.'
                 })
             
@@ -138,13 +145,13 @@ def cadastro_aluno(request):
             
         except Exception as e:
             return render(request, 'accounts/cadastro_aluno.html', {
-                'turmas': Turma.objects.all().order_by('serie', 'nome'),
+                'turmas': catalogo.turmas(),
                 'erro': f'Erro ao criar conta: {str(e)}'
             })
     
     # GET - Mostrar formulário
     context = {
-        'turmas': Turma.objects.all().order_by('serie', 'nome')
+        'turmas': catalogo.turmas()
     }
     
     return render(request, 'accounts/cadastro_aluno.html', context)
@@ -196,25 +203,32 @@ def cadastro_professor(request):
 
 @login_required
 def dashboard_professor(request):
-    # Buscar turmas do professor usando o novo related_name
-    turmas = request.user.turmas_professor.all()
+    # Resumo das turmas (uma consulta anotada, em cache por professor)
+    painel = painel_professor(request.user)
     
     # Buscar todas as disciplinas
-    disciplinas = Disciplina.objects.all().order_by('nome')
-    
-    # Buscar missões criadas pelo professor
-    missoes = Missao.objects.filter(turma__in=turmas)
-    
-    # Calcular total de alunos
-    total_alunos = 0
-    for turma in turmas:
-        total_alunos += turma.alunos.count()
+    disciplinas = catalogo.disciplinas()
+    
+    # Missões recentes, paginadas por cursor (mais novas primeiro)
+    missoes = Missao.objects.filter(
+        turma__professor=request.user
+    ).select_related('disciplina', 'turma')
+    
+    try:
+        missoes_recentes, proximo = paginar(
+            missoes,
+            ['data_criacao', 'id'],
+            cursor=request.GET.get('cursor'),
+            por_pagina=10,
+        )
+    except CursorInvalido:
+        missoes_recentes, proximo = paginar(missoes, ['data_criacao', 'id'], por_pagina=10)
     
     context = {
-        'turmas': turmas,
+        **painel,
         'disciplinas': disciplinas,
-        'missoes': missoes,
-        'total_alunos': total_alunos,
+        'missoes_recentes': missoes_recentes,
+        'proximo_cursor': proximo,
     }
     
     return render(request, "accounts/dashboard_professor.html", context)
@@ -328,136 +342,34 @@ def deletar_turma(request, turma_id):
 
 @login_required
 def dashboard_aluno(request):
-    usuario = request.user
-    
-    # Dados básicos
-    xp_total = usuario.xp_total
-    nivel = usuario.nivel
-    streak_atual = usuario.streak_atual
-    
-    # Calcular XP necessário para próximo nível
-    xp_proximo = (nivel * 100) + 50
-    progresso_nivel = int((xp_total / xp_proximo) * 100) if xp_proximo > 0 else 0
-    
-    # Missões de hoje
-    hoje = timezone.now().date()
-    missoes = MissaoAluno.objects.filter(
-        aluno=usuario,
-        missao__data_criacao__date=hoje
-    ).select_related('missao')
-    
-    concluidas_hoje = missoes.filter(concluida=True).count()
-    total_hoje = missoes.count()
-    progresso_dia = int((concluidas_hoje / total_hoje) * 100) if total_hoje > 0 else 0
+    # Dados do dashboard (cache por aluno, ver accounts.painel)
+    painel = painel_aluno(request.user)
     
-    # === DADOS PARA GRÁFICOS ===
-    
-    # 1. XP dos últimos 7 dias
-    ultimos_7_dias = []
-    xp_por_dia = []
-    
-    for i in range(6, -1, -1):
-        data = hoje - timedelta(days=i)
-        
-        # Criar range do dia completo
-        inicio_dia = timezone.make_aware(
-            timezone.datetime.combine(data, timezone.datetime.min.time())
-        )
-        fim_dia = timezone.make_aware(
-            timezone.datetime.combine(data, timezone.datetime.max.time())
-        )
-        
-        # CORREÇÃO: Usar __range ao invés de __date
-        xp_dia = MissaoAluno.objects.filter(
-            aluno=usuario,
-            concluida=True,
-            data_conclusao__range=(inicio_dia, fim_dia)
-        ).aggregate(total=Sum('missao__xp'))['total'] or 0
-        
-        ultimos_7_dias.append(data.strftime('%d/%m'))
-        xp_por_dia.append(xp_dia)
-    
-    # 2. XP por disciplina
-    disciplinas_stats = []
-    disciplinas = Disciplina.objects.all()
-    
-    for disciplina in disciplinas:
-        xp_disciplina = MissaoAluno.objects.filter(
-            aluno=usuario,
-            concluida=True,
-            missao__disciplina=disciplina
-        ).aggregate(total=Sum('missao__xp'))['total'] or 0
-        
-        if xp_disciplina > 0:
-            disciplinas_stats.append({
-                'nome': disciplina.nome,
-                'xp': xp_disciplina,
-                'cor': disciplina.cor or '#667eea'
-            })
-    
-    # 3. Taxa de acerto (para gráfico de pizza)
-    total_questoes = MissaoAluno.objects.filter(
-        aluno=usuario,
-        concluida=True,
-        missao__tipo='QUESTAO'
-    ).count()
-    
-    acertos = MissaoAluno.objects.filter(
-        aluno=usuario,
-        concluida=True,
-        acertou=True,
-        missao__tipo='QUESTAO'
-    ).count()
-    
-    erros = total_questoes - acertos
-    
-    # 4. Desempenho por disciplina (para gráfico radar)
-    desempenho_radar = {
-        'labels': [],
-        'data': []
-    }
-    
-    for disciplina in disciplinas[:6]:  # Limitar a 6 para não poluir
-        total_missoes = MissaoAluno.objects.filter(
-            aluno=usuario,
-            missao__disciplina=disciplina
-        ).count()
-        
-        if total_missoes > 0:
-            concluidas = MissaoAluno.objects.filter(
-                aluno=usuario,
-                concluida=True,
-                missao__disciplina=disciplina
-            ).count()
-            
-            percentual = int((concluidas / total_missoes) * 100)
-            desempenho_radar['labels'].append(disciplina.nome[:15])
-            desempenho_radar['data'].append(percentual)
+    # 🎉 Badges concedidas em segundo plano desde a última visita
+    badges_novas = coletar_badges_novas(request.user)
     
     context = {
-        'xp_total': xp_total,
-        'nivel': nivel,
-        'streak_atual': streak_atual,
-        'melhor_streak': usuario.melhor_streak,
-        'xp_proximo': xp_proximo,
-        'progresso_nivel': progresso_nivel,
-        'missoes': missoes,
-        'concluidas_hoje': concluidas_hoje,
-        'total_hoje': total_hoje,
-        'progresso_dia': progresso_dia,
-        'pendentes': total_hoje - concluidas_hoje,
+        **painel,
         
         # Dados para gráficos (convertidos para JSON)
-        'grafico_dias': json.dumps(ultimos_7_dias),
-        'grafico_xp': json.dumps(xp_por_dia),
-        'disciplinas_stats': json.dumps(disciplinas_stats),
-        'acertos': acertos,
-        'erros': erros,
-        'desempenho_radar': json.dumps(desempenho_radar),
+        'grafico_dias': json.dumps(painel['grafico_dias']),
+        'grafico_xp': json.dumps(painel['grafico_xp']),
+        'disciplinas_stats': json.dumps(painel['disciplinas_stats']),
+        'desempenho_radar': json.dumps(painel['desempenho_radar']),
+        'badges_novas': json.dumps(badges_novas),
+        # ⭐🔥 Toasts guardados pela conclusão da última missão
+        'nivel_novo': request.session.pop('nivel_novo', None),
+        'streak_info': request.session.pop('streak_info', None),
     }
     
     return render(request, 'accounts/dashboard_aluno.html', context)
 
+
+@login_required
+def api_dashboard_aluno(request):
+    """Os mesmos dados do dashboard do aluno em JSON (para os gráficos)"""
+    return JsonResponse(painel_aluno(request.user))
+
 # ---------------------------------------------------------
 # DETALHES DA TURMA
 # ---------------------------------------------------------
@@ -467,37 +379,24 @@ def detalhes_turma(request, turma_id):
     """View para ver detalhes de uma turma específica"""
     turma = get_object_or_404(Turma, id=turma_id, professor=request.user)
     
-    # Buscar alunos da turma usando o related_name 'alunos'
-    alunos = turma.alunos.all()
-    
     # Buscar missões da turma
-    missoes = turma.missao_set.all()
-    
-    # Estatísticas
-    total_alunos = alunos.count()
+    missoes = turma.missao_set.select_related('disciplina')
     total_missoes = missoes.count()
     
-    # Progresso dos alunos
+    # Progresso dos alunos (já ordenado por XP) em uma única consulta
     alunos_progresso = []
-    for aluno in alunos:
-        missoes_concluidas = MissaoAluno.objects.filter(
-            aluno=aluno, 
-            missao__turma=turma, 
-            concluida=True
-        ).count()
-        
-        progresso = (missoes_concluidas / total_missoes * 100) if total_missoes > 0 else 0
+    for aluno in progresso_alunos_turma(turma, total_missoes):
+        progresso = (aluno.missoes_concluidas / total_missoes * 100) if total_missoes > 0 else 0
         
         alunos_progresso.append({
             'aluno': aluno,
-            'missoes_concluidas': missoes_concluidas,
+            'missoes_concluidas': aluno.missoes_concluidas,
             'progresso': int(progresso),
             'xp_total': aluno.xp_total,
             'nivel': aluno.nivel,
         })
     
-    # Ordena por XP (ranking)
-    alunos_progresso.sort(key=lambda x: x['xp_total'], reverse=True)
+    total_alunos = len(alunos_progresso)
     
     context = {
         'turma': turma,
@@ -515,30 +414,48 @@ def detalhes_turma(request, turma_id):
 # ---------------------------------------------------------
 
 @login_required
+@ler_da_replica
 def ranking(request):
-    # Buscar todas as turmas do aluno
-    turmas_aluno = request.user.turmas_aluno.all()
-    
-    if turmas_aluno.exists():
-        # Pegar alunos de todas as turmas do usuário
-        alunos = Usuario.objects.filter(
-            tipo='ALUNO',
-            turmas_aluno__in=turmas_aluno
-        ).distinct().order_by('-xp_total')[:10]
-        
-        # Calcular posição do usuário atual
-        posicao_usuario = Usuario.objects.filter(
-            tipo='ALUNO',
-            turmas_aluno__in=turmas_aluno,
-            xp_total__gt=request.user.xp_total
-        ).distinct().count() + 1
+    from .ranking import top, ao_redor, top_periodo, posicao_periodo
+    
+    # Turmas do aluno (para escolher qual ranking ver)
+    turmas_aluno = list(request.user.turmas_aluno.order_by('nome'))
+    
+    # ?turma=<id> ou ?turma=geral; padrão: a primeira turma do aluno
+    escolha = request.GET.get('turma', '')
+    turma = next((t for t in turmas_aluno if str(t.pk) == escolha), None)
+    if turma is None and escolha != 'geral' and turmas_aluno:
+        turma = turmas_aluno[0]
+    turma_id = turma.pk if turma else None
+    
+    # ?periodo=semana|mes (baldes de XPPeriodo) ou o XP total (padrão)
+    periodo = {'semana': 'SEMANA', 'mes': 'MES'}.get(request.GET.get('periodo', ''))
+    disciplina_id = request.GET.get('disciplina', '')
+    disciplina_id = int(disciplina_id) if disciplina_id.isdigit() else None
+    
+    if periodo:
+        inicio = inicio_periodo(periodo, timezone.localdate())
+        alunos = top_periodo(periodo, inicio, disciplina_id, turma_id, quantidade=10)
+        posicao_usuario = posicao_periodo(request.user, periodo, inicio, disciplina_id, turma_id)
+        vizinhos = []
     else:
-        alunos = []
-        posicao_usuario = 0
+        # Top 10 e os 5 acima/abaixo do usuário, lidos do ranking materializado
+        alunos = top(turma_id, quantidade=10)
+        posicao_usuario, vizinhos = ao_redor(request.user, turma_id, quantidade=5)
+    
+    # Só mostra a vizinhança se o usuário não aparece no top 10
+    if any(entrada.aluno_id == request.user.id for entrada in alunos):
+        vizinhos = []
     
     context = {
         'alunos': alunos,
-        'posicao_usuario': posicao_usuario,
+        'vizinhos': vizinhos,
+        'posicao_usuario': posicao_usuario or 0,
+        'turmas_aluno': turmas_aluno,
+        'turma': turma,
+        'periodo': request.GET.get('periodo', '') if periodo else '',
+        'disciplinas': catalogo.disciplinas() if periodo else [],
+        'disciplina_id': disciplina_id,
     }
     
     return render(request, 'accounts/ranking.html', context)
@@ -549,17 +466,18 @@ def ranking(request):
 # ---------------------------------------------------------
 
 @login_required
+@ler_da_replica
 def conquistas(request):
-    from .models import BadgeUsuario, Badge
-    from .badges import get_progresso_badges
+    from .models import BadgeUsuario
+    from .badges import get_progresso_badges, catalogo_badges
     
     # Badges conquistadas
     badges_conquistadas = BadgeUsuario.objects.filter(
         usuario=request.user
     ).select_related('badge')
     
-    # Todas as badges
-    todas_badges = Badge.objects.all()
+    # Todas as badges (catálogo em memória)
+    total_badges = sum(len(badges) for badges in catalogo_badges().values())
     
     # IDs das conquistadas
     conquistadas_ids = set(badges_conquistadas.values_list('badge_id', flat=True))
@@ -570,7 +488,7 @@ def conquistas(request):
     context = {
         'titulo': 'Minhas Conquistas',
         'badges_conquistadas': badges_conquistadas,
-        'total_badges': todas_badges.count(),
+        'total_badges': total_badges,
         'total_conquistadas': badges_conquistadas.count(),
         'progresso_badges': progresso_badges,
         'conquistadas_ids': conquistadas_ids,
@@ -0,0 +1,152 @@
+"""
+Análise das questões (missões do tipo QUESTAO)
+
+Para cada questão: quantos alunos escolheram cada alternativa, a
+dificuldade (índice p: fração de acertos) e a discriminação (correlação
+ponto-bisserial entre acertar a questão e a nota do aluno nas outras
+questões, total_acertos / total_questoes sem contar esta).
+
+Tudo sai de uma consulta agrupada por (missão, alternativa, acertou),
+então analisar uma missão ou todas as questões de uma turma custa o mesmo.
+"""
+
+from dataclasses import dataclass, field
+from math import sqrt
+
+from django.db.models import Case, Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Cast
+
+from .models import Alternativa, Missao, MissaoAluno
+
+
+ALTERNATIVAS = ('A', 'B', 'C', 'D')
+
+# Nota do aluno nas outras questões (None se esta foi a única que ele respondeu)
+NOTA_SEM_A_QUESTAO = Case(
+    When(
+        aluno__total_questoes__gt=1,
+        then=(
+            Cast(F('aluno__total_acertos') - Cast('acertou', IntegerField()), FloatField())
+            / Cast(F('aluno__total_questoes') - 1, FloatField())
+        ),
+    ),
+    default=None,
+    output_field=FloatField(),
+)
+
+
+@dataclass
+class AnaliseQuestao:
+    missao_id: int
+    respondidas: int = 0
+    acertos: int = 0
+    distribuicao: dict = field(default_factory=lambda: dict.fromkeys(ALTERNATIVAS, 0))
+    discriminacao: float = None  # None sem alunos suficientes (ou sem variação)
+
+    @property
+    def dificuldade(self):
+        """Índice p: fração dos alunos que acertaram (None se ninguém respondeu)"""
+        return self.acertos / self.respondidas if self.respondidas else None
+
+    def percentuais(self):
+        """{alternativa: % dos alunos que a escolheram}"""
+        return {
+            letra: int((total / self.respondidas) * 100) if self.respondidas else 0
+            for letra, total in self.distribuicao.items()
+        }
+
+    def como_dict(self):
+        return {
+            'missao_id': self.missao_id,
+            'respondidas': self.respondidas,
+            'acertos': self.acertos,
+            'distribuicao': self.distribuicao,
+            'percentuais': self.percentuais(),
+            'dificuldade': self.dificuldade,
+            'discriminacao': self.discriminacao,
+        }
+
+
+def _ponto_bisserial(n1, soma1, n0, soma0, soma_quadrados):
+    """Correlação entre acertar (1/0) e a nota, a partir das somas de cada grupo"""
+    n = n1 + n0
+    if not n1 or not n0:
+        return None
+
+    media = (soma1 + soma0) / n
+    variancia = soma_quadrados / n - media ** 2
+    if variancia <= 0:
+        return None
+
+    return (soma1 / n1 - soma0 / n0) / sqrt(variancia) * sqrt(n1 * n0) / n
+
+
+def analisar_questoes(**filtros):
+    """
+    Análise das questões respondidas em MissaoAluno filtradas por `filtros`
+    (ex.: missao=..., missao__turma=...). Retorna {missao_id: AnaliseQuestao},
+    só com as missões que têm respostas.
+    """
+    linhas = (
+        MissaoAluno.objects.filter(concluida=True, missao__tipo='QUESTAO', **filtros)
+        .annotate(nota=NOTA_SEM_A_QUESTAO)
+        .values('missao_id', 'resposta_escolhida', 'acertou')
+        .annotate(
+            respostas=Count('id'),
+            com_nota=Count('nota'),
+            soma=Sum('nota'),
+            soma_quadrados=Sum(F('nota') * F('nota')),
+        )
+        .order_by()
+    )
+
+    analises = {}
+    somas = {}  # missao_id -> [n acertos, soma acertos, n erros, soma erros, soma dos quadrados]
+    for linha in linhas:
+        missao_id = linha['missao_id']
+        analise = analises.get(missao_id)
+        if analise is None:
+            analise = analises[missao_id] = AnaliseQuestao(missao_id)
+            somas[missao_id] = [0, 0.0, 0, 0.0, 0.0]
+
+        analise.respondidas += linha['respostas']
+        if linha['acertou']:
+            analise.acertos += linha['respostas']
+        if linha['resposta_escolhida'] in analise.distribuicao:
+            analise.distribuicao[linha['resposta_escolhida']] += linha['respostas']
+
+        soma = somas[missao_id]
+        grupo = 0 if linha['acertou'] else 2
+        soma[grupo] += linha['com_nota']
+        soma[grupo + 1] += linha['soma'] or 0
+        soma[4] += linha['soma_quadrados'] or 0
+
+    for missao_id, analise in analises.items():
+        analise.discriminacao = _ponto_bisserial(*somas[missao_id])
+
+    return analises
+
+
+def analisar_missao(missao):
+    """Análise de uma questão (vazia se ninguém respondeu)"""
+    return analisar_questoes(missao=missao).get(missao.pk) or AnaliseQuestao(missao.pk)
+
+
+def analisar_turma(turma):
+    """
+    Todas as questões da turma, das mais recentes para as mais antigas:
+    [(missão com `correta` anotada, AnaliseQuestao)], em duas consultas
+    """
+    correta = Alternativa.objects.filter(missao=OuterRef('pk'), correta=True).values('ordem')[:1]
+    missoes = (
+        Missao.objects.filter(turma=turma, tipo='QUESTAO')
+        .annotate(correta=Subquery(correta))
+        .select_related('disciplina')
+        .order_by('-data_criacao', '-id')
+    )
+
+    analises = analisar_questoes(missao__turma=turma)
+    return [
+        (missao, analises.get(missao.pk) or AnaliseQuestao(missao.pk))
+        for missao in missoes
+    ]
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registrar as tarefas da fila quando o app estiver pronto
+        import core.tarefas
+        # Catálogos em cache (liga os signals de invalidação)
+        import core.catalogo
+        # Desconto dos consolidados quando missões são apagadas
+        import core.estatisticas
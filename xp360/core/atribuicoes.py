@@ -0,0 +1,107 @@
+"""
+Distribuição de missões para os alunos (criação em massa de MissaoAluno)
+Usada quando uma missão é criada e quando um aluno entra em turmas
+"""
+
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef, F
+
+from accounts.models import Usuario
+from accounts.painel import painel_alterado
+from .estatisticas import registrar_atribuicoes, sql_insert_em_lote
+from .metricas import DISTRIBUICAO_LINHAS
+from .models import Missao, MissaoAluno
+
+
+TAMANHO_LOTE = 500
+
+
+def pares_faltantes(missao=None, alunos_ids=None, turmas_ids=None):
+    """
+    Calcula, em uma única consulta, os pares (aluno_id, missao_id, disciplina_id)
+    de alunos matriculados na turma da missão que ainda não têm MissaoAluno.
+
+    Os filtros são combinados: `missao` limita a uma missão, `alunos_ids` a
+    alguns alunos e `turmas_ids` a algumas turmas.
+    """
+    alunos = Usuario.objects.filter(tipo='ALUNO')
+    if alunos_ids is not None:
+        alunos = alunos.filter(pk__in=alunos_ids)
+
+    missoes = Missao.objects.annotate(
+        aluno_alvo=F('turma__alunos')
+    ).filter(aluno_alvo__in=alunos)
+
+    if missao is not None:
+        missoes = missoes.filter(pk=missao.pk)
+    if turmas_ids is not None:
+        missoes = missoes.filter(turma_id__in=turmas_ids)
+
+    ja_atribuida = MissaoAluno.objects.filter(
+        aluno=OuterRef('aluno_alvo'),
+        missao=OuterRef('pk')
+    )
+
+    return list(
+        missoes.exclude(Exists(ja_atribuida))
+        .values_list('aluno_alvo', 'pk', 'disciplina_id')
+        .order_by()
+    )
+
+
+def criar_missoes_aluno(pares):
+    """
+    Cria as MissaoAluno de `pares` [(aluno_id, missao_id)] ignorando as que
+    já existem (uma distribuição concorrente pode ter criado algumas depois
+    da leitura) e retorna o conjunto dos pares realmente criados, pelo
+    INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    Sem RETURNING no banco, retorna todos os pares.
+    """
+    conexao = connections[router.db_for_write(MissaoAluno)]
+    novas = [MissaoAluno(aluno_id=aluno_id, missao_id=missao_id) for aluno_id, missao_id in pares]
+
+    if conexao.vendor not in ('postgresql', 'sqlite') or not conexao.features.can_return_rows_from_bulk_insert:
+        MissaoAluno.objects.bulk_create(novas, ignore_conflicts=True)
+        return set(pares)
+
+    nome = conexao.ops.quote_name
+    sql, valores = sql_insert_em_lote(
+        MissaoAluno,
+        [{'aluno_id': aluno_id, 'missao_id': missao_id} for aluno_id, missao_id in pares],
+        conexao,
+    )
+    sql += f" ON CONFLICT DO NOTHING RETURNING {nome('aluno_id')}, {nome('missao_id')}"
+    with conexao.cursor() as cursor:
+        cursor.execute(sql, valores)
+        return {tuple(linha) for linha in cursor.fetchall()}
+
+
+def distribuir_missoes(missao=None, alunos_ids=None, turmas_ids=None, lote=TAMANHO_LOTE):
+    """
+    Cria as MissaoAluno que faltam com bulk_create em lotes e atualiza
+    o progresso por disciplina. Retorna quantas linhas foram criadas.
+
+    O número de consultas não depende do tamanho da turma
+    (uma leitura, um INSERT por lote e a atualização dos consolidados).
+    """
+    pares = pares_faltantes(missao=missao, alunos_ids=alunos_ids, turmas_ids=turmas_ids)
+    DISTRIBUICAO_LINHAS.observar(len(pares))
+    if not pares:
+        return 0
+
+    criadas = set()
+    for inicio in range(0, len(pares), lote):
+        criadas |= criar_missoes_aluno([(aluno_id, missao_id) for aluno_id, missao_id, _ in pares[inicio:inicio + lote]])
+
+    # Só as linhas criadas aqui: as de uma distribuição concorrente já foram contadas por ela
+    pares = [par for par in pares if par[:2] in criadas]
+    if not pares:
+        return 0
+
+    registrar_atribuicoes([(aluno_id, disciplina_id) for aluno_id, _, disciplina_id in pares])
+
+    # Novas missões aparecem no dashboard dos alunos
+    alunos_ids = {aluno_id for aluno_id, _, _ in pares}
+    transaction.on_commit(lambda: painel_alterado(*alunos_ids))
+
+    return len(pares)
@@ -0,0 +1,238 @@
+"""
+Benchmark de ponta a ponta (benchmark_xp360)
+
+Chama cada URL de accounts/urls.py e core/urls.py pelo Client de teste,
+com usuários e objetos da massa gerada por seed_xp360, e mede a latência
+(p50/p95/p99) e o número de consultas de cada uma. Cada requisição roda
+em uma transação desfeita no final: as que gravam (concluir missão,
+deletar turma...) podem ser repetidas sem mudar os dados.
+
+O relatório é um JSON; comparado com um relatório anterior (baseline),
+aponta as URLs que ficaram mais lentas ou passaram a fazer mais consultas.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts import urls as accounts_urls
+from accounts.models import Usuario
+from . import urls as core_urls
+from .massa_dados import PREFIXO, SENHA
+from .models import Turma, Missao, MissaoAluno, Alternativa
+from .orcamento import RegistroConsultas
+
+
+# Diferenças de p95 menores que isto são ruído (páginas de 1 ms variam 300%)
+VARIACAO_MINIMA_MS = 5
+
+
+@dataclass
+class Cenario:
+    nome: str  # nome da URL (um cenário extra da mesma URL leva um sufixo)
+    url_nome: str
+    metodo: str
+    url: str
+    usuario: Usuario = None
+    dados: dict = field(default_factory=dict)
+
+
+def urls_cobertas():
+    """Nomes de todas as URLs de accounts e core"""
+    return [padrao.name for padrao in accounts_urls.urlpatterns + core_urls.urlpatterns]
+
+
+def cenarios():
+    """
+    Um cenário (ou mais) por URL, usando a turma gerada com mais alunos,
+    o professor dela e um aluno com uma tarefa e uma questão pendentes.
+    Retorna [] se a massa de dados não existir.
+    """
+    turma = (
+        Turma.objects.filter(professor__username__startswith=PREFIXO)
+        .annotate(total_alunos=Count('alunos'))
+        .order_by('-total_alunos', 'pk')
+        .select_related('professor')
+        .first()
+    )
+    if turma is None:
+        return []
+    professor = turma.professor
+
+    pendentes = MissaoAluno.objects.filter(missao__turma=turma, concluida=False).order_by('aluno_id', 'pk')
+    questao_pendente = pendentes.filter(missao__tipo='QUESTAO').first()
+    if questao_pendente is None:
+        return []
+    aluno = questao_pendente.aluno
+    tarefa_pendente = pendentes.filter(aluno=aluno, missao__tipo='TAREFA').first() or questao_pendente
+
+    questao = Missao.objects.filter(turma=turma, tipo='QUESTAO').order_by('pk').first()
+    correta = (
+        Alternativa.objects.filter(missao=questao_pendente.missao, correta=True)
+        .values_list('ordem', flat=True).first()
+    )
+
+    def cenario(url_nome, metodo='get', usuario=None, args=(), dados=None, sufixo=''):
+        return Cenario(
+            nome=f'{url_nome}{sufixo}',
+            url_nome=url_nome,
+            metodo=metodo,
+            url=reverse(url_nome, args=args),
+            usuario=usuario,
+            dados=dados or {},
+        )
+
+    novo_usuario = {
+        'username': f'{PREFIXO}benchmark', 'email': f'{PREFIXO}benchmark@escola.test',
+        'password': SENHA, 'aceito_termos': 'on',
+    }
+    dados_turma = {'nome': 'Turma Benchmark', 'serie': '1º ano', 'ano_letivo': timezone.localdate().year}
+
+    return [
+        # accounts
+        cenario('login', 'post', dados={'username': aluno.username, 'password': SENHA}),
+        cenario('logout', usuario=aluno),
+        cenario('cadastro_aluno', 'post', dados={**novo_usuario, 'turmas': [turma.pk]}),
+        cenario('cadastro_professor', 'post', dados=novo_usuario),
+        cenario('dashboard_aluno', usuario=aluno),
+        cenario('dashboard_professor', usuario=professor),
+        cenario('api_dashboard_aluno', usuario=aluno),
+        cenario('criar_turma', 'post', professor, dados=dados_turma),
+        cenario('editar_turma', 'post', professor, args=[turma.pk], dados=dados_turma),
+        cenario('deletar_turma', 'post', professor, args=[turma.pk]),
+        cenario('detalhes_turma', usuario=professor, args=[turma.pk]),
+        cenario('ranking', usuario=aluno),
+        cenario('ranking', usuario=aluno, dados={'periodo': 'semana', 'turma': turma.pk}, sufixo=':semana'),
+        cenario('conquistas', usuario=aluno),
+        cenario('politica_privacidade'),
+        cenario('termos_uso'),
+
+        # core
+        cenario('criar_missao', 'post', professor, dados={
+            'titulo': 'Missão Benchmark', 'descricao': 'Benchmark', 'xp': 10, 'turma': turma.pk,
+            'disciplina': questao.disciplina_id if questao else '', 'tipo': 'QUESTAO', 'resposta_correta': 'A',
+            'alternativa_a': '1', 'alternativa_b': '2', 'alternativa_c': '3', 'alternativa_d': '4',
+        }),
+        cenario('concluir_missao', usuario=aluno, args=[tarefa_pendente.pk]),
+        cenario('responder_questao', usuario=aluno, args=[questao_pendente.pk]),
+        cenario('responder_questao', 'post', aluno, args=[questao_pendente.pk], dados={'resposta': correta}, sufixo=':post'),
+        cenario('historico_aluno', usuario=aluno),
+        cenario('api_historico_aluno', usuario=aluno),
+        cenario('api_historico_aluno', usuario=aluno, dados={'status': 'concluidas', 'total': '1'}, sufixo=':total'),
+        cenario('historico_professor', usuario=professor),
+        cenario('api_historico_professor', usuario=professor),
+        cenario('api_historico_professor', usuario=professor, dados={'turma': turma.pk, 'total': '1'}, sufixo=':total'),
+        cenario('detalhes_missao', usuario=professor, args=[questao.pk if questao else 0]),
+        cenario('api_analise_turma', usuario=professor, args=[turma.pk]),
+        cenario('api_mapa_turma', usuario=professor, args=[turma.pk]),
+    ]
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) com interpolação linear entre os vizinhos"""
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    abaixo = int(posicao)
+    acima = min(abaixo + 1, len(ordenados) - 1)
+    return ordenados[abaixo] + (ordenados[acima] - ordenados[abaixo]) * (posicao - abaixo)
+
+
+def medir(cenario, repeticoes=20, aquecimento=1):
+    """Latências (ms), consultas e status de `repeticoes` chamadas do cenário"""
+    client = Client(raise_request_exception=False)
+    tempos = []
+    consultas = []
+    status = set()
+
+    for rodada in range(aquecimento + repeticoes):
+        if cenario.usuario is not None:
+            client.force_login(cenario.usuario)
+
+        registro = RegistroConsultas(lentas=0)
+        with transaction.atomic():
+            with registro.registrar():
+                inicio = time.perf_counter()
+                response = getattr(client, cenario.metodo)(cenario.url, cenario.dados)
+                duracao = time.perf_counter() - inicio
+            transaction.set_rollback(True)
+
+        if rodada >= aquecimento:
+            tempos.append(duracao * 1000)
+            consultas.append(registro.total)
+            status.add(response.status_code)
+
+    return {
+        'url': cenario.url,
+        'metodo': cenario.metodo.upper(),
+        'status': sorted(status),
+        'p50_ms': round(percentil(tempos, 50), 2),
+        'p95_ms': round(percentil(tempos, 95), 2),
+        'p99_ms': round(percentil(tempos, 99), 2),
+        'consultas': max(consultas),
+    }
+
+
+def tamanho_massa():
+    """Quantidades da massa gerada, para saber se dois relatórios são comparáveis"""
+    return {
+        'alunos': Usuario.objects.filter(username__startswith=PREFIXO, tipo='ALUNO').count(),
+        'turmas': Turma.objects.filter(professor__username__startswith=PREFIXO).count(),
+        'missoes': Missao.objects.filter(turma__professor__username__startswith=PREFIXO).count(),
+        'missoes_aluno': MissaoAluno.objects.filter(aluno__username__startswith=PREFIXO).count(),
+    }
+
+
+def executar(repeticoes=20, aquecimento=1, progresso=None):
+    """Relatório com a medida de cada cenário e as URLs sem cenário"""
+    avisar = progresso or (lambda mensagem: None)
+    lista = cenarios()
+
+    resultados = {}
+    for cenario in lista:
+        resultados[cenario.nome] = medida = medir(cenario, repeticoes, aquecimento)
+        avisar(f"  {cenario.nome}: p50 {medida['p50_ms']} ms, p95 {medida['p95_ms']} ms, {medida['consultas']} consultas")
+
+    medidas = {cenario.url_nome for cenario in lista}
+    return {
+        'gerado_em': timezone.now().isoformat(),
+        'repeticoes': repeticoes,
+        'massa': tamanho_massa(),
+        'urls': resultados,
+        'sem_cenario': [nome for nome in urls_cobertas() if nome not in medidas],
+    }
+
+
+def comparar(relatorio, baseline, tolerancia=0.25):
+    """
+    Anota em cada URL do relatório a diferença para o baseline e retorna a
+    lista de regressões: p95 acima de (1 + tolerancia) × p95 do baseline
+    (e pelo menos VARIACAO_MINIMA_MS mais lento), mais consultas que no
+    baseline ou status de erro novo.
+    """
+    regressoes = []
+    for nome, medida in relatorio['urls'].items():
+        anterior = baseline.get('urls', {}).get(nome)
+        if anterior is None:
+            continue
+
+        medida['baseline'] = {
+            'p95_ms': anterior['p95_ms'],
+            'consultas': anterior['consultas'],
+            'p95_variacao': round(medida['p95_ms'] / anterior['p95_ms'] - 1, 3) if anterior['p95_ms'] else None,
+        }
+
+        if medida['consultas'] > anterior['consultas']:
+            regressoes.append(f"{nome}: {anterior['consultas']} -> {medida['consultas']} consultas")
+        limite = max(anterior['p95_ms'] * (1 + tolerancia), anterior['p95_ms'] + VARIACAO_MINIMA_MS)
+        if medida['p95_ms'] > limite:
+            regressoes.append(f"{nome}: p95 {anterior['p95_ms']} -> {medida['p95_ms']} ms")
+        if max(medida['status']) >= 500 > max(anterior['status']):
+            regressoes.append(f"{nome}: status {medida['status']}")
+
+    relatorio['regressoes'] = regressoes
+    return regressoes
@@ -0,0 +1,72 @@
+"""
+Busca de missões por título e descrição
+
+No PostgreSQL usa a coluna tsvector Missao.busca (configuração portuguese,
+mantida por trigger) ordenada por relevância, e o índice trigram em
+Missao.texto_busca para trechos de palavras e erros de digitação.
+Em outros bancos (SQLite) faz um LIKE no texto normalizado, sem acentos.
+"""
+
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import BigIntegerField, F, Q
+from django.db.models.functions import Cast
+
+
+# A relevância vai no cursor da paginação: inteira (em milionésimos) para que
+# o empate "relevancia = valor AND id < x" compare valores exatos
+ESCALA_RELEVANCIA = 1_000_000
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'Ação' -> 'acao'"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def texto_busca(titulo, descricao):
+    """Valor de Missao.texto_busca"""
+    return normalizar(f'{titulo} {descricao}')
+
+
+def busca_ranqueada():
+    """Os resultados só vêm ordenados por relevância no PostgreSQL"""
+    return connection.vendor == 'postgresql'
+
+
+def buscar_missoes(queryset, termo, prefixo=''):
+    """
+    Filtra o queryset pelas missões que combinam com `termo`.
+
+    `prefixo` é o caminho até a Missao ('missao__' para MissaoAluno).
+    No PostgreSQL o queryset recebe a anotação `relevancia` (inteira,
+    ver ESCALA_RELEVANCIA).
+    """
+    termo = normalizar(termo).strip()
+    if not termo:
+        return queryset
+
+    campo_vetor = f'{prefixo}busca'
+    campo_texto = f'{prefixo}texto_busca'
+
+    if not busca_ranqueada():
+        palavras = Q()
+        for palavra in termo.split():
+            palavras &= Q(**{f'{campo_texto}__contains': palavra})
+        return queryset.filter(palavras)
+
+    consulta = SearchQuery(termo, config='portuguese', search_type='websearch')
+
+    return queryset.annotate(
+        relevancia=Cast(
+            (SearchRank(F(campo_vetor), consulta) + TrigramWordSimilarity(termo, campo_texto)) * ESCALA_RELEVANCIA,
+            BigIntegerField(),
+        ),
+    ).filter(
+        Q(**{campo_vetor: consulta}) |
+        Q(**{f'{campo_texto}__contains': termo}) |
+        # %> usa pg_trgm.word_similarity_threshold (0.6 por padrão)
+        Q(**{f'{campo_texto}__trigram_word_similar': termo})
+    )
@@ -0,0 +1,131 @@
+"""
+Teste de carga por HTTP (benchmark_asgi)
+
+Vários clientes simultâneos chamando a mesma URL de um servidor já no ar,
+cada um com a sua conexão keep-alive, durante alguns segundos. Serve para
+comparar o mesmo endpoint servido por ASGI (uvicorn, views async) e por
+WSGI (gunicorn com threads): vazão (requisições/s) e p50/p95/p99.
+
+Só biblioteca padrão (http.client + threads): o gerador de carga também
+disputa a CPU, então rode-o em outra máquina ou com núcleos sobrando, e
+compare os dois servidores sempre com os mesmos parâmetros.
+"""
+
+import http.client
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import reverse
+
+from .benchmark import percentil
+
+
+class ErroCarga(Exception):
+    pass
+
+
+class Conexao:
+    """Conexão keep-alive com os cookies da sessão"""
+
+    def __init__(self, base, timeout=30):
+        partes = urlsplit(base)
+        classe = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self.conexao = classe(partes.hostname, partes.port, timeout=timeout)
+        self.cookies = {}
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        cabecalhos = {}
+        if self.cookies:
+            cabecalhos['Cookie'] = '; '.join(f'{nome}={valor}' for nome, valor in self.cookies.items())
+        if corpo is not None:
+            corpo = urlencode(corpo)
+            cabecalhos['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        try:
+            self.conexao.request(metodo, caminho, corpo, cabecalhos)
+            resposta = self.conexao.getresponse()
+            resposta.read()
+        except (OSError, http.client.HTTPException):
+            # O servidor fechou a conexão: a próxima requisição reconecta
+            self.conexao.close()
+            raise
+
+        for cabecalho in resposta.headers.get_all('Set-Cookie') or []:
+            for nome, morsel in SimpleCookie(cabecalho).items():
+                self.cookies[nome] = morsel.value
+        return resposta.status
+
+    def entrar(self, usuario, senha):
+        """Login pelo formulário (GET para o cookie do CSRF, depois POST)"""
+        caminho = reverse('login')
+        self.requisitar('GET', caminho)
+        status = self.requisitar('POST', caminho, {
+            'username': usuario,
+            'password': senha,
+            'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+        })
+        if status != 302 or 'sessionid' not in self.cookies:
+            raise ErroCarga(f'Login de "{usuario}" falhou (status {status})')
+
+    def fechar(self):
+        self.conexao.close()
+
+
+def _cliente(conexao, caminho, inicio_medida, fim):
+    """Chama a URL até `fim`; retorna (latências em ms, erros) das chamadas após inicio_medida"""
+    tempos = []
+    erros = 0
+    while time.monotonic() < fim:
+        inicio = time.monotonic()
+        try:
+            status = conexao.requisitar('GET', caminho)
+        except (OSError, http.client.HTTPException):
+            status = None
+        if inicio < inicio_medida:
+            continue  # aquecimento
+        if status == 200:
+            tempos.append((time.monotonic() - inicio) * 1000)
+        else:
+            erros += 1
+    return tempos, erros
+
+
+def carga(base, caminho, usuario, senha, clientes=50, duracao=10, aquecimento=2):
+    """
+    `clientes` conexões logadas como `usuario` chamando `caminho` por
+    `duracao` segundos (mais `aquecimento` segundos descartados).
+    """
+    conexoes = []
+    try:
+        for _ in range(clientes):
+            conexao = Conexao(base)
+            conexoes.append(conexao)
+            conexao.entrar(usuario, senha)
+
+        inicio_medida = time.monotonic() + aquecimento
+        fim = inicio_medida + duracao
+        with ThreadPoolExecutor(max_workers=clientes) as executor:
+            resultados = list(executor.map(lambda conexao: _cliente(conexao, caminho, inicio_medida, fim), conexoes))
+    finally:
+        for conexao in conexoes:
+            conexao.fechar()
+
+    tempos = [tempo for tempos_cliente, _ in resultados for tempo in tempos_cliente]
+    erros = sum(erros_cliente for _, erros_cliente in resultados)
+    if not tempos:
+        raise ErroCarga(f'Nenhuma resposta 200 de {base}{caminho} ({erros} erros)')
+
+    return {
+        'base': base,
+        'caminho': caminho,
+        'clientes': clientes,
+        'duracao_s': duracao,
+        'requisicoes': len(tempos),
+        'erros': erros,
+        'req_s': round(len(tempos) / duracao, 1),
+        'p50_ms': round(percentil(tempos, 50), 2),
+        'p95_ms': round(percentil(tempos, 95), 2),
+        'p99_ms': round(percentil(tempos, 99), 2),
+    }
@@ -0,0 +1,115 @@
+"""
+Catálogos em cache: Disciplina, Badge e Turma
+
+Cada catálogo fica em memória no processo junto com a versão com que foi
+carregado. A versão atual fica no cache do Django (CACHES) e muda a cada
+post_save/post_delete do model, então todos os processos que usam o mesmo
+cache recarregam na próxima leitura. Sem mudanças, ler um catálogo não
+faz nenhuma consulta ao banco.
+"""
+
+import uuid
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+
+from .metricas import CACHE
+
+
+_catalogos = {}  # nome -> função que carrega os dados do banco
+_em_memoria = {}  # nome -> (versão, dados)
+
+
+def _chave_versao(nome):
+    return f'xp360:catalogo:{nome}:versao'
+
+
+def _versao_atual(nome):
+    chave = _chave_versao(nome)
+    versao = cache.get(chave)
+    if versao is None:
+        # Primeira leitura (ou o cache foi limpo): outro processo pode criar ao mesmo tempo
+        cache.add(chave, uuid.uuid4().hex, timeout=None)
+        versao = cache.get(chave)
+    return versao
+
+
+def catalogo(nome):
+    """Dados do catálogo `nome`, do banco só quando a versão mudou"""
+    versao = _versao_atual(nome)
+
+    em_memoria = _em_memoria.get(nome)
+    if em_memoria is not None and em_memoria[0] == versao:
+        CACHE.inc(cache=f'catalogo_{nome}', resultado='acerto')
+        return em_memoria[1]
+
+    CACHE.inc(cache=f'catalogo_{nome}', resultado='falha')
+    dados = _catalogos[nome]()
+    _em_memoria[nome] = (versao, dados)
+    return dados
+
+
+def invalidar(nome):
+    """Nova versão do catálogo: todos os processos recarregam na próxima leitura"""
+    _em_memoria.pop(nome, None)
+    cache.set(_chave_versao(nome), uuid.uuid4().hex, timeout=None)
+
+
+def registrar(nome, model):
+    """Decorator: registra a função de carga e invalida o catálogo quando `model` muda"""
+    def decorator(carregar):
+        _catalogos[nome] = carregar
+
+        def ao_mudar(**kwargs):
+            invalidar(nome)
+
+        post_save.connect(ao_mudar, sender=model, weak=False, dispatch_uid=f'catalogo_{nome}_save')
+        post_delete.connect(ao_mudar, sender=model, weak=False, dispatch_uid=f'catalogo_{nome}_delete')
+        return carregar
+    return decorator
+
+
+# ==========================================
+# CATÁLOGOS
+# ==========================================
+
+@registrar('disciplinas', 'core.Disciplina')
+def _carregar_disciplinas():
+    from .models import Disciplina
+    return list(Disciplina.objects.order_by('nome'))
+
+
+@registrar('turmas', 'core.Turma')
+def _carregar_turmas():
+    from .models import Turma
+    return list(Turma.objects.order_by('serie', 'nome'))
+
+
+@registrar('badges', 'accounts.Badge')
+def _carregar_badges():
+    from accounts.models import Badge
+
+    por_tipo = {tipo: [] for tipo, _ in Badge.TIPO_CHOICES}
+    for badge in Badge.objects.order_by('condicao_valor', 'ordem'):
+        por_tipo.setdefault(badge.tipo, []).append(badge)
+    return por_tipo
+
+
+def disciplinas():
+    """Todas as disciplinas, por nome"""
+    return catalogo('disciplinas')
+
+
+def disciplina(disciplina_id):
+    """Disciplina pelo id (None se não existir)"""
+    return next((d for d in disciplinas() if str(d.pk) == str(disciplina_id)), None)
+
+
+def turmas():
+    """Todas as turmas, por série e nome"""
+    return catalogo('turmas')
+
+
+def badges_por_tipo():
+    """{tipo: [badges em ordem de condicao_valor]}"""
+    return catalogo('badges')
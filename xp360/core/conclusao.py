@@ -0,0 +1,179 @@
+"""
+Conclusão de missões (tarefas e questões)
+
+Tudo acontece em uma transação: a MissaoAluno e o Usuario são travados com
+SELECT ... FOR UPDATE, o XP é somado no banco (xp_total = xp_total + N) e
+o extrato (XPEvento), os consolidados e os jobs da fila são gravados junto. Duas requisições para a
+mesma missão (clique duplo, duas abas) não dão XP duas vezes.
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import Usuario
+from accounts.painel import painel_alterado
+from .estatisticas import registrar_conclusao
+from .eventos_xp import registrar_evento
+from .fila import enfileirar
+from .metricas import XP_CONCEDIDO
+from .models import MissaoAluno, Alternativa
+
+
+@dataclass
+class ResultadoConclusao:
+    concluida: bool  # False se a missão já estava concluída (nada mudou)
+    xp_ganho: int = 0
+    acertou: bool = None  # None para tarefas
+    nivel: int = 1
+    subiu_nivel: bool = False
+    streak_anterior: int = 0
+    streak_atual: int = 0
+    novo_recorde: bool = False
+
+    def notificacao_streak(self):
+        """Dados do toast de streak ({'dias', 'tipo'}) ou None"""
+        if self.streak_atual > self.streak_anterior:
+            return {
+                'dias': self.streak_atual,
+                'tipo': 'novo_recorde' if self.novo_recorde else 'manteve',
+            }
+        if self.streak_anterior > 1 and self.streak_atual == 1:
+            return {'dias': self.streak_anterior, 'tipo': 'perdeu'}
+        return None
+
+
+def calcular_streak(ultima_missao, hoje, streak_atual, melhor_streak):
+    """Retorna (streak, melhor streak) depois de concluir uma missão hoje"""
+    if ultima_missao == hoje:
+        return streak_atual, melhor_streak
+
+    if ultima_missao == hoje - timedelta(days=1):
+        streak_atual += 1
+    else:
+        # Primeira missão ou mais de um dia sem missões
+        streak_atual = 1
+
+    return streak_atual, max(melhor_streak, streak_atual)
+
+
+def concluir_missao_aluno(aluno, missao_aluno_id, resposta=None):
+    """
+    Conclui a MissaoAluno do aluno. Para questões, `resposta` é a letra
+    escolhida e o XP só é dado se ela for a correta.
+
+    Levanta MissaoAluno.DoesNotExist se a missão não for do aluno.
+    """
+    hoje = timezone.localdate()
+
+    with transaction.atomic():
+        missao_aluno = (
+            MissaoAluno.objects.select_for_update(of=('self',))
+            .select_related('missao')
+            .get(pk=missao_aluno_id, aluno=aluno)
+        )
+
+        if missao_aluno.concluida:
+            return ResultadoConclusao(
+                concluida=False,
+                acertou=missao_aluno.acertou if missao_aluno.missao.tipo == 'QUESTAO' else None,
+                nivel=aluno.nivel,
+                streak_anterior=aluno.streak_atual,
+                streak_atual=aluno.streak_atual,
+            )
+
+        missao = missao_aluno.missao
+        questao = missao.tipo == 'QUESTAO'
+        campos = ['concluida', 'data_conclusao']
+
+        acertou = None
+        if questao:
+            correta = Alternativa.objects.filter(missao=missao, correta=True).values_list('ordem', flat=True).first()
+            acertou = resposta == correta
+            missao_aluno.resposta_escolhida = resposta
+            missao_aluno.acertou = acertou
+            campos += ['resposta_escolhida', 'acertou']
+
+        missao_aluno.concluida = True
+        missao_aluno.data_conclusao = hoje
+        missao_aluno.save(update_fields=campos)
+
+        # Estado atual do aluno, travado até o fim da transação
+        atual = Usuario.objects.select_for_update().values(
+            'xp_total', 'nivel', 'streak_atual', 'melhor_streak', 'ultima_missao_concluida'
+        ).get(pk=aluno.pk)
+
+        xp_ganho = missao.xp if not questao or acertou else 0
+        resultado = ResultadoConclusao(
+            concluida=True,
+            xp_ganho=xp_ganho,
+            acertou=acertou,
+            nivel=atual['nivel'],
+            streak_anterior=atual['streak_atual'],
+            streak_atual=atual['streak_atual'],
+        )
+
+        # Uma questão errada conclui a missão, mas não dá XP nem conta para o streak
+        if not questao or acertou:
+            xp_total = atual['xp_total'] + xp_ganho
+            resultado.nivel = (xp_total // 100) + 1
+            resultado.subiu_nivel = resultado.nivel > atual['nivel']
+
+            streak, melhor = calcular_streak(
+                atual['ultima_missao_concluida'], hoje, atual['streak_atual'], atual['melhor_streak']
+            )
+            resultado.streak_atual = streak
+            resultado.novo_recorde = streak > atual['melhor_streak']
+
+            Usuario.objects.filter(pk=aluno.pk).update(
+                xp_total=F('xp_total') + xp_ganho,
+                nivel=(F('xp_total') + xp_ganho) / 100 + 1,
+                streak_atual=streak,
+                melhor_streak=melhor,
+                ultima_missao_concluida=hoje,
+            )
+
+            # 🧾 Extrato de XP (fonte para replay_xp / reconcile_xp)
+            motivo = 'QUESTAO' if questao else 'TAREFA'
+            registrar_evento(missao_aluno, xp_ganho, motivo)
+            transaction.on_commit(lambda: XP_CONCEDIDO.inc(xp_ganho, motivo=motivo))
+
+            # Mantém o objeto da requisição igual ao banco
+            aluno.xp_total = xp_total
+            aluno.nivel = resultado.nivel
+            aluno.streak_atual = streak
+            aluno.melhor_streak = melhor
+            aluno.ultima_missao_concluida = hoje
+
+        # 📊 Consolidados do dashboard
+        registrar_conclusao(missao_aluno, xp_ganho)
+
+        # 🏆 Badges e ranking na fila (o job só fica visível se a transação confirmar)
+        if not questao:
+            evento = 'TAREFA_CONCLUIDA'
+        elif acertou:
+            evento = 'QUESTAO_CERTA'
+        else:
+            evento = 'QUESTAO_ERRADA'
+
+        enfileirar(
+            'avaliar_badges',
+            {'usuario_id': aluno.pk, 'evento': evento},
+            chave=f'avaliar_badges:{evento}:usuario:{aluno.pk}'
+        )
+
+        # Um job só: o worker descobre as turmas e agenda cada ranking
+        if xp_ganho:
+            enfileirar(
+                'xp_alterado',
+                {'usuario_id': aluno.pk},
+                chave=f'xp_alterado:usuario:{aluno.pk}'
+            )
+
+        # 📈 Dashboard em cache recalculado na próxima visita
+        transaction.on_commit(lambda: painel_alterado(aluno.pk))
+
+    return resultado
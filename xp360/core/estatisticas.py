@@ -0,0 +1,654 @@
+"""
+Consolidados de estatísticas dos alunos
+Mantidos de forma incremental quando uma missão é concluída e lidos pelos dashboards
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, Q, Sum, Count, Case, When, Exists, OuterRef, Subquery, Value
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.db.models.functions import Coalesce, Greatest, TruncWeek, TruncMonth
+from django.utils import timezone
+
+from accounts.models import Usuario
+from .models import Turma, Missao, MissaoAluno, XPDiario, DisciplinaAluno, ProgressoTurma, XPPeriodo
+
+
+# A partir de quantas missões detalhes_turma lê o progresso de ProgressoTurma
+# em vez de contar MissaoAluno na hora
+MISSOES_PARA_CONSOLIDADO_TURMA = 500
+
+# XP efetivamente ganho: tarefas sempre rendem XP, questões só quando acertadas
+XP_GANHO = Case(
+    When(Q(missao__tipo='QUESTAO') & Q(acertou=False), then=0),
+    default=F('missao__xp'),
+)
+
+
+def incrementar(model, chaves, **incrementos):
+    """
+    Soma os valores em uma linha de consolidado usando F(),
+    criando a linha se ela ainda não existir
+    """
+    expressoes = {campo: F(campo) + valor for campo, valor in incrementos.items()}
+
+    if model.objects.filter(**chaves).update(**expressoes):
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(**chaves, **incrementos)
+    except IntegrityError:
+        # Outra requisição criou a linha ao mesmo tempo
+        model.objects.filter(**chaves).update(**expressoes)
+
+
+def sql_insert_em_lote(model, linhas, conexao):
+    """
+    INSERT de várias linhas de `model` (dicts por attname; os campos que
+    faltam recebem o default do model), para completar com ON CONFLICT.
+    Retorna (sql, parâmetros).
+    """
+    nome = conexao.ops.quote_name
+    campos = [campo for campo in model._meta.concrete_fields if not campo.primary_key]
+
+    valores = []
+    for linha in linhas:
+        for campo in campos:
+            valor = linha[campo.attname] if campo.attname in linha else campo.get_default()
+            valores.append(campo.get_db_prep_save(valor, conexao))
+
+    marcadores = '(' + ', '.join(['%s'] * len(campos)) + ')'
+    sql = (
+        f"INSERT INTO {nome(model._meta.db_table)} ({', '.join(nome(campo.column) for campo in campos)}) "
+        f"VALUES {', '.join([marcadores] * len(linhas))}"
+    )
+    return sql, valores
+
+
+def _upsert_em_lote(model, chaves, linhas, conflito, onde, somar):
+    if not linhas:
+        return
+
+    conexao = connections[router.db_for_write(model)]
+    if conexao.vendor not in ('postgresql', 'sqlite'):
+        for linha in linhas:
+            filtro = {chave: linha[chave] for chave in chaves}
+            valores = {campo: valor for campo, valor in linha.items() if campo not in chaves}
+            if somar:
+                incrementar(model, filtro, **valores)
+            else:
+                model.objects.update_or_create(defaults=valores, **filtro)
+        return
+
+    nome = conexao.ops.quote_name
+    tabela = nome(model._meta.db_table)
+    colunas = [nome(model._meta.get_field(campo).column) for campo in linhas[0] if campo not in chaves]
+
+    sql, valores = sql_insert_em_lote(model, linhas, conexao)
+    sql += (
+        f" ON CONFLICT ({', '.join(nome(model._meta.get_field(chave).column) for chave in conflito or chaves)})"
+        f"{f' WHERE {onde}' if onde else ''} DO UPDATE SET "
+        + ', '.join(
+            f'{coluna} = {tabela}.{coluna} + excluded.{coluna}' if somar else f'{coluna} = excluded.{coluna}'
+            for coluna in colunas
+        )
+    )
+    with conexao.cursor() as cursor:
+        cursor.execute(sql, valores)
+
+
+def incrementar_em_lote(model, chaves, linhas, conflito=None, onde=None):
+    """
+    Soma os valores em várias linhas de consolidado com um único
+    INSERT ... ON CONFLICT DO UPDATE SET campo = campo + excluded.campo,
+    criando as linhas que não existem. `linhas` são dicts com as chaves e
+    os incrementos (os mesmos campos em todas). Num índice único parcial,
+    `conflito` são as colunas dele e `onde` a condição.
+    Sem ON CONFLICT no banco, cai em incrementar() linha a linha.
+    """
+    _upsert_em_lote(model, chaves, linhas, conflito, onde, somar=True)
+
+
+def gravar_em_lote(model, chaves, linhas, conflito=None, onde=None):
+    """
+    incrementar_em_lote() que substitui os valores (SET campo = excluded.campo)
+    em vez de somar. Sem ON CONFLICT no banco, cai em update_or_create().
+    """
+    _upsert_em_lote(model, chaves, linhas, conflito, onde, somar=False)
+
+
+def registrar_conclusao(missao_aluno, xp_ganho):
+    """
+    Atualiza os consolidados depois que uma missão foi concluída.
+    Deve ser chamada com missao_aluno.data_conclusao já preenchida.
+    """
+    missao = missao_aluno.missao
+    questao = missao.tipo == 'QUESTAO'
+    questoes_respondidas = 1 if questao else 0
+    acertos = 1 if questao and missao_aluno.acertou else 0
+
+    # Uma consulta por tabela, exista a linha ou não
+    incrementar_em_lote(XPDiario, ('aluno_id', 'data'), [{
+        'aluno_id': missao_aluno.aluno_id,
+        'data': missao_aluno.data_conclusao,
+        'xp': xp_ganho,
+        'missoes_concluidas': 1,
+        'questoes_respondidas': questoes_respondidas,
+        'acertos': acertos,
+    }])
+
+    atualizar_contadores(missao_aluno.aluno_id, questao, missao_aluno.acertou)
+
+    incrementar_em_lote(ProgressoTurma, ('turma_id', 'aluno_id'), [{
+        'turma_id': missao.turma_id,
+        'aluno_id': missao_aluno.aluno_id,
+        'concluidas': 1,
+        'xp': xp_ganho,
+    }])
+
+    if missao.disciplina_id:
+        incrementar_em_lote(DisciplinaAluno, ('aluno_id', 'disciplina_id'), [{
+            'aluno_id': missao_aluno.aluno_id,
+            'disciplina_id': missao.disciplina_id,
+            'concluidas': 1,
+            'xp': xp_ganho,
+            'questoes_respondidas': questoes_respondidas,
+            'acertos': acertos,
+        }])
+
+    if xp_ganho:
+        registrar_xp_periodos(
+            missao_aluno.aluno_id,
+            missao_aluno.data_conclusao,
+            missao.disciplina_id,
+            xp_ganho,
+        )
+
+
+def inicio_periodo(periodo, data):
+    """Primeiro dia da semana ISO (segunda-feira) ou do mês que contém `data`"""
+    if periodo == 'SEMANA':
+        return data - timedelta(days=data.weekday())
+    return data.replace(day=1)
+
+
+def registrar_xp_periodos(aluno_id, data, disciplina_id, xp):
+    """
+    Soma o XP nos baldes da semana e do mês (geral e da disciplina): uma
+    consulta para os baldes gerais e outra para os da disciplina
+    """
+    chaves = ('periodo', 'inicio', 'aluno_id', 'disciplina_id')
+    baldes = [
+        {'aluno_id': aluno_id, 'periodo': periodo, 'inicio': inicio_periodo(periodo, data), 'xp': xp}
+        for periodo in ('SEMANA', 'MES')
+    ]
+
+    # Os baldes gerais têm o índice único parcial (disciplina IS NULL)
+    coluna = XPPeriodo._meta.get_field('disciplina').column
+    incrementar_em_lote(
+        XPPeriodo,
+        chaves,
+        [{**balde, 'disciplina_id': None} for balde in baldes],
+        conflito=chaves[:-1],
+        onde=f'{coluna} IS NULL',
+    )
+    if disciplina_id:
+        incrementar_em_lote(XPPeriodo, chaves, [{**balde, 'disciplina_id': disciplina_id} for balde in baldes])
+
+
+def atualizar_contadores(aluno_id, questao, acertou):
+    """
+    Atualiza os contadores do Usuario em um único UPDATE com F().
+    Dentro do UPDATE as colunas têm o valor antigo, então o melhor
+    resultado é comparado com a sequência já incrementada.
+    """
+    campos = {'total_concluidas': F('total_concluidas') + 1}
+
+    if questao:
+        campos['total_questoes'] = F('total_questoes') + 1
+        if acertou:
+            campos['total_acertos'] = F('total_acertos') + 1
+            campos['acertos_seguidos'] = F('acertos_seguidos') + 1
+            campos['melhor_acertos_seguidos'] = Greatest(
+                F('melhor_acertos_seguidos'), F('acertos_seguidos') + 1
+            )
+        else:
+            campos['acertos_seguidos'] = 0
+
+    Usuario.objects.filter(pk=aluno_id).update(**campos)
+
+
+def registrar_atribuicoes(pares):
+    """
+    Soma as novas MissaoAluno em DisciplinaAluno.atribuidas.
+    `pares` é uma lista de (aluno_id, disciplina_id), um item por MissaoAluno criada.
+    """
+    contagem = Counter(par for par in pares if par[1] is not None)
+    if not contagem:
+        return
+
+    # Garante que todas as linhas existem antes de incrementar
+    DisciplinaAluno.objects.bulk_create(
+        [
+            DisciplinaAluno(aluno_id=aluno_id, disciplina_id=disciplina_id)
+            for aluno_id, disciplina_id in contagem
+        ],
+        ignore_conflicts=True,
+    )
+
+    # Um UPDATE por quantidade distinta (normalmente só um)
+    por_quantidade = defaultdict(lambda: defaultdict(list))
+    for (aluno_id, disciplina_id), quantidade in contagem.items():
+        por_quantidade[quantidade][disciplina_id].append(aluno_id)
+
+    for quantidade, por_disciplina in por_quantidade.items():
+        filtro = reduce(or_, [
+            Q(disciplina_id=disciplina_id, aluno_id__in=alunos_ids)
+            for disciplina_id, alunos_ids in por_disciplina.items()
+        ])
+        DisciplinaAluno.objects.filter(filtro).update(
+            atribuidas=F('atribuidas') + quantidade
+        )
+
+
+def _subtrair(linhas, historico, **totais):
+    """
+    Subtrai de cada linha de `linhas` os agregados de `historico` (MissaoAluno
+    correlacionadas com a linha por OuterRef), sem ficar abaixo de zero
+    """
+    def total(agregado):
+        return Coalesce(
+            Subquery(historico.order_by().values('aluno').annotate(total=agregado).values('total')),
+            Value(0),
+        )
+
+    linhas.filter(Exists(historico)).update(**{
+        campo: Greatest(F(campo) - total(agregado), Value(0))
+        for campo, agregado in totais.items()
+    })
+
+
+def descontar_missoes(missoes):
+    """
+    Tira dos consolidados as MissaoAluno das `missoes` (queryset de Missao)
+    antes de elas serem apagadas, com um UPDATE por tabela: as contagens de
+    DisciplinaAluno, XPDiario e dos contadores do Usuario e a contagem e o
+    XP de ProgressoTurma (o progresso na turma é o das missões que existem).
+
+    O XP de XPDiario, DisciplinaAluno e XPPeriodo e o xp_total continuam:
+    são totais de toda a vida do aluno, como o extrato (XPEvento), que
+    mantém os eventos das missões apagadas. As sequências (streak e
+    acertos_seguidos) também não voltam atrás.
+    Retorna os IDs dos alunos afetados.
+    """
+    apagadas = MissaoAluno.objects.filter(missao__in=missoes)
+    alunos_ids = list(apagadas.values_list('aluno_id', flat=True).distinct())
+    if not alunos_ids:
+        return []
+
+    concluidas = apagadas.filter(concluida=True)
+    questao = Q(missao__tipo='QUESTAO')
+    acerto = questao & Q(acertou=True)
+
+    _subtrair(
+        DisciplinaAluno.objects.filter(aluno_id__in=alunos_ids),
+        apagadas.filter(aluno=OuterRef('aluno'), missao__disciplina=OuterRef('disciplina')),
+        atribuidas=Count('id'),
+        concluidas=Count('id', filter=Q(concluida=True)),
+        questoes_respondidas=Count('id', filter=Q(concluida=True) & questao),
+        acertos=Count('id', filter=Q(concluida=True) & acerto),
+    )
+    _subtrair(
+        ProgressoTurma.objects.filter(aluno_id__in=alunos_ids),
+        concluidas.filter(aluno=OuterRef('aluno'), missao__turma=OuterRef('turma')),
+        concluidas=Count('id'),
+        xp=Sum(XP_GANHO),
+    )
+    _subtrair(
+        XPDiario.objects.filter(aluno_id__in=alunos_ids),
+        concluidas.filter(aluno=OuterRef('aluno'), data_conclusao=OuterRef('data')),
+        missoes_concluidas=Count('id'),
+        questoes_respondidas=Count('id', filter=questao),
+        acertos=Count('id', filter=acerto),
+    )
+    _subtrair(
+        Usuario.objects.filter(pk__in=alunos_ids),
+        concluidas.filter(aluno=OuterRef('pk')),
+        total_concluidas=Count('id'),
+        total_questoes=Count('id', filter=questao),
+        total_acertos=Count('id', filter=acerto),
+    )
+    return alunos_ids
+
+
+def _missoes_apagadas(missoes):
+    from accounts.painel import painel_alterado
+
+    alunos_ids = descontar_missoes(missoes)
+    if alunos_ids:
+        transaction.on_commit(lambda: painel_alterado(*alunos_ids))
+
+
+@receiver(pre_delete, sender=Turma, dispatch_uid='estatisticas_turma_apagada')
+def turma_apagada(sender, instance, **kwargs):
+    # Todas as missões da turma de uma vez (em vez de uma por missão)
+    _missoes_apagadas(Missao.objects.filter(turma=instance))
+
+
+@receiver(pre_delete, sender=Missao, dispatch_uid='estatisticas_missao_apagada')
+def missao_apagada(sender, instance, origin=None, **kwargs):
+    # Apagada junto com a turma: já descontada em turma_apagada
+    if isinstance(origin, Missao) or getattr(origin, 'model', None) is Missao:
+        _missoes_apagadas(Missao.objects.filter(pk=instance.pk))
+
+
+# ==========================================
+# LEITURAS PARA OS DASHBOARDS
+# ==========================================
+
+def xp_ultimos_dias(usuario, dias=7):
+    """
+    Retorna (rótulos, xp por dia) dos últimos `dias` dias, em uma única consulta
+    """
+    hoje = timezone.localdate()
+    inicio = hoje - timedelta(days=dias - 1)
+
+    xp_por_data = dict(
+        XPDiario.objects.filter(
+            aluno=usuario,
+            data__range=(inicio, hoje)
+        ).values_list('data', 'xp')
+    )
+
+    rotulos = []
+    valores = []
+    for i in range(dias):
+        data = inicio + timedelta(days=i)
+        rotulos.append(data.strftime('%d/%m'))
+        valores.append(xp_por_data.get(data, 0))
+
+    return rotulos, valores
+
+
+def totais_questoes(usuario):
+    """Retorna (questões respondidas, acertos) somando o consolidado diário"""
+    totais = XPDiario.objects.filter(aluno=usuario).aggregate(
+        questoes=Sum('questoes_respondidas'),
+        acertos=Sum('acertos'),
+    )
+    return totais['questoes'] or 0, totais['acertos'] or 0
+
+
+def progresso_disciplinas(usuario):
+    """Linhas de DisciplinaAluno do aluno, com a disciplina, em uma única consulta"""
+    return list(
+        DisciplinaAluno.objects.filter(aluno=usuario)
+        .select_related('disciplina')
+        .order_by('disciplina__nome')
+    )
+
+
+def progresso_alunos_turma(turma, total_missoes):
+    """
+    Alunos da turma com `missoes_concluidas` anotado, ordenados por XP,
+    em uma única consulta. Turmas grandes leem o consolidado ProgressoTurma.
+    """
+    alunos = turma.alunos.all()
+
+    if total_missoes >= MISSOES_PARA_CONSOLIDADO_TURMA:
+        concluidas = Coalesce(
+            Subquery(
+                ProgressoTurma.objects.filter(turma=turma, aluno=OuterRef('pk')).values('concluidas')[:1]
+            ),
+            Value(0),
+        )
+    else:
+        concluidas = Count(
+            'missaoaluno',
+            filter=Q(missaoaluno__concluida=True, missaoaluno__missao__turma=turma),
+        )
+
+    return alunos.annotate(missoes_concluidas=concluidas).order_by('-xp_total', 'username')
+
+
+# ==========================================
+# RECONSTRUÇÃO A PARTIR DO HISTÓRICO
+# ==========================================
+
+def consolidado_diario_historico(alunos_ids=None):
+    """
+    Agrega o histórico de MissaoAluno por (aluno, dia), no mesmo formato de XPDiario
+    """
+    missoes = MissaoAluno.objects.filter(concluida=True, data_conclusao__isnull=False)
+    if alunos_ids is not None:
+        missoes = missoes.filter(aluno_id__in=alunos_ids)
+
+    return missoes.values('aluno_id', 'data_conclusao').annotate(
+        xp=Sum(XP_GANHO),
+        missoes_concluidas=Count('id'),
+        questoes_respondidas=Count('id', filter=Q(missao__tipo='QUESTAO')),
+        acertos=Count('id', filter=Q(missao__tipo='QUESTAO', acertou=True)),
+    ).order_by('aluno_id', 'data_conclusao')
+
+
+def recriar_consolidado(model, consultas, criar, alunos_ids=None, lote=1000):
+    """
+    Apaga as linhas de `model` dos alunos (todas, sem alunos_ids) e cria
+    uma para cada linha das `consultas` (querysets de .values(), ou uma
+    lista deles), convertida por `criar`, com bulk_create em lotes.
+    Tudo em uma transação. Retorna o número de linhas criadas.
+    """
+    if not isinstance(consultas, (list, tuple)):
+        consultas = [consultas]
+
+    criadas = 0
+
+    with transaction.atomic():
+        existentes = model.objects.all()
+        if alunos_ids is not None:
+            existentes = existentes.filter(aluno_id__in=alunos_ids)
+        existentes.delete()
+
+        buffer = []
+        for consulta in consultas:
+            for linha in consulta.iterator(chunk_size=lote):
+                buffer.append(criar(linha))
+                if len(buffer) >= lote:
+                    model.objects.bulk_create(buffer)
+                    criadas += len(buffer)
+                    buffer = []
+
+        if buffer:
+            model.objects.bulk_create(buffer)
+            criadas += len(buffer)
+
+    return criadas
+
+
+def reconstruir_xp_diario(alunos_ids=None, lote=1000):
+    """
+    Apaga e recria o consolidado diário a partir de MissaoAluno.
+    Retorna o número de linhas criadas.
+    """
+    return recriar_consolidado(
+        XPDiario,
+        consolidado_diario_historico(alunos_ids),
+        lambda linha: XPDiario(
+            aluno_id=linha['aluno_id'],
+            data=linha['data_conclusao'],
+            xp=linha['xp'] or 0,
+            missoes_concluidas=linha['missoes_concluidas'],
+            questoes_respondidas=linha['questoes_respondidas'],
+            acertos=linha['acertos'],
+        ),
+        alunos_ids,
+        lote,
+    )
+
+
+def reconstruir_disciplinas(alunos_ids=None, lote=1000):
+    """
+    Apaga e recria DisciplinaAluno a partir de MissaoAluno.
+    Retorna o número de linhas criadas.
+    """
+    missoes = MissaoAluno.objects.filter(missao__disciplina__isnull=False)
+    if alunos_ids is not None:
+        missoes = missoes.filter(aluno_id__in=alunos_ids)
+
+    concluida = Q(concluida=True)
+    questao = Q(concluida=True, missao__tipo='QUESTAO')
+    linhas = missoes.values('aluno_id', 'missao__disciplina_id').annotate(
+        atribuidas=Count('id'),
+        concluidas=Count('id', filter=concluida),
+        xp=Sum(XP_GANHO, filter=concluida),
+        questoes_respondidas=Count('id', filter=questao),
+        acertos=Count('id', filter=questao & Q(acertou=True)),
+    ).order_by('aluno_id', 'missao__disciplina_id')
+
+    return recriar_consolidado(
+        DisciplinaAluno,
+        linhas,
+        lambda linha: DisciplinaAluno(
+            aluno_id=linha['aluno_id'],
+            disciplina_id=linha['missao__disciplina_id'],
+            atribuidas=linha['atribuidas'],
+            concluidas=linha['concluidas'],
+            xp=linha['xp'] or 0,
+            questoes_respondidas=linha['questoes_respondidas'],
+            acertos=linha['acertos'],
+        ),
+        alunos_ids,
+        lote,
+    )
+
+
+def reconstruir_turmas(alunos_ids=None, lote=1000):
+    """
+    Apaga e recria ProgressoTurma a partir de MissaoAluno.
+    Retorna o número de linhas criadas.
+    """
+    missoes = MissaoAluno.objects.filter(concluida=True)
+    if alunos_ids is not None:
+        missoes = missoes.filter(aluno_id__in=alunos_ids)
+
+    linhas = missoes.values('aluno_id', 'missao__turma_id').annotate(
+        concluidas=Count('id'),
+        xp=Sum(XP_GANHO),
+    ).order_by('aluno_id', 'missao__turma_id')
+
+    return recriar_consolidado(
+        ProgressoTurma,
+        linhas,
+        lambda linha: ProgressoTurma(
+            turma_id=linha['missao__turma_id'],
+            aluno_id=linha['aluno_id'],
+            concluidas=linha['concluidas'],
+            xp=linha['xp'] or 0,
+        ),
+        alunos_ids,
+        lote,
+    )
+
+
+def baldes_xp_periodo(linhas, campo_data, campo_disciplina, xp):
+    """
+    Consultas de XPPeriodo (semana e mês, geral e por disciplina) sobre
+    `linhas` (MissaoAluno ou XPEvento), com `xp` somado em cada balde
+    """
+    consultas = []
+    for periodo, truncar in (('SEMANA', TruncWeek), ('MES', TruncMonth)):
+        baldes = linhas.annotate(inicio=truncar(campo_data))
+        for agrupadas in (
+            baldes.values('aluno_id', 'inicio'),
+            baldes.filter(**{f'{campo_disciplina}__isnull': False}).values('aluno_id', 'inicio', campo_disciplina),
+        ):
+            consultas.append(
+                agrupadas.annotate(total=Sum(xp), periodo=Value(periodo))
+                .filter(total__gt=0)
+                .order_by()
+            )
+    return consultas
+
+
+def linha_xp_periodo(campo_disciplina):
+    """Converte uma linha de baldes_xp_periodo em XPPeriodo"""
+    return lambda linha: XPPeriodo(
+        aluno_id=linha['aluno_id'],
+        periodo=linha['periodo'],
+        inicio=linha['inicio'],
+        disciplina_id=linha.get(campo_disciplina),
+        xp=linha['total'],
+    )
+
+
+def reconstruir_periodos(alunos_ids=None, lote=1000):
+    """
+    Apaga e recria XPPeriodo (semanas e meses, geral e por disciplina)
+    a partir de MissaoAluno. Retorna o número de linhas criadas.
+    """
+    missoes = MissaoAluno.objects.filter(concluida=True, data_conclusao__isnull=False)
+    if alunos_ids is not None:
+        missoes = missoes.filter(aluno_id__in=alunos_ids)
+
+    return recriar_consolidado(
+        XPPeriodo,
+        baldes_xp_periodo(missoes, 'data_conclusao', 'missao__disciplina_id', XP_GANHO),
+        linha_xp_periodo('missao__disciplina_id'),
+        alunos_ids,
+        lote,
+    )
+
+
+def _contagem(filtro):
+    """Subquery correlacionada com a contagem de MissaoAluno do aluno"""
+    return Coalesce(
+        Subquery(
+            MissaoAluno.objects.filter(filtro, aluno=OuterRef('pk'))
+            .order_by()
+            .values('aluno')
+            .annotate(total=Count('id'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def recalcular_contadores(alunos_ids):
+    """
+    Reconstrói os contadores de um grupo de alunos a partir de MissaoAluno:
+    um UPDATE com subqueries para os totais e uma leitura ordenada das
+    questões para as sequências de acertos.
+    """
+    concluida = Q(concluida=True)
+    questao = Q(concluida=True, missao__tipo='QUESTAO')
+
+    Usuario.objects.filter(pk__in=alunos_ids).update(
+        total_concluidas=_contagem(concluida),
+        total_questoes=_contagem(questao),
+        total_acertos=_contagem(questao & Q(acertou=True)),
+    )
+
+    sequencias = {aluno_id: [0, 0] for aluno_id in alunos_ids}  # [atual, melhor]
+    respostas = MissaoAluno.objects.filter(
+        questao,
+        aluno_id__in=alunos_ids,
+    ).order_by('aluno_id', 'data_conclusao', 'id').values_list('aluno_id', 'acertou')
+
+    for aluno_id, acertou in respostas.iterator(chunk_size=2000):
+        sequencia = sequencias[aluno_id]
+        sequencia[0] = sequencia[0] + 1 if acertou else 0
+        sequencia[1] = max(sequencia[1], sequencia[0])
+
+    Usuario.objects.bulk_update(
+        [
+            Usuario(pk=aluno_id, acertos_seguidos=atual, melhor_acertos_seguidos=melhor)
+            for aluno_id, (atual, melhor) in sequencias.items()
+        ],
+        ['acertos_seguidos', 'melhor_acertos_seguidos'],
+    )
@@ -0,0 +1,172 @@
+"""
+Extrato de XP (XPEvento)
+
+Cada XP concedido é registrado em XPEvento. A partir do extrato é possível
+reconstruir xp_total, nível, streak e os consolidados de XP de cada aluno
+(replay_xp) e encontrar alunos cujos contadores divergem (reconcile_xp).
+As duas operações trabalham em lotes de alunos e só usam consultas
+agregadas no banco, então a memória não cresce com o número de eventos.
+"""
+
+from django.db.models import F, Q, Sum, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from accounts.models import Usuario
+from .estatisticas import recriar_consolidado, baldes_xp_periodo, linha_xp_periodo, gravar_em_lote
+from .models import XPEvento, XPDiario, XPPeriodo, DisciplinaAluno, ProgressoTurma
+
+
+def registrar_evento(missao_aluno, xp, motivo):
+    """Acrescenta ao extrato o XP ganho em uma missão (dentro da transação da conclusão)"""
+    missao = missao_aluno.missao
+    return XPEvento.objects.create(
+        aluno_id=missao_aluno.aluno_id,
+        missao=missao,
+        missao_aluno=missao_aluno,
+        disciplina_id=missao.disciplina_id,
+        xp=xp,
+        motivo=motivo,
+        data=missao_aluno.data_conclusao,
+    )
+
+
+def xp_do_extrato(**filtros):
+    """Subquery com a soma do extrato do aluno (OuterRef('pk')), 0 se não houver eventos"""
+    return Coalesce(
+        Subquery(
+            XPEvento.objects.filter(aluno=OuterRef('pk'), **filtros)
+            .order_by()
+            .values('aluno')
+            .annotate(total=Sum('xp'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def lotes_de_alunos(lote=1000, alunos_ids=None):
+    """Gera listas de IDs de alunos em ordem (keyset pela pk)"""
+    alunos = Usuario.objects.filter(tipo='ALUNO').order_by('pk')
+    if alunos_ids is not None:
+        alunos = alunos.filter(pk__in=alunos_ids)
+
+    ultimo_id = 0
+    while True:
+        ids = list(alunos.filter(pk__gt=ultimo_id).values_list('pk', flat=True)[:lote])
+        if not ids:
+            return
+        yield ids
+        ultimo_id = ids[-1]
+
+
+# ==========================================
+# REPLAY
+# ==========================================
+
+def reaplicar_xp(alunos_ids):
+    """xp_total e nível a partir do extrato, em um único UPDATE"""
+    xp = xp_do_extrato()
+    Usuario.objects.filter(pk__in=alunos_ids).update(
+        xp_total=xp,
+        nivel=xp / 100 + 1,
+    )
+
+
+def reaplicar_streaks(alunos_ids):
+    """
+    streak_atual, melhor_streak e ultima_missao_concluida percorrendo os dias
+    distintos com XP de cada aluno, em ordem
+    """
+    from .conclusao import calcular_streak
+
+    # [streak, melhor, último dia]
+    streaks = {aluno_id: [0, 0, None] for aluno_id in alunos_ids}
+
+    dias = (
+        XPEvento.objects.filter(aluno_id__in=alunos_ids, motivo__in=('TAREFA', 'QUESTAO'))
+        .values_list('aluno_id', 'data')
+        .distinct()
+        .order_by('aluno_id', 'data')
+    )
+    for aluno_id, data in dias.iterator(chunk_size=5000):
+        streak = streaks[aluno_id]
+        streak[0], streak[1] = calcular_streak(streak[2], data, streak[0], streak[1])
+        streak[2] = data
+
+    Usuario.objects.bulk_update(
+        [
+            Usuario(pk=aluno_id, streak_atual=atual, melhor_streak=melhor, ultima_missao_concluida=ultima)
+            for aluno_id, (atual, melhor, ultima) in streaks.items()
+        ],
+        ['streak_atual', 'melhor_streak', 'ultima_missao_concluida'],
+    )
+
+
+def _gravar_do_extrato(model, chaves, agrupar, alunos_ids, lote):
+    """
+    Zera o XP das linhas de `model` dos alunos e grava a soma do extrato
+    agrupada por `agrupar` (campos de XPEvento, na ordem de `chaves`),
+    criando as linhas que faltam, em lotes de `lote` linhas
+    """
+    model.objects.filter(aluno_id__in=alunos_ids).update(xp=0)
+
+    somas = (
+        XPEvento.objects.filter(aluno_id__in=alunos_ids)
+        .filter(**{f'{campo}__isnull': False for campo in agrupar})
+        .values(*agrupar)
+        .annotate(total=Sum('xp'))
+        .order_by(*agrupar)
+        .values_list(*agrupar, 'total')
+    )
+
+    linhas = []
+    for *valores, total in somas.iterator(chunk_size=lote):
+        linhas.append({**dict(zip(chaves, valores)), 'xp': total})
+        if len(linhas) >= lote:
+            gravar_em_lote(model, chaves, linhas)
+            linhas = []
+    gravar_em_lote(model, chaves, linhas)
+
+
+def reaplicar_consolidados(alunos_ids, lote=1000):
+    """
+    XP de XPDiario, DisciplinaAluno e ProgressoTurma e baldes de XPPeriodo
+    a partir do extrato (chamar dentro da transação do lote). Linhas que
+    faltam são recriadas com o XP do extrato; as contagens delas (missões,
+    questões, acertos) não estão no extrato: use rebuild_estatisticas.
+    """
+    lote = min(lote, 500)  # parâmetros por INSERT (o SQLite aceita no máximo 32766)
+    _gravar_do_extrato(XPDiario, ('aluno_id', 'data'), ('aluno_id', 'data'), alunos_ids, lote)
+    _gravar_do_extrato(
+        DisciplinaAluno, ('aluno_id', 'disciplina_id'), ('aluno_id', 'disciplina_id'), alunos_ids, lote,
+    )
+    _gravar_do_extrato(
+        ProgressoTurma, ('aluno_id', 'turma_id'), ('aluno_id', 'missao__turma_id'), alunos_ids, lote,
+    )
+
+    recriar_consolidado(
+        XPPeriodo,
+        baldes_xp_periodo(XPEvento.objects.filter(aluno_id__in=alunos_ids), 'data', 'disciplina_id', 'xp'),
+        linha_xp_periodo('disciplina_id'),
+        alunos_ids,
+        lote,
+    )
+
+
+# ==========================================
+# RECONCILIAÇÃO
+# ==========================================
+
+def divergencias(alunos_ids):
+    """
+    Alunos do lote cujo xp_total ou nível não batem com o extrato.
+    Retorna [(id, username, xp_total, xp do extrato, nivel, nível esperado)].
+    """
+    return list(
+        Usuario.objects.filter(pk__in=alunos_ids)
+        .annotate(xp_extrato=xp_do_extrato())
+        .annotate(nivel_extrato=F('xp_extrato') / 100 + 1)
+        .filter(~Q(xp_total=F('xp_extrato')) | ~Q(nivel=F('nivel_extrato')))
+        .order_by('pk')
+        .values_list('pk', 'username', 'xp_total', 'xp_extrato', 'nivel', 'nivel_extrato')
+    )
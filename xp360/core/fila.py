@@ -0,0 +1,232 @@
+"""
+Fila de tarefas em segundo plano guardada no banco de dados
+As requisições só enfileiram; o comando run_xp360_worker executa os jobs
+"""
+
+import logging
+import random
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .metricas import JOBS
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Tarefas registradas: nome -> função(**payload)
+_TAREFAS = {}
+
+# Espera entre tentativas: BACKOFF_BASE * 2^(tentativa - 1), limitado a BACKOFF_MAXIMO
+BACKOFF_BASE = 5  # segundos
+BACKOFF_MAXIMO = 15 * 60
+
+# Enquanto um lote reservado não termina, o worker renova batimento_em dos
+# jobs a cada INTERVALO_BATIMENTO segundos; recuperar_travados() só devolve
+# jobs sem batimento há mais que o timeout (worker morto), nunca um job longo
+INTERVALO_BATIMENTO = 60
+
+
+def tarefa(nome):
+    """Decorator que registra uma função como tarefa da fila"""
+    def registrar(funcao):
+        _TAREFAS[nome] = funcao
+        return funcao
+    return registrar
+
+
+def fila_sincrona():
+    """No modo síncrono (desenvolvimento/testes) as tarefas rodam na hora"""
+    return getattr(settings, 'XP360_FILA_SINCRONA', False)
+
+
+def enfileirar(nome, payload=None, chave=None, atraso=0, max_tentativas=5):
+    """
+    Coloca uma tarefa na fila e retorna o Job criado.
+
+    Se `chave` for informada e já existir um job pendente com a mesma chave,
+    nada é criado e retorna None.
+    """
+    if nome not in _TAREFAS:
+        raise ValueError(f"Tarefa não registrada: {nome}")
+
+    payload = payload or {}
+
+    if fila_sincrona():
+        _TAREFAS[nome](**payload)
+        return None
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                tarefa=nome,
+                payload=payload,
+                chave_idempotencia=chave,
+                max_tentativas=max_tentativas,
+                executar_apos=timezone.now() + timedelta(seconds=atraso),
+            )
+    except IntegrityError:
+        # Já existe um job pendente com essa chave
+        return None
+
+
+def calcular_backoff(tentativas):
+    """Segundos até a próxima tentativa (exponencial com jitter)"""
+    espera = min(BACKOFF_BASE * (2 ** max(tentativas - 1, 0)), BACKOFF_MAXIMO)
+    return espera + random.uniform(0, espera / 4)
+
+
+def reservar(lote=10):
+    """
+    Reserva até `lote` jobs prontos para execução.
+    Usa SELECT ... FOR UPDATE SKIP LOCKED, então vários workers podem
+    reservar ao mesmo tempo sem pegar o mesmo job.
+    """
+    agora = timezone.now()
+
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDENTE', executar_apos__lte=agora)
+            .order_by('executar_apos', 'id')[:lote]
+        )
+        if not jobs:
+            return []
+
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status='EXECUTANDO',
+            iniciado_em=agora,
+            batimento_em=agora,
+            tentativas=F('tentativas') + 1,
+        )
+
+    for job in jobs:
+        job.status = 'EXECUTANDO'
+        job.iniciado_em = agora
+        job.batimento_em = agora
+        job.tentativas += 1
+
+    return jobs
+
+
+def renovar(jobs_ids):
+    """Marca os jobs reservados (ainda EXECUTANDO) como vivos agora"""
+    return Job.objects.filter(pk__in=jobs_ids, status='EXECUTANDO').update(batimento_em=timezone.now())
+
+
+@contextmanager
+def batimento(jobs_ids, intervalo=INTERVALO_BATIMENTO):
+    """
+    Renova os jobs em uma thread (com a sua própria conexão) a cada
+    `intervalo` segundos enquanto o bloco executa
+    """
+    parar = threading.Event()
+
+    def bater():
+        try:
+            while not parar.wait(intervalo):
+                try:
+                    renovar(jobs_ids)
+                except DatabaseError:
+                    # Banco ocupado: tenta de novo no próximo batimento
+                    logger.warning("Falha ao renovar os jobs %s", jobs_ids, exc_info=True)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=bater, name='xp360-batimento', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        thread.join()
+
+
+def executar(job):
+    """Executa um job reservado e registra o resultado. Retorna True se deu certo."""
+    funcao = _TAREFAS.get(job.tarefa)
+
+    try:
+        if funcao is None:
+            raise LookupError(f"Tarefa não registrada: {job.tarefa}")
+        # Atômico para que uma falha não deixe trabalho pela metade antes da nova tentativa
+        with transaction.atomic():
+            funcao(**job.payload)
+
+    except Exception:
+        erro = traceback.format_exc()
+
+        if job.tentativas >= job.max_tentativas or funcao is None:
+            Job.objects.filter(pk=job.pk).update(
+                status='FALHOU',
+                concluido_em=timezone.now(),
+                erro=erro,
+            )
+            JOBS.inc(tarefa=job.tarefa, resultado='falhou')
+            return False
+
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(
+                    status='PENDENTE',
+                    executar_apos=timezone.now() + timedelta(seconds=calcular_backoff(job.tentativas)),
+                    erro=erro,
+                )
+        except IntegrityError:
+            # Já existe outro job pendente com a mesma chave: ele fará o trabalho
+            Job.objects.filter(pk=job.pk).update(
+                status='CONCLUIDO',
+                concluido_em=timezone.now(),
+                erro=erro,
+            )
+        JOBS.inc(tarefa=job.tarefa, resultado='nova_tentativa')
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status='CONCLUIDO',
+        concluido_em=timezone.now(),
+        erro='',
+    )
+    JOBS.inc(tarefa=job.tarefa, resultado='concluido')
+    return True
+
+
+def recuperar_travados(timeout=600):
+    """
+    Devolve para a fila jobs EXECUTANDO sem batimento há mais de `timeout`
+    segundos (worker morto no meio do lote). Retorna quantos foram recuperados.
+    """
+    limite = timezone.now() - timedelta(seconds=timeout)
+    recuperados = 0
+
+    travados = Job.objects.filter(status='EXECUTANDO', batimento_em__lt=limite)
+    for job in travados:
+        try:
+            with transaction.atomic():
+                recuperados += Job.objects.filter(pk=job.pk, status='EXECUTANDO', batimento_em__lt=limite).update(
+                    status='PENDENTE',
+                    executar_apos=timezone.now(),
+                )
+        except IntegrityError:
+            Job.objects.filter(pk=job.pk).update(status='CONCLUIDO', concluido_em=timezone.now())
+
+    return recuperados
+
+
+def processar(lote=10):
+    """Reserva e executa um lote de jobs. Retorna quantos foram executados."""
+    jobs = reservar(lote)
+    if not jobs:
+        return 0
+
+    with batimento([job.pk for job in jobs]):
+        for job in jobs:
+            executar(job)
+    return len(jobs)
@@ -0,0 +1,100 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from accounts.models import Usuario
+from core.carga import ErroCarga, carga
+from core.massa_dados import PREFIXO, SENHA
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão e a latência de um endpoint sob clientes simultâneos servido por ASGI e por WSGI. '
+        'Suba antes os dois servidores sobre o mesmo banco, por exemplo: '
+        '"uvicorn xp360.asgi:application --port 8001 --workers 2" e '
+        '"gunicorn xp360.wsgi --port 8000 --workers 2 --threads 8"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--asgi',
+            default='http://127.0.0.1:8001',
+            help='URL base do servidor ASGI (uvicorn)'
+        )
+        parser.add_argument(
+            '--wsgi',
+            default='http://127.0.0.1:8000',
+            help='URL base do servidor WSGI (gunicorn); vazio para medir só o ASGI'
+        )
+        parser.add_argument(
+            '--caminho',
+            help='Caminho chamado pelos clientes (padrão: API de histórico do aluno)'
+        )
+        parser.add_argument(
+            '--usuario',
+            help=f'Usuário dos clientes (padrão: o primeiro aluno "{PREFIXO}*" de seed_xp360)'
+        )
+        parser.add_argument(
+            '--senha',
+            default=SENHA,
+            help='Senha do usuário'
+        )
+        parser.add_argument(
+            '--clientes',
+            type=int,
+            default=50,
+            help='Clientes simultâneos (uma conexão keep-alive cada)'
+        )
+        parser.add_argument(
+            '--duracao',
+            type=int,
+            default=10,
+            help='Segundos medidos em cada servidor'
+        )
+        parser.add_argument(
+            '--aquecimento',
+            type=int,
+            default=2,
+            help='Segundos iniciais descartados'
+        )
+
+    def handle(self, *args, **options):
+        if options['clientes'] < 1 or options['duracao'] < 1:
+            raise CommandError('--clientes e --duracao precisam ser pelo menos 1')
+
+        usuario = options['usuario']
+        if not usuario:
+            usuario = (
+                Usuario.objects.filter(username__startswith=PREFIXO, tipo='ALUNO')
+                .order_by('pk').values_list('username', flat=True).first()
+            )
+            if usuario is None:
+                raise CommandError('Nenhuma massa de dados encontrada. Rode antes: manage.py seed_xp360 --scale N')
+        caminho = options['caminho'] or reverse('api_historico_aluno')
+
+        servidores = {'asgi': options['asgi'], 'wsgi': options['wsgi']}
+        relatorio = {}
+        for nome, base in servidores.items():
+            if not base:
+                continue
+            self.stderr.write(f"  {nome}: {options['clientes']} clientes em {base}{caminho}...")
+            try:
+                relatorio[nome] = medida = carga(
+                    base, caminho, usuario, options['senha'],
+                    clientes=options['clientes'],
+                    duracao=options['duracao'],
+                    aquecimento=options['aquecimento'],
+                )
+            except (ErroCarga, OSError) as erro:
+                raise CommandError(f'{nome} ({base}): {erro}')
+            self.stderr.write(
+                f"  {nome}: {medida['req_s']} req/s, p50 {medida['p50_ms']} ms, "
+                f"p95 {medida['p95_ms']} ms, p99 {medida['p99_ms']} ms, {medida['erros']} erros"
+            )
+
+        if 'asgi' in relatorio and 'wsgi' in relatorio:
+            relatorio['asgi_sobre_wsgi'] = round(relatorio['asgi']['req_s'] / relatorio['wsgi']['req_s'], 2)
+
+        self.stdout.write(json.dumps(relatorio, ensure_ascii=False, indent=2))
+        self.stderr.write(self.style.SUCCESS(f"✅ {len(relatorio) - ('asgi_sobre_wsgi' in relatorio)} servidores medidos"))
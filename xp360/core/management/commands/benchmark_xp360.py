@@ -0,0 +1,89 @@
+import json
+import sys
+from contextlib import redirect_stdout
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.benchmark import comparar, executar
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede p50/p95/p99 e consultas de cada URL de accounts e core sobre a massa de '
+        'seed_xp360 e compara com um relatório anterior (baseline)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeticoes',
+            type=int,
+            default=20,
+            help='Chamadas medidas por URL'
+        )
+        parser.add_argument(
+            '--aquecimento',
+            type=int,
+            default=1,
+            help='Chamadas descartadas antes das medidas (caches frios)'
+        )
+        parser.add_argument(
+            '--saida',
+            help='Arquivo onde gravar o relatório JSON (padrão: só na saída padrão)'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Relatório JSON anterior; o comando falha se alguma URL regredir'
+        )
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=0.25,
+            help='Aumento aceito no p95 em relação ao baseline (0.25 = 25%%)'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1:
+            raise CommandError('--repeticoes precisa ser pelo menos 1')
+
+        # Client de teste fora do test runner; a fila só grava os jobs, como em produção.
+        # Os print() das views vão para stderr para não misturar com o JSON
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            XP360_FILA_SINCRONA=False,
+        ), redirect_stdout(sys.stderr):
+            relatorio = executar(
+                repeticoes=options['repeticoes'],
+                aquecimento=options['aquecimento'],
+                progresso=self.stderr.write,
+            )
+
+        if not relatorio['urls']:
+            raise CommandError('Nenhuma massa de dados encontrada. Rode antes: manage.py seed_xp360 --scale N')
+
+        regressoes = []
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as arquivo:
+                baseline = json.load(arquivo)
+            if baseline.get('massa') != relatorio['massa']:
+                self.stderr.write(self.style.WARNING(
+                    f"⚠️ Massa diferente da do baseline: {baseline.get('massa')} x {relatorio['massa']}"
+                ))
+            regressoes = comparar(relatorio, baseline, options['tolerancia'])
+
+        texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(texto)
+            self.stderr.write(f"  Relatório gravado em {options['saida']}")
+        else:
+            self.stdout.write(texto)
+
+        for nome in relatorio['sem_cenario']:
+            self.stderr.write(self.style.WARNING(f"⚠️ URL sem cenário no benchmark: {nome}"))
+
+        if regressoes:
+            raise CommandError('Regressões em relação ao baseline:\n' + '\n'.join(regressoes))
+
+        self.stderr.write(self.style.SUCCESS(f"✅ {len(relatorio['urls'])} URLs medidas"))
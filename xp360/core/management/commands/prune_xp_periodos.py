@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.estatisticas import inicio_periodo
+from core.models import XPPeriodo
+
+
+class Command(BaseCommand):
+    help = 'Apaga os baldes de XP por semana/mês (XPPeriodo) mais antigos que o período de retenção'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--semanas',
+            type=int,
+            default=26,
+            help='Quantas semanas manter, contando a atual'
+        )
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=24,
+            help='Quantos meses manter, contando o atual'
+        )
+
+    def handle(self, *args, **options):
+        if options['semanas'] < 1 or options['meses'] < 1:
+            raise CommandError("--semanas e --meses precisam ser pelo menos 1")
+
+        hoje = timezone.localdate()
+
+        semana_atual = inicio_periodo('SEMANA', hoje)
+        limite_semanas = semana_atual - timedelta(weeks=options['semanas'] - 1)
+
+        mes = inicio_periodo('MES', hoje)
+        for _ in range(options['meses'] - 1):
+            mes = inicio_periodo('MES', mes - timedelta(days=1))
+        limite_meses = mes
+
+        semanas, _ = XPPeriodo.objects.filter(periodo='SEMANA', inicio__lt=limite_semanas).delete()
+        meses, _ = XPPeriodo.objects.filter(periodo='MES', inicio__lt=limite_meses).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Removidos {semanas} baldes semanais (antes de {limite_semanas:%d/%m/%Y}) "
+            f"e {meses} mensais (antes de {limite_meses:%d/%m/%Y})"
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from core.estatisticas import reconstruir_xp_diario, reconstruir_disciplinas, reconstruir_turmas, reconstruir_periodos
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os consolidados de estatísticas (XP diário e por período, progresso por disciplina e por turma) a partir do histórico de MissaoAluno'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--aluno',
+            type=int,
+            action='append',
+            dest='alunos',
+            help='ID de um aluno específico (pode ser repetido). Padrão: todos.'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Quantidade de linhas por bulk_create'
+        )
+
+    def handle(self, *args, **options):
+        alunos = options['alunos']
+        lote = options['lote']
+
+        criadas = reconstruir_xp_diario(alunos, lote=lote)
+        self.stdout.write(self.style.SUCCESS(f"✅ XP diário reconstruído: {criadas} linhas"))
+
+        criadas = reconstruir_disciplinas(alunos, lote=lote)
+        self.stdout.write(self.style.SUCCESS(f"✅ Progresso por disciplina reconstruído: {criadas} linhas"))
+
+        criadas = reconstruir_turmas(alunos, lote=lote)
+        self.stdout.write(self.style.SUCCESS(f"✅ Progresso por turma reconstruído: {criadas} linhas"))
+
+        criadas = reconstruir_periodos(alunos, lote=lote)
+        self.stdout.write(self.style.SUCCESS(f"✅ XP por semana/mês reconstruído: {criadas} linhas"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from accounts.ranking import reconstruir_ranking
+from core.models import Turma
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o ranking materializado (PosicaoRanking) de todas as turmas e o ranking geral'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--turma',
+            type=int,
+            action='append',
+            dest='turmas',
+            help='ID de uma turma específica (pode ser repetido). Padrão: todas + geral.'
+        )
+
+    def handle(self, *args, **options):
+        turmas = options['turmas']
+
+        if turmas is None:
+            turmas = list(Turma.objects.order_by('pk').values_list('pk', flat=True))
+            alunos = reconstruir_ranking(None)
+            self.stdout.write(f"  Ranking geral: {alunos} alunos")
+
+        for turma_id in turmas:
+            alunos = reconstruir_ranking(turma_id)
+            self.stdout.write(f"  Turma {turma_id}: {alunos} alunos")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Ranking recalculado para {len(turmas)} turmas"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Usuario
+from core.estatisticas import recalcular_contadores
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os contadores do Usuario (conclusões, questões, acertos seguidos) a partir de MissaoAluno'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Quantidade de alunos processados por vez'
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        alunos = Usuario.objects.filter(tipo='ALUNO').order_by('pk')
+
+        ultimo_id = 0
+        total = 0
+        while True:
+            ids = list(alunos.filter(pk__gt=ultimo_id).values_list('pk', flat=True)[:lote])
+            if not ids:
+                break
+
+            with transaction.atomic():
+                recalcular_contadores(ids)
+
+            total += len(ids)
+            ultimo_id = ids[-1]
+            self.stdout.write(f"  {total} alunos processados...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Contadores reconstruídos para {total} alunos"))
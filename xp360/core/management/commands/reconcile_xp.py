@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from core.eventos_xp import lotes_de_alunos, divergencias
+
+
+class Command(BaseCommand):
+    help = 'Compara xp_total e nível de cada aluno com o extrato (XPEvento) e lista as divergências'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Quantidade de alunos verificados por consulta'
+        )
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=50,
+            help='Máximo de divergências listadas (o total é sempre contado)'
+        )
+
+    def handle(self, *args, **options):
+        limite = options['limite']
+        verificados = 0
+        divergentes = 0
+        diferenca_total = 0
+
+        for ids in lotes_de_alunos(options['lote']):
+            for aluno_id, username, xp_total, xp_extrato, nivel, nivel_extrato in divergencias(ids):
+                divergentes += 1
+                diferenca_total += xp_total - xp_extrato
+                if divergentes <= limite:
+                    self.stdout.write(
+                        f"  {username} (#{aluno_id}): xp_total={xp_total} extrato={xp_extrato} "
+                        f"({xp_total - xp_extrato:+d}), nivel={nivel} esperado={nivel_extrato}"
+                    )
+            verificados += len(ids)
+
+        if divergentes > limite:
+            self.stdout.write(f"  ... e mais {divergentes - limite}")
+
+        if divergentes:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {divergentes} de {verificados} alunos divergem do extrato "
+                f"(diferença total {diferenca_total:+d} XP). Use replay_xp para corrigir."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {verificados} alunos conferem com o extrato"))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.painel import painel_alterado
+from accounts.ranking import reconstruir_ranking
+from core.eventos_xp import lotes_de_alunos, reaplicar_xp, reaplicar_streaks, reaplicar_consolidados
+from core.models import Turma
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói xp_total, nível, streak, consolidados de XP e ranking a partir do extrato (XPEvento)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--aluno',
+            type=int,
+            action='append',
+            dest='alunos',
+            help='ID de um aluno específico (pode ser repetido). Padrão: todos.'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Quantidade de alunos processados por vez'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for ids in lotes_de_alunos(options['lote'], options['alunos']):
+            with transaction.atomic():
+                reaplicar_xp(ids)
+                reaplicar_streaks(ids)
+                reaplicar_consolidados(ids)
+            painel_alterado(*ids)
+
+            total += len(ids)
+            self.stdout.write(f"  {total} alunos processados...")
+
+        # As posições dependem de todos os alunos: recalcular depois dos lotes
+        reconstruir_ranking(None)
+        for turma_id in Turma.objects.order_by('pk').values_list('pk', flat=True).iterator():
+            reconstruir_ranking(turma_id)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ XP reconstruído a partir do extrato para {total} alunos"))
@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import fila, metricas
+
+
+class Command(BaseCommand):
+    help = 'Executa os jobs da fila de tarefas (core.fila) guardados no banco de dados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processos',
+            type=int,
+            default=1,
+            help='Quantidade de processos worker em paralelo'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=10,
+            help='Jobs reservados por vez em cada processo'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=1.0,
+            help='Segundos de espera quando a fila está vazia'
+        )
+        parser.add_argument(
+            '--timeout-travado',
+            type=int,
+            default=600,
+            help='Segundos sem batimento do worker após os quais um job EXECUTANDO volta para a fila'
+        )
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Esvazia a fila e termina, sem ficar esperando novos jobs'
+        )
+
+    def handle(self, *args, **options):
+        processos = max(1, options['processos'])
+
+        if processos == 1:
+            self.trabalhar(options)
+            return
+
+        # Cada processo precisa da sua própria conexão com o banco
+        connections.close_all()
+
+        # fork: os filhos herdam o Django já configurado e as tarefas registradas
+        contexto = multiprocessing.get_context('fork')
+        filhos = [
+            contexto.Process(target=self.trabalhar, args=(options,))
+            for _ in range(processos)
+        ]
+        for filho in filhos:
+            filho.start()
+
+        self.stdout.write(self.style.SUCCESS(f"🚀 {processos} workers iniciados"))
+
+        def encerrar(signum, frame):
+            for filho in filhos:
+                if filho.is_alive():
+                    os.kill(filho.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, encerrar)
+        signal.signal(signal.SIGINT, encerrar)
+
+        for filho in filhos:
+            filho.join()
+
+    def trabalhar(self, options):
+        parar = False
+
+        def pedir_parada(signum, frame):
+            nonlocal parar
+            parar = True
+
+        signal.signal(signal.SIGTERM, pedir_parada)
+        signal.signal(signal.SIGINT, pedir_parada)
+
+        pid = os.getpid()
+        self.stdout.write(f"👷 Worker {pid} aguardando jobs")
+
+        ultima_recuperacao = 0
+        while not parar:
+            # De tempos em tempos devolve para a fila jobs de workers que morreram
+            if time.monotonic() - ultima_recuperacao > 60:
+                recuperados = fila.recuperar_travados(options['timeout_travado'])
+                if recuperados:
+                    self.stdout.write(f"♻️ Worker {pid}: {recuperados} jobs travados devolvidos à fila")
+                ultima_recuperacao = time.monotonic()
+
+            executados = fila.processar(options['lote'])
+            metricas.gravar_se_preciso()
+
+            if executados == 0:
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+
+        metricas.gravar()
+        connections.close_all()
+        self.stdout.write(f"👋 Worker {pid} encerrado")
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Usuario
+from core.massa_dados import Dimensoes, PREFIXO, SENHA, gerar_escola, limpar_escola
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma escola sintética e determinística (professores, turmas, alunos, missões e '
+        'histórico de MissaoAluno). Escala 1 = ~50 mil MissaoAluno; escala 20 passa de 1 milhão.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=1,
+            help='Tamanho da escola (multiplica professores e alunos)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente do gerador: a mesma semente gera os mesmos dados'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Quantidade de linhas por bulk_create'
+        )
+        parser.add_argument(
+            '--limpar',
+            action='store_true',
+            help=f'Apaga antes os dados gerados anteriormente (usuários "{PREFIXO}*")'
+        )
+
+    def handle(self, *args, **options):
+        if options['scale'] < 1:
+            raise CommandError('--scale precisa ser pelo menos 1')
+
+        if options['limpar']:
+            apagados = limpar_escola()
+            self.stdout.write(f"  {apagados} linhas apagadas")
+        elif Usuario.objects.filter(username__startswith=PREFIXO).exists():
+            raise CommandError(f'Já existem usuários "{PREFIXO}*". Use --limpar para gerar de novo.')
+
+        dimensoes = Dimensoes.para_escala(options['scale'])
+        inicio = time.perf_counter()
+        criadas = gerar_escola(dimensoes, semente=options['seed'], lote=options['lote'], progresso=self.stdout.write)
+        duracao = time.perf_counter() - inicio
+
+        resumo = ', '.join(f'{quantidade} {nome}' for nome, quantidade in criadas.items())
+        self.stdout.write(self.style.SUCCESS(f"✅ Escola gerada em {duracao:.1f}s: {resumo}"))
+        self.stdout.write(f"  Senha de todos os usuários: {SENHA}")
@@ -0,0 +1,95 @@
+"""
+Mapa de calor da turma (alunos × missões)
+
+As células vêm de uma única consulta com values_list (sem instâncias de
+model) e são guardadas em matrizes de bits: uma para "missão atribuída",
+uma para "concluída" e uma para "acertou". Cada matriz é um bytearray com
+um bit por célula, linha a linha, e vai para o navegador em base64
+(50 alunos × 500 missões = 3125 bytes por matriz).
+"""
+
+import base64
+
+from accounts.models import Usuario
+from .models import Missao, MissaoAluno
+
+
+class MatrizBits:
+    """Matriz linhas × colunas de bits, guardada linha a linha em um bytearray"""
+
+    def __init__(self, linhas, colunas):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.bits = bytearray((linhas * colunas + 7) // 8)
+
+    def marcar(self, linha, coluna):
+        posicao = linha * self.colunas + coluna
+        self.bits[posicao >> 3] |= 1 << (posicao & 7)
+
+    def __getitem__(self, celula):
+        linha, coluna = celula
+        posicao = linha * self.colunas + coluna
+        return bool(self.bits[posicao >> 3] & (1 << (posicao & 7)))
+
+    def base64(self):
+        return base64.b64encode(self.bits).decode('ascii')
+
+
+def mapa_conclusao(turma):
+    """
+    Mapa de conclusão da turma: alunos (linhas, por username), missões
+    (colunas, das mais antigas para as mais novas), as três matrizes de
+    bits e os totais de conclusões por aluno e por missão.
+    """
+    alunos = list(
+        Usuario.objects.filter(turmas_aluno=turma, tipo='ALUNO')
+        .order_by('username')
+        .values_list('pk', 'username')
+    )
+    missoes = list(
+        Missao.objects.filter(turma=turma)
+        .order_by('data_criacao', 'pk')
+        .values_list('pk', 'titulo', 'tipo')
+    )
+
+    linha_do_aluno = {aluno_id: i for i, (aluno_id, _) in enumerate(alunos)}
+    coluna_da_missao = {missao_id: j for j, (missao_id, _, _) in enumerate(missoes)}
+
+    atribuidas = MatrizBits(len(alunos), len(missoes))
+    concluidas = MatrizBits(len(alunos), len(missoes))
+    acertos = MatrizBits(len(alunos), len(missoes))
+    por_aluno = [0] * len(alunos)
+    por_missao = [0] * len(missoes)
+
+    celulas = MissaoAluno.objects.filter(missao__turma=turma).values_list(
+        'aluno_id', 'missao_id', 'concluida', 'acertou'
+    )
+    for aluno_id, missao_id, concluida, acertou in celulas.iterator(chunk_size=5000):
+        linha = linha_do_aluno.get(aluno_id)
+        coluna = coluna_da_missao.get(missao_id)
+        if linha is None or coluna is None:
+            # Aluno que saiu da turma (ou missão criada depois da leitura das colunas)
+            continue
+
+        atribuidas.marcar(linha, coluna)
+        if concluida:
+            concluidas.marcar(linha, coluna)
+            por_aluno[linha] += 1
+            por_missao[coluna] += 1
+            if acertou:
+                acertos.marcar(linha, coluna)
+
+    return {
+        'alunos': [{'id': aluno_id, 'username': username} for aluno_id, username in alunos],
+        'missoes': [
+            {'id': missao_id, 'titulo': titulo, 'tipo': tipo}
+            for missao_id, titulo, tipo in missoes
+        ],
+        'linhas': len(alunos),
+        'colunas': len(missoes),
+        'atribuidas': atribuidas.base64(),
+        'concluidas': concluidas.base64(),
+        'acertos': acertos.base64(),
+        'concluidas_por_aluno': por_aluno,
+        'concluidas_por_missao': por_missao,
+    }
@@ -0,0 +1,290 @@
+"""
+Massa de dados sintética (seed_xp360 / benchmark_xp360)
+
+Gera uma escola inteira de forma determinística (mesma semente, mesmos
+dados): professores, turmas, alunos matriculados em várias turmas,
+missões com alternativas e o histórico de MissaoAluno com conclusões e
+acertos realistas. Tudo é gravado com bulk_create em lotes, sem signals
+nem fila; os consolidados, contadores, XP e ranking são reconstruídos no
+final pelas mesmas funções de rebuild_estatisticas e replay_xp.
+
+Distribuições usadas:
+- conclusão: cada aluno tem um engajamento (Beta(2; 1,2), média ~62%) e
+  conclui as missões alguns dias depois de criadas (atraso exponencial,
+  média de 2 dias); missões muito recentes ainda estão pendentes.
+- acertos: modelo de Rasch, P(acerto) = 1 / (1 + e^-(habilidade - dificuldade)),
+  com habilidade do aluno e dificuldade da questão ~ Normal(0, 1).
+"""
+
+import math
+import random
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Usuario
+from accounts.ranking import reconstruir_ranking
+from .busca import texto_busca
+from .estatisticas import (
+    reconstruir_xp_diario, reconstruir_disciplinas, reconstruir_turmas,
+    reconstruir_periodos, recalcular_contadores,
+)
+from .eventos_xp import reaplicar_xp, reaplicar_streaks
+from .models import Disciplina, Turma, Missao, Alternativa, MissaoAluno, XPEvento
+
+
+# Todos os usuários gerados começam com este prefixo (limpar_escola apaga por ele)
+PREFIXO = 'seed_'
+SENHA = 'senha123'
+
+DISCIPLINAS = [
+    ('Matemática', '📐', '#FF6B6B'),
+    ('Português', '📚', '#4ECDC4'),
+    ('Ciências', '🔬', '#45B7D1'),
+    ('História', '🏛️', '#FFA07A'),
+    ('Geografia', '🌎', '#98D8C8'),
+    ('Inglês', '🇬🇧', '#F7DC6F'),
+]
+
+XP_POSSIVEIS = (10, 20, 30, 50)
+PROPORCAO_QUESTOES = 0.4
+
+
+@dataclass
+class Dimensoes:
+    professores: int
+    turmas_por_professor: int
+    alunos: int
+    turmas_por_aluno: int  # cada aluno entra em 1..turmas_por_aluno turmas
+    missoes_por_turma: int
+    dias: int  # as missões são espalhadas pelos últimos `dias` dias
+
+    @classmethod
+    def para_escala(cls, escala):
+        """
+        Escala 1: 4 professores, 20 turmas, 500 alunos (~50 por turma),
+        1.000 missões e ~50 mil MissaoAluno. Escala 20 passa de 1 milhão.
+        """
+        return cls(
+            professores=4 * escala,
+            turmas_por_professor=5,
+            alunos=500 * escala,
+            turmas_por_aluno=3,
+            missoes_por_turma=50,
+            dias=120,
+        )
+
+
+def _lotes(itens, tamanho):
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _disciplinas():
+    existentes = list(Disciplina.objects.order_by('pk').values_list('pk', flat=True))
+    if existentes:
+        return existentes
+    criadas = Disciplina.objects.bulk_create([
+        Disciplina(nome=nome, icone=icone, cor=cor) for nome, icone, cor in DISCIPLINAS
+    ])
+    return [disciplina.pk for disciplina in criadas]
+
+
+def gerar_escola(dimensoes, semente=42, lote=5000, progresso=None):
+    """
+    Grava a escola descrita por `dimensoes` e retorna um Counter com
+    quantas linhas de cada tipo foram criadas. `progresso(mensagem)` é
+    chamado entre as etapas.
+    """
+    rng = random.Random(semente)
+    avisar = progresso or (lambda mensagem: None)
+    criadas = Counter()
+    hoje = timezone.localdate()
+    senha = make_password(SENHA)  # um hash só: PBKDF2 por usuário levaria minutos
+
+    with transaction.atomic():
+        disciplinas = _disciplinas()
+
+        # 👩‍🏫 Professores e turmas
+        professores = Usuario.objects.bulk_create([
+            Usuario(
+                username=f'{PREFIXO}prof_{i:04d}',
+                email=f'{PREFIXO}prof_{i:04d}@escola.test',
+                password=senha,
+                tipo='PROFESSOR',
+                aceitou_termos=True,
+            )
+            for i in range(dimensoes.professores)
+        ], batch_size=lote)
+        turmas = Turma.objects.bulk_create([
+            Turma(
+                nome=f'Turma {i + 1}{"ABCDEFGH"[j % 8]}',
+                serie=f'{(i + j) % 9 + 1}º ano',
+                ano_letivo=hoje.year,
+                professor=professor,
+            )
+            for i, professor in enumerate(professores)
+            for j in range(dimensoes.turmas_por_professor)
+        ], batch_size=lote)
+        criadas['professores'] = len(professores)
+        criadas['turmas'] = len(turmas)
+
+        # 🎓 Alunos, com habilidade e engajamento fixos
+        alunos = Usuario.objects.bulk_create([
+            Usuario(
+                username=f'{PREFIXO}aluno_{i:06d}',
+                email=f'{PREFIXO}aluno_{i:06d}@escola.test',
+                password=senha,
+                tipo='ALUNO',
+                aceitou_termos=True,
+            )
+            for i in range(dimensoes.alunos)
+        ], batch_size=lote)
+        perfil = {
+            aluno.pk: (rng.gauss(0, 1), rng.betavariate(2, 1.2))  # (habilidade, engajamento)
+            for aluno in alunos
+        }
+        criadas['alunos'] = len(alunos)
+
+        # Matrículas direto na tabela intermediária (sem os signals de distribuição)
+        Matricula = Usuario.turmas_aluno.through
+        matriculas = [
+            (aluno.pk, turmas[indice].pk)
+            for aluno in alunos
+            for indice in sorted(rng.sample(
+                range(len(turmas)),
+                min(len(turmas), rng.randint(1, dimensoes.turmas_por_aluno)),
+            ))
+        ]
+        Matricula.objects.bulk_create(
+            [Matricula(usuario_id=aluno_id, turma_id=turma_id) for aluno_id, turma_id in matriculas],
+            batch_size=lote,
+        )
+        criadas['matriculas'] = len(matriculas)
+        avisar(f"  {len(alunos)} alunos em {len(turmas)} turmas ({len(matriculas)} matrículas)")
+
+        # 📝 Missões (data_criacao é auto_now_add: corrigida por dia depois do INSERT)
+        missoes = []
+        for turma in turmas:
+            for j in range(dimensoes.missoes_por_turma):
+                questao = rng.random() < PROPORCAO_QUESTOES
+                titulo = f'{"Questão" if questao else "Tarefa"} {j + 1} - {turma.nome}'
+                descricao = f'Missão {j + 1} da turma {turma.nome}'
+                missao = Missao(
+                    titulo=titulo,
+                    descricao=descricao,
+                    texto_busca=texto_busca(titulo, descricao),
+                    xp=rng.choice(XP_POSSIVEIS),
+                    turma=turma,
+                    disciplina_id=rng.choice(disciplinas),
+                    tipo='QUESTAO' if questao else 'TAREFA',
+                    duracao=rng.choice((15, 30, 45, 60)),
+                    data_disponivel=hoje - timedelta(days=rng.randrange(dimensoes.dias)),
+                )
+                missao.correta = rng.choice('ABCD') if questao else None
+                missao.dificuldade = rng.gauss(0, 1)
+                missoes.append(missao)
+        Missao.objects.bulk_create(missoes, batch_size=lote)
+
+        por_dia = {}
+        for missao in missoes:
+            por_dia.setdefault(missao.data_disponivel, []).append(missao.pk)
+        fuso = timezone.get_current_timezone()
+        for dia, ids in por_dia.items():
+            Missao.objects.filter(pk__in=ids).update(
+                data_criacao=timezone.make_aware(datetime.combine(dia, time(8)), fuso)
+            )
+
+        alternativas = Alternativa.objects.bulk_create([
+            Alternativa(missao=missao, texto=f'Alternativa {ordem}', ordem=ordem, correta=ordem == missao.correta)
+            for missao in missoes
+            if missao.correta
+            for ordem in 'ABCD'
+        ], batch_size=lote)
+        criadas['missoes'] = len(missoes)
+        criadas['alternativas'] = len(alternativas)
+        avisar(f"  {len(missoes)} missões e {len(alternativas)} alternativas")
+
+        # 📊 Histórico: uma MissaoAluno por (matrícula, missão da turma)
+        missoes_da_turma = {}
+        for missao in missoes:
+            missoes_da_turma.setdefault(missao.turma_id, []).append(missao)
+
+        def historico():
+            for aluno_id, turma_id in matriculas:
+                habilidade, engajamento = perfil[aluno_id]
+                for missao in missoes_da_turma.get(turma_id, ()):
+                    missao_aluno = MissaoAluno(aluno_id=aluno_id, missao_id=missao.pk)
+                    idade = (hoje - missao.data_disponivel).days
+                    atraso = int(rng.expovariate(0.5))
+                    if atraso <= idade and rng.random() < engajamento:
+                        missao_aluno.concluida = True
+                        missao_aluno.data_conclusao = missao.data_disponivel + timedelta(days=atraso)
+                        if missao.correta:
+                            chance = 1 / (1 + math.exp(missao.dificuldade - habilidade))
+                            missao_aluno.acertou = rng.random() < chance
+                            missao_aluno.resposta_escolhida = (
+                                missao.correta if missao_aluno.acertou
+                                else rng.choice([ordem for ordem in 'ABCD' if ordem != missao.correta])
+                            )
+                    missao_aluno.xp_missao = missao.xp
+                    missao_aluno.disciplina_id = missao.disciplina_id
+                    yield missao_aluno
+
+        for missoes_aluno in _lotes(historico(), lote):
+            MissaoAluno.objects.bulk_create(missoes_aluno)
+
+            # 🧾 Extrato: só o que rende XP (tarefas e questões certas)
+            eventos = XPEvento.objects.bulk_create([
+                XPEvento(
+                    aluno_id=missao_aluno.aluno_id,
+                    missao_id=missao_aluno.missao_id,
+                    missao_aluno=missao_aluno,
+                    disciplina_id=missao_aluno.disciplina_id,
+                    xp=missao_aluno.xp_missao,
+                    motivo='QUESTAO' if missao_aluno.resposta_escolhida else 'TAREFA',
+                    data=missao_aluno.data_conclusao,
+                )
+                for missao_aluno in missoes_aluno
+                if missao_aluno.concluida and (missao_aluno.acertou or not missao_aluno.resposta_escolhida)
+            ])
+
+            criadas['missoes_aluno'] += len(missoes_aluno)
+            criadas['eventos_xp'] += len(eventos)
+            avisar(f"  {criadas['missoes_aluno']} MissaoAluno gravadas...")
+
+    # Consolidados, contadores, XP/nível/streak e ranking dos alunos gerados
+    alunos_ids = [aluno.pk for aluno in alunos]
+    for ids in _lotes(alunos_ids, 1000):
+        reconstruir_xp_diario(ids)
+        reconstruir_disciplinas(ids)
+        reconstruir_turmas(ids)
+        reconstruir_periodos(ids)
+        with transaction.atomic():
+            recalcular_contadores(ids)
+            reaplicar_xp(ids)
+            reaplicar_streaks(ids)
+    avisar(f"  consolidados reconstruídos para {len(alunos_ids)} alunos")
+
+    reconstruir_ranking(None)
+    for turma in turmas:
+        reconstruir_ranking(turma.pk)
+
+    return criadas
+
+
+def limpar_escola():
+    """Apaga os usuários gerados (turmas, missões e histórico vão em cascata)"""
+    Turma.objects.filter(professor__username__startswith=PREFIXO).delete()
+    apagados, _ = Usuario.objects.filter(username__startswith=PREFIXO).delete()
+    return apagados
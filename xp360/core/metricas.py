@@ -0,0 +1,298 @@
+"""
+Métricas no formato texto do Prometheus (/metrics)
+
+Registro em memória, sem dependências nem serviços externos: contadores e
+histogramas com rótulos, atualizados pelo middleware (latência e SQL por
+URL) e pelo código de gamificação (XP, badges, distribuição de missões,
+caches, jobs).
+
+Vários processos (gunicorn, run_xp360_worker): com
+settings.XP360_METRICAS_DIR, cada processo grava de tempos em tempos as
+suas métricas em um arquivo próprio dessa pasta (escrita em arquivo
+temporário + os.replace, então quem lê nunca vê um arquivo pela metade) e
+/metrics soma os arquivos de todos. Os arquivos de processos que já
+terminaram continuam somando, como os contadores do Prometheus esperam;
+a pasta deve ser esvaziada a cada deploy.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+
+# Intervalo mínimo entre duas gravações do arquivo do processo
+INTERVALO_GRAVACAO = 2  # segundos
+
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BALDES_CONSULTAS = (1, 2, 5, 10, 20, 30, 50, 100, 200)
+BALDES_LINHAS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+_trava = threading.Lock()
+_trava_arquivo = threading.Lock()  # uma gravação por vez (threads do gunicorn)
+_metricas = {}  # nome -> Contador/Histograma
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.valores = {}  # (valores dos rótulos) -> total
+        _metricas[nome] = self
+
+    def inc(self, valor=1, **rotulos):
+        chave = tuple(str(rotulos[rotulo]) for rotulo in self.rotulos)
+        with _trava:
+            self.valores[chave] = self.valores.get(chave, 0) + valor
+
+    def exportar(self):
+        return [[list(chave), valor] for chave, valor in self.valores.items()]
+
+    @staticmethod
+    def somar(total, valor):
+        return (total or 0) + valor
+
+    def linhas(self, valores):
+        for chave, valor in sorted(valores.items()):
+            yield f'{self.nome}{_rotulos(zip(self.rotulos, chave))} {_numero(valor)}'
+
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), baldes=BALDES_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.baldes = tuple(baldes)
+        self.valores = {}  # (valores dos rótulos) -> [contagem por balde..., +Inf, soma]
+        _metricas[nome] = self
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(str(rotulos[rotulo]) for rotulo in self.rotulos)
+        with _trava:
+            serie = self.valores.get(chave)
+            if serie is None:
+                serie = self.valores[chave] = [0] * (len(self.baldes) + 2)
+            for i, limite in enumerate(self.baldes):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            else:
+                serie[len(self.baldes)] += 1
+            serie[-1] += valor
+
+    def exportar(self):
+        return [[list(chave), list(serie)] for chave, serie in self.valores.items()]
+
+    @staticmethod
+    def somar(total, serie):
+        if total is None:
+            return list(serie)
+        return [a + b for a, b in zip(total, serie)]
+
+    def linhas(self, valores):
+        limites = [_numero(limite) for limite in self.baldes] + ['+Inf']
+        for chave, serie in sorted(valores.items()):
+            pares = list(zip(self.rotulos, chave))
+            acumulado = 0
+            for limite, contagem in zip(limites, serie):
+                acumulado += contagem
+                yield f'{self.nome}_bucket{_rotulos(pares + [("le", limite)])} {acumulado}'
+            yield f'{self.nome}_sum{_rotulos(pares)} {_numero(serie[-1])}'
+            yield f'{self.nome}_count{_rotulos(pares)} {acumulado}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _rotulos(pares):
+    pares = list(pares)
+    if not pares:
+        return ''
+    escapados = (
+        f'{nome}="' + valor.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') + '"'
+        for nome, valor in pares
+    )
+    return '{' + ','.join(escapados) + '}'
+
+
+# ==========================================
+# MÉTRICAS DO XP360
+# ==========================================
+
+REQUISICAO_SEGUNDOS = Histograma(
+    'xp360_requisicao_duracao_segundos', 'Duração das requisições por URL', ('view', 'metodo'),
+)
+REQUISICOES = Contador(
+    'xp360_requisicoes_total', 'Requisições por URL e status', ('view', 'metodo', 'status'),
+)
+CONSULTAS_POR_REQUISICAO = Histograma(
+    'xp360_sql_consultas_por_requisicao', 'Consultas SQL por requisição', ('view',), BALDES_CONSULTAS,
+)
+SQL_SEGUNDOS = Contador(
+    'xp360_sql_duracao_segundos_total', 'Tempo gasto em SQL pelas requisições', ('view',),
+)
+CACHE = Contador(
+    'xp360_cache_leituras_total', 'Leituras de cache (acerto, antiga = cópia vencida servida, falha)',
+    ('cache', 'resultado'),
+)
+XP_CONCEDIDO = Contador(
+    'xp360_xp_concedido_total', 'XP concedido aos alunos', ('motivo',),
+)
+BADGES_CONCEDIDAS = Contador(
+    'xp360_badges_concedidas_total', 'Badges concedidas', ('tipo',),
+)
+DISTRIBUICAO_LINHAS = Histograma(
+    'xp360_distribuicao_missoes_linhas', 'MissaoAluno criadas por distribuição de missões', (), BALDES_LINHAS,
+)
+JOBS = Contador(
+    'xp360_jobs_total', 'Jobs da fila executados', ('tarefa', 'resultado'),
+)
+
+
+# ==========================================
+# VÁRIOS PROCESSOS
+# ==========================================
+
+_processo = {'pid': None, 'arquivo': None, 'gravado_em': 0.0}
+
+
+def pasta():
+    return getattr(settings, 'XP360_METRICAS_DIR', None)
+
+
+def _arquivo_do_processo():
+    """Arquivo deste processo; depois de um fork o filho começa do zero com um arquivo novo"""
+    pid = os.getpid()
+    if _processo['pid'] != pid:
+        with _trava:
+            if _processo['pid'] is not None:
+                for metrica in _metricas.values():
+                    metrica.valores.clear()
+            _processo['pid'] = pid
+            # pid + sufixo aleatório: um pid reaproveitado não sobrescreve o arquivo de um processo morto
+            _processo['arquivo'] = os.path.join(pasta(), f'metricas-{pid}-{uuid.uuid4().hex[:8]}.json')
+    return _processo['arquivo']
+
+
+def gravar():
+    """Grava as métricas deste processo no seu arquivo da pasta compartilhada"""
+    if not pasta():
+        return
+    arquivo = _arquivo_do_processo()
+    with _trava_arquivo:
+        with _trava:
+            dados = {nome: metrica.exportar() for nome, metrica in _metricas.items()}
+        temporario = f'{arquivo}.tmp'
+        with open(temporario, 'w') as saida:
+            json.dump(dados, saida)
+        os.replace(temporario, arquivo)
+        _processo['gravado_em'] = time.monotonic()
+
+
+def precisa_gravar():
+    return bool(pasta()) and time.monotonic() - _processo['gravado_em'] >= INTERVALO_GRAVACAO
+
+
+def gravar_se_preciso():
+    if precisa_gravar():
+        gravar()
+
+
+atexit.register(gravar)
+
+
+def _somados():
+    """nome -> {rótulos: valor}, somando os arquivos de todos os processos (ou só a memória)"""
+    if not pasta():
+        with _trava:
+            return {nome: dict(metrica.valores) for nome, metrica in _metricas.items()}
+
+    gravar()
+    somados = {nome: {} for nome in _metricas}
+    for caminho in glob.glob(os.path.join(pasta(), 'metricas-*.json')):
+        try:
+            with open(caminho) as entrada:
+                dados = json.load(entrada)
+        except (OSError, ValueError):
+            continue  # arquivo apagado entre o glob e a leitura
+        for nome, series in dados.items():
+            metrica = _metricas.get(nome)
+            if metrica is None:
+                continue  # métrica de uma versão anterior do código
+            for chave, valor in series:
+                chave = tuple(chave)
+                somados[nome][chave] = metrica.somar(somados[nome].get(chave), valor)
+    return somados
+
+
+def texto_prometheus():
+    """Todas as métricas no formato texto do Prometheus (versão 0.0.4)"""
+    somados = _somados()
+    linhas = []
+    for nome, metrica in _metricas.items():
+        linhas.append(f'# HELP {nome} {metrica.ajuda}')
+        linhas.append(f'# TYPE {nome} {metrica.tipo}')
+        linhas.extend(metrica.linhas(somados.get(nome, {})))
+    return '\n'.join(linhas) + '\n'
+
+
+# ==========================================
+# MIDDLEWARE
+# ==========================================
+
+class MetricasMiddleware:
+    """
+    Latência por URL (nome da rota) e, com o OrcamentoConsultasMiddleware
+    logo depois dele, consultas e tempo de SQL da requisição
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        self.registrar(request, response, time.perf_counter() - inicio)
+        gravar_se_preciso()
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        self.registrar(request, response, time.perf_counter() - inicio)
+        if precisa_gravar():
+            # Escrita em disco fora do event loop (não precisa da thread da requisição)
+            await sync_to_async(gravar, thread_sensitive=False)()
+        return response
+
+    def registrar(self, request, response, duracao):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'sem_rota'
+
+        REQUISICAO_SEGUNDOS.observar(duracao, view=view, metodo=request.method)
+        REQUISICOES.inc(view=view, metodo=request.method, status=response.status_code)
+
+        registro = getattr(request, 'registro_consultas', None)
+        if registro is not None:
+            CONSULTAS_POR_REQUISICAO.observar(registro.total, view=view)
+            SQL_SEGUNDOS.inc(registro.tempo, view=view)
@@ -1,6 +1,29 @@
 from django.db import migrations
 
 
+def adicionar_colunas_postgres(apps, schema_editor):
+    # Rede de segurança para bancos antigos; a 0002 já cria as colunas
+    # (e o IF NOT EXISTS do ALTER TABLE só existe no PostgreSQL)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        ALTER TABLE core_missao 
+        ADD COLUMN IF NOT EXISTS data_disponivel DATE;
+        
+        ALTER TABLE core_missao 
+        ADD COLUMN IF NOT EXISTS duracao INTEGER;
+    """)
+
+
+def remover_colunas_postgres(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        ALTER TABLE core_missao DROP COLUMN IF EXISTS data_disponivel;
+        ALTER TABLE core_missao DROP COLUMN IF EXISTS duracao;
+    """)
+
+
 class Migration(migrations.Migration):
 
     dependencies = [
@@ -8,17 +31,5 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RunSQL(
-            sql="""
-                ALTER TABLE core_missao 
-                ADD COLUMN IF NOT EXISTS data_disponivel DATE;
-                
-                ALTER TABLE core_missao 
-                ADD COLUMN IF NOT EXISTS duracao INTEGER;
-            """,
-            reverse_sql="""
-                ALTER TABLE core_missao DROP COLUMN IF EXISTS data_disponivel;
-                ALTER TABLE core_missao DROP COLUMN IF EXISTS duracao;
-            """
-        ),
+        migrations.RunPython(adicionar_colunas_postgres, remover_colunas_postgres),
     ]
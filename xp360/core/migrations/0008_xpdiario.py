@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_alter_disciplina_cor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('xp', models.IntegerField(default=0)),
+                ('missoes_concluidas', models.IntegerField(default=0)),
+                ('questoes_respondidas', models.IntegerField(default=0)),
+                ('acertos', models.IntegerField(default=0)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_diario', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'XP Diário',
+                'verbose_name_plural': 'XP Diário',
+                'ordering': ['-data'],
+                'unique_together': {('aluno', 'data')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_xpdiario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisciplinaAluno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('atribuidas', models.IntegerField(default=0)),
+                ('concluidas', models.IntegerField(default=0)),
+                ('xp', models.IntegerField(default=0)),
+                ('questoes_respondidas', models.IntegerField(default=0)),
+                ('acertos', models.IntegerField(default=0)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresso_disciplinas', to=settings.AUTH_USER_MODEL)),
+                ('disciplina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.disciplina')),
+            ],
+            options={
+                'verbose_name': 'Progresso na Disciplina',
+                'verbose_name_plural': 'Progresso nas Disciplinas',
+                'unique_together': {('aluno', 'disciplina')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_disciplinaaluno'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tarefa', models.CharField(max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EXECUTANDO', 'Executando'), ('CONCLUIDO', 'Concluído'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=20)),
+                ('chave_idempotencia', models.CharField(blank=True, max_length=200, null=True)),
+                ('tentativas', models.IntegerField(default=0)),
+                ('max_tentativas', models.IntegerField(default=5)),
+                ('executar_apos', models.DateTimeField(default=django.utils.timezone.now)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Job da Fila',
+                'verbose_name_plural': 'Jobs da Fila',
+                'ordering': ['executar_apos', 'id'],
+                'indexes': [models.Index(fields=['status', 'executar_apos'], name='core_job_fila_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'PENDENTE')), fields=('chave_idempotencia',), name='core_job_chave_pendente_unica')],
+            },
+        ),
+    ]
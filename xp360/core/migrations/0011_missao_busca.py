@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:26
+
+import unicodedata
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations, models
+
+
+def texto_busca(titulo, descricao):
+    # Cópia de core.busca.texto_busca como era nesta migração: minúsculas e sem acentos
+    decomposto = unicodedata.normalize('NFKD', f'{titulo} {descricao}')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def preencher_texto_busca(apps, schema_editor):
+    Missao = apps.get_model('core', 'Missao')
+    missoes = list(Missao.objects.only('id', 'titulo', 'descricao'))
+    for missao in missoes:
+        missao.texto_busca = texto_busca(missao.titulo, missao.descricao)
+    Missao.objects.bulk_update(missoes, ['texto_busca'], batch_size=1000)
+
+
+SQL_BUSCA = """
+    CREATE OR REPLACE FUNCTION core_missao_busca_atualizar() RETURNS trigger AS $$
+    BEGIN
+        NEW.texto_busca := lower(unaccent(coalesce(NEW.titulo, '') || ' ' || coalesce(NEW.descricao, '')));
+        NEW.busca :=
+            setweight(to_tsvector('portuguese', unaccent(coalesce(NEW.titulo, ''))), 'A') ||
+            setweight(to_tsvector('portuguese', unaccent(coalesce(NEW.descricao, ''))), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER core_missao_busca_trigger
+        BEFORE INSERT OR UPDATE ON core_missao
+        FOR EACH ROW EXECUTE FUNCTION core_missao_busca_atualizar();
+
+    -- Dispara o trigger nas missões que já existem
+    UPDATE core_missao SET titulo = titulo;
+
+    CREATE INDEX core_missao_busca_gin ON core_missao USING gin (busca);
+    CREATE INDEX core_missao_texto_busca_trgm ON core_missao USING gin (texto_busca gin_trgm_ops);
+"""
+
+SQL_REMOVER_BUSCA = """
+    DROP INDEX IF EXISTS core_missao_texto_busca_trgm;
+    DROP INDEX IF EXISTS core_missao_busca_gin;
+    DROP TRIGGER IF EXISTS core_missao_busca_trigger ON core_missao;
+    DROP FUNCTION IF EXISTS core_missao_busca_atualizar();
+"""
+
+
+def criar_busca_postgres(apps, schema_editor):
+    # Nos outros bancos a busca usa o LIKE sobre texto_busca (core/busca.py)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SQL_BUSCA)
+
+
+def remover_busca_postgres(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SQL_REMOVER_BUSCA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='missao',
+            name='busca',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='missao',
+            name='texto_busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(preencher_texto_busca, migrations.RunPython.noop),
+
+        # Somente PostgreSQL daqui para baixo
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.RunPython(criar_busca_postgres, remover_busca_postgres),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_missao_busca'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressoTurma',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('concluidas', models.IntegerField(default=0)),
+                ('xp', models.IntegerField(default=0)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresso_turmas', to=settings.AUTH_USER_MODEL)),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresso_alunos', to='core.turma')),
+            ],
+            options={
+                'verbose_name': 'Progresso na Turma',
+                'verbose_name_plural': 'Progresso nas Turmas',
+                'unique_together': {('turma', 'aluno')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_progressoturma'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('SEMANA', 'Semana'), ('MES', 'Mês')], max_length=10)),
+                ('inicio', models.DateField()),
+                ('xp', models.IntegerField(default=0)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_periodos', to=settings.AUTH_USER_MODEL)),
+                ('disciplina', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.disciplina')),
+            ],
+            options={
+                'verbose_name': 'XP por Período',
+                'verbose_name_plural': 'XP por Período',
+                'indexes': [models.Index(fields=['periodo', 'inicio', 'disciplina', '-xp'], name='core_xpperiodo_ranking_idx')],
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'inicio', 'disciplina', 'aluno'), name='core_xpperiodo_disciplina_unico'), models.UniqueConstraint(condition=models.Q(('disciplina__isnull', True)), fields=('periodo', 'inicio', 'aluno'), name='core_xpperiodo_geral_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def preencher_extrato(apps, schema_editor):
+    # Um evento por missão concluída que rendeu XP (questões só quando acertadas).
+    # Missões antigas sem data de conclusão usam a data em que ficaram disponíveis.
+    MissaoAluno = apps.get_model('core', 'MissaoAluno')
+    XPEvento = apps.get_model('core', 'XPEvento')
+
+    concluidas = (
+        MissaoAluno.objects.filter(concluida=True)
+        .exclude(missao__tipo='QUESTAO', acertou=False)
+        .annotate(dia=Coalesce('data_conclusao', 'missao__data_disponivel'))
+        .values_list('id', 'aluno_id', 'missao_id', 'missao__disciplina_id', 'missao__xp', 'missao__tipo', 'dia')
+        .order_by('id')
+    )
+
+    buffer = []
+    for id, aluno_id, missao_id, disciplina_id, xp, tipo, dia in concluidas.iterator(chunk_size=2000):
+        buffer.append(XPEvento(
+            aluno_id=aluno_id,
+            missao_id=missao_id,
+            missao_aluno_id=id,
+            disciplina_id=disciplina_id,
+            xp=xp,
+            motivo='QUESTAO' if tipo == 'QUESTAO' else 'TAREFA',
+            data=dia,
+        ))
+        if len(buffer) >= 2000:
+            XPEvento.objects.bulk_create(buffer)
+            buffer = []
+
+    if buffer:
+        XPEvento.objects.bulk_create(buffer)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_xpperiodo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('xp', models.IntegerField()),
+                ('motivo', models.CharField(choices=[('TAREFA', 'Tarefa concluída'), ('QUESTAO', 'Questão respondida corretamente'), ('AJUSTE', 'Ajuste manual')], max_length=10)),
+                ('data', models.DateField()),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_xp', to=settings.AUTH_USER_MODEL)),
+                ('disciplina', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.disciplina')),
+                ('missao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.missao')),
+                ('missao_aluno', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='evento_xp', to='core.missaoaluno')),
+            ],
+            options={
+                'verbose_name': 'Evento de XP',
+                'verbose_name_plural': 'Eventos de XP',
+                'indexes': [models.Index(fields=['aluno', 'data'], name='core_xpevento_aluno_data_idx')],
+            },
+        ),
+        migrations.RunPython(preencher_extrato, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:46
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_xpevento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='missaoaluno',
+            name='aluno',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='missaoaluno',
+            name='missao',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.missao'),
+        ),
+        migrations.AddIndex(
+            model_name='missao',
+            index=models.Index(fields=['turma', '-data_criacao'], name='core_missao_turma_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missao',
+            index=models.Index(django.db.models.functions.datetime.TruncDate('data_criacao'), name='core_missao_dia_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missaoaluno',
+            index=models.Index(fields=['aluno', 'concluida', 'data_conclusao', 'missao'], name='core_missaoaluno_historico_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missaoaluno',
+            index=models.Index(fields=['missao', 'concluida', 'acertou'], name='core_missaoaluno_missao_idx'),
+        ),
+    ]
@@ -0,0 +1,142 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:10
+
+from django.db import migrations
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+
+LOTE = 2000
+
+# XP efetivamente ganho: tarefas sempre rendem XP, questões só quando acertadas
+XP_GANHO = Case(
+    When(Q(missao__tipo='QUESTAO') & Q(acertou=False), then=0),
+    default=F('missao__xp'),
+)
+QUESTAO = Q(missao__tipo='QUESTAO')
+
+
+def recriar(model, consultas, criar):
+    model.objects.all().delete()
+
+    buffer = []
+    for consulta in consultas:
+        for linha in consulta.iterator(chunk_size=LOTE):
+            buffer.append(criar(linha))
+            if len(buffer) >= LOTE:
+                model.objects.bulk_create(buffer)
+                buffer = []
+
+    if buffer:
+        model.objects.bulk_create(buffer)
+
+
+def preencher_consolidados(apps, schema_editor):
+    # Os consolidados foram criados vazios (0008, 0009, 0012 e 0013): recria
+    # todos a partir do histórico de MissaoAluno. Missões antigas sem data de
+    # conclusão usam a data em que ficaram disponíveis, como no extrato (0014).
+    MissaoAluno = apps.get_model('core', 'MissaoAluno')
+    XPDiario = apps.get_model('core', 'XPDiario')
+    DisciplinaAluno = apps.get_model('core', 'DisciplinaAluno')
+    ProgressoTurma = apps.get_model('core', 'ProgressoTurma')
+    XPPeriodo = apps.get_model('core', 'XPPeriodo')
+
+    concluidas = (
+        MissaoAluno.objects.filter(concluida=True)
+        .annotate(dia=Coalesce('data_conclusao', 'missao__data_disponivel'))
+    )
+
+    recriar(
+        XPDiario,
+        [
+            concluidas.values('aluno_id', 'dia').annotate(
+                total_xp=Sum(XP_GANHO),
+                total=Count('id'),
+                questoes=Count('id', filter=QUESTAO),
+                certas=Count('id', filter=QUESTAO & Q(acertou=True)),
+            ).order_by('aluno_id', 'dia'),
+        ],
+        lambda linha: XPDiario(
+            aluno_id=linha['aluno_id'],
+            data=linha['dia'],
+            xp=linha['total_xp'] or 0,
+            missoes_concluidas=linha['total'],
+            questoes_respondidas=linha['questoes'],
+            acertos=linha['certas'],
+        ),
+    )
+
+    concluida = Q(concluida=True)
+    recriar(
+        DisciplinaAluno,
+        [
+            MissaoAluno.objects.filter(missao__disciplina__isnull=False)
+            .values('aluno_id', 'missao__disciplina_id').annotate(
+                total=Count('id'),
+                total_concluidas=Count('id', filter=concluida),
+                total_xp=Sum(XP_GANHO, filter=concluida),
+                questoes=Count('id', filter=concluida & QUESTAO),
+                certas=Count('id', filter=concluida & QUESTAO & Q(acertou=True)),
+            ).order_by('aluno_id', 'missao__disciplina_id'),
+        ],
+        lambda linha: DisciplinaAluno(
+            aluno_id=linha['aluno_id'],
+            disciplina_id=linha['missao__disciplina_id'],
+            atribuidas=linha['total'],
+            concluidas=linha['total_concluidas'],
+            xp=linha['total_xp'] or 0,
+            questoes_respondidas=linha['questoes'],
+            acertos=linha['certas'],
+        ),
+    )
+
+    recriar(
+        ProgressoTurma,
+        [
+            concluidas.values('aluno_id', 'missao__turma_id').annotate(
+                total=Count('id'),
+                total_xp=Sum(XP_GANHO),
+            ).order_by('aluno_id', 'missao__turma_id'),
+        ],
+        lambda linha: ProgressoTurma(
+            turma_id=linha['missao__turma_id'],
+            aluno_id=linha['aluno_id'],
+            concluidas=linha['total'],
+            xp=linha['total_xp'] or 0,
+        ),
+    )
+
+    # Semana (a partir de segunda-feira) e mês, geral e por disciplina
+    baldes = []
+    for periodo, truncar in (('SEMANA', TruncWeek), ('MES', TruncMonth)):
+        por_inicio = concluidas.annotate(inicio=truncar('dia'))
+        for agrupadas in (
+            por_inicio.values('aluno_id', 'inicio'),
+            por_inicio.filter(missao__disciplina__isnull=False).values('aluno_id', 'inicio', 'missao__disciplina_id'),
+        ):
+            baldes.append(
+                agrupadas.annotate(total_xp=Sum(XP_GANHO), periodo=Value(periodo))
+                .filter(total_xp__gt=0)
+                .order_by()
+            )
+    recriar(
+        XPPeriodo,
+        baldes,
+        lambda linha: XPPeriodo(
+            aluno_id=linha['aluno_id'],
+            periodo=linha['periodo'],
+            inicio=linha['inicio'],
+            disciplina_id=linha.get('missao__disciplina_id'),
+            xp=linha['total_xp'],
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_indices_missao'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_consolidados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:44
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def preencher_batimento(apps, schema_editor):
+    # Jobs já reservados: o último sinal de vida conhecido é a reserva
+    Job = apps.get_model('core', 'Job')
+    Job.objects.filter(status='EXECUTANDO').update(batimento_em=F('iniciado_em'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_preencher_consolidados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='batimento_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(preencher_batimento, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 
+from .busca import texto_busca
+
 
 # ==========================================
 # 🆕 NOVO: Model de Disciplina
@@ -73,13 +77,33 @@ class Missao(models.Model):
     )
     duracao = models.IntegerField(null=True, blank=True, help_text="Duração em minutos")
 
+    # 🔎 Busca (ver core/busca.py)
+    # texto_busca: título + descrição normalizados, para LIKE/trigram
+    # busca: tsvector em português, preenchido por trigger no PostgreSQL
+    texto_busca = models.TextField(blank=True, default='', editable=False)
+    busca = SearchVectorField(null=True, editable=False)
+
     def __str__(self):
         return self.titulo
+
+    def save(self, *args, **kwargs):
+        self.texto_busca = texto_busca(self.titulo, self.descricao)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'titulo', 'descricao'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'texto_busca'}
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = "Missão"
         verbose_name_plural = "Missões"
         ordering = ['-data_criacao']
+        indexes = [
+            # Missões da turma, mais recentes primeiro (histórico, detalhes da turma)
+            models.Index(fields=['turma', '-data_criacao'], name='core_missao_turma_data_idx'),
+            # missao__data_criacao__date=hoje (missões de hoje no dashboard do aluno).
+            # A expressão usa o TIME_ZONE do settings: se ele mudar, o índice precisa ser recriado
+            models.Index(TruncDate('data_criacao'), name='core_missao_dia_criacao_idx'),
+        ]
 
 
 # ==========================================
@@ -117,8 +141,9 @@ class Alternativa(models.Model):
 # MissaoAluno
 # ==========================================
 class MissaoAluno(models.Model):
-    aluno = models.ForeignKey("accounts.Usuario", on_delete=models.CASCADE)
-    missao = models.ForeignKey(Missao, on_delete=models.CASCADE)
+    # Sem índice próprio: as buscas por aluno e por missão usam os índices compostos abaixo
+    aluno = models.ForeignKey("accounts.Usuario", on_delete=models.CASCADE, db_index=False)
+    missao = models.ForeignKey(Missao, on_delete=models.CASCADE, db_index=False)
     concluida = models.BooleanField(default=False)
     data_conclusao = models.DateField(null=True, blank=True)
     
@@ -135,11 +160,193 @@ class MissaoAluno(models.Model):
         unique_together = ('aluno', 'missao')
         verbose_name = "Missão do Aluno"
         verbose_name_plural = "Missões dos Alunos"
+        indexes = [
+            # Histórico e totais do aluno: aluno + concluida, ordenado por data de conclusão
+            # (missao_id no fim para o join com Missao sem voltar à tabela)
+            models.Index(
+                fields=['aluno', 'concluida', 'data_conclusao', 'missao'],
+                name='core_missaoaluno_historico_idx',
+            ),
+            # Conclusões e respostas de uma missão (professor, análise das questões)
+            models.Index(fields=['missao', 'concluida', 'acertou'], name='core_missaoaluno_missao_idx'),
+        ]
 
     def __str__(self):
         return f"{self.aluno.username} - {self.missao.titulo}"
 
 
+# ==========================================
+# 🆕 XPDiario - consolidado diário de XP por aluno
+# ==========================================
+class XPDiario(models.Model):
+    aluno = models.ForeignKey(
+        "accounts.Usuario",
+        on_delete=models.CASCADE,
+        related_name='xp_diario'
+    )
+    data = models.DateField()  # dia no fuso local (TIME_ZONE)
+    xp = models.IntegerField(default=0)
+    missoes_concluidas = models.IntegerField(default=0)
+    questoes_respondidas = models.IntegerField(default=0)
+    acertos = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('aluno', 'data')
+        verbose_name = "XP Diário"
+        verbose_name_plural = "XP Diário"
+        ordering = ['-data']
+
+    def __str__(self):
+        return f"{self.aluno.username} - {self.data}: {self.xp} XP"
+
+
+# ==========================================
+# 🆕 DisciplinaAluno - progresso do aluno por disciplina
+# ==========================================
+class DisciplinaAluno(models.Model):
+    aluno = models.ForeignKey(
+        "accounts.Usuario",
+        on_delete=models.CASCADE,
+        related_name='progresso_disciplinas'
+    )
+    disciplina = models.ForeignKey(Disciplina, on_delete=models.CASCADE)
+    atribuidas = models.IntegerField(default=0)
+    concluidas = models.IntegerField(default=0)
+    xp = models.IntegerField(default=0)
+    questoes_respondidas = models.IntegerField(default=0)
+    acertos = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('aluno', 'disciplina')
+        verbose_name = "Progresso na Disciplina"
+        verbose_name_plural = "Progresso nas Disciplinas"
+
+    def __str__(self):
+        return f"{self.aluno.username} - {self.disciplina.nome}"
+
+    def percentual_concluido(self):
+        if self.atribuidas == 0:
+            return 0
+        return int((self.concluidas / self.atribuidas) * 100)
+
+
+# ==========================================
+# 🆕 ProgressoTurma - missões concluídas pelo aluno em cada turma
+# Usado em detalhes_turma quando a turma tem muitas missões
+# ==========================================
+class ProgressoTurma(models.Model):
+    turma = models.ForeignKey(Turma, on_delete=models.CASCADE, related_name='progresso_alunos')
+    aluno = models.ForeignKey(
+        "accounts.Usuario",
+        on_delete=models.CASCADE,
+        related_name='progresso_turmas'
+    )
+    concluidas = models.IntegerField(default=0)
+    xp = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('turma', 'aluno')
+        verbose_name = "Progresso na Turma"
+        verbose_name_plural = "Progresso nas Turmas"
+
+    def __str__(self):
+        return f"{self.aluno.username} - {self.turma.nome}"
+
+
+# ==========================================
+# 🆕 XPPeriodo - XP do aluno por semana/mês (rankings por período)
+# disciplina vazia = todas as disciplinas
+# ==========================================
+class XPPeriodo(models.Model):
+    PERIODO_CHOICES = [
+        ('SEMANA', 'Semana'),  # semana ISO, começando na segunda-feira
+        ('MES', 'Mês'),
+    ]
+
+    aluno = models.ForeignKey(
+        "accounts.Usuario",
+        on_delete=models.CASCADE,
+        related_name='xp_periodos'
+    )
+    periodo = models.CharField(max_length=10, choices=PERIODO_CHOICES)
+    inicio = models.DateField()  # primeiro dia da semana/mês
+    disciplina = models.ForeignKey(Disciplina, on_delete=models.CASCADE, null=True, blank=True)
+    xp = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "XP por Período"
+        verbose_name_plural = "XP por Período"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['periodo', 'inicio', 'disciplina', 'aluno'],
+                name='core_xpperiodo_disciplina_unico',
+            ),
+            models.UniqueConstraint(
+                fields=['periodo', 'inicio', 'aluno'],
+                condition=models.Q(disciplina__isnull=True),
+                name='core_xpperiodo_geral_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['periodo', 'inicio', 'disciplina', '-xp'], name='core_xpperiodo_ranking_idx'),
+        ]
+
+    def __str__(self):
+        disciplina = self.disciplina.nome if self.disciplina_id else 'Geral'
+        return f"{self.aluno.username} - {self.get_periodo_display()} {self.inicio} ({disciplina}): {self.xp} XP"
+
+
+# ==========================================
+# 🆕 XPEvento - extrato de XP (somente inclusão)
+# Cada XP concedido vira uma linha; xp_total, nível, streak e consolidados
+# podem ser reconstruídos a partir daqui (replay_xp / reconcile_xp)
+# ==========================================
+class XPEvento(models.Model):
+    MOTIVO_CHOICES = [
+        ('TAREFA', 'Tarefa concluída'),
+        ('QUESTAO', 'Questão respondida corretamente'),
+        ('AJUSTE', 'Ajuste manual'),
+    ]
+
+    aluno = models.ForeignKey(
+        "accounts.Usuario",
+        on_delete=models.CASCADE,
+        related_name='eventos_xp'
+    )
+    missao = models.ForeignKey(Missao, on_delete=models.SET_NULL, null=True, blank=True)
+    # Uma missão atribuída só rende XP uma vez
+    missao_aluno = models.OneToOneField(
+        MissaoAluno,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='evento_xp'
+    )
+    disciplina = models.ForeignKey(Disciplina, on_delete=models.SET_NULL, null=True, blank=True)
+    xp = models.IntegerField()
+    motivo = models.CharField(max_length=10, choices=MOTIVO_CHOICES)
+    data = models.DateField()  # dia no fuso local, usado no streak e nos consolidados
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Evento de XP"
+        verbose_name_plural = "Eventos de XP"
+        indexes = [
+            models.Index(fields=['aluno', 'data'], name='core_xpevento_aluno_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.aluno.username} +{self.xp} XP ({self.get_motivo_display()}) em {self.data}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("XPEvento não pode ser alterado; registre um AJUSTE")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("XPEvento não pode ser apagado; registre um AJUSTE")
+
+
 # ==========================================
 # Badge
 # ==========================================
@@ -172,3 +379,49 @@ class BadgeUsuario(models.Model):
 
     def __str__(self):
         return f"{self.usuario.username} conquistou {self.badge.nome}"
+
+
+
+# ==========================================
+# 🆕 Job - fila de tarefas em segundo plano
+# ==========================================
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('EXECUTANDO', 'Executando'),
+        ('CONCLUIDO', 'Concluído'),
+        ('FALHOU', 'Falhou'),
+    ]
+
+    tarefa = models.CharField(max_length=100)  # nome registrado em core.fila
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    chave_idempotencia = models.CharField(max_length=200, null=True, blank=True)
+    tentativas = models.IntegerField(default=0)
+    max_tentativas = models.IntegerField(default=5)
+    executar_apos = models.DateTimeField(default=timezone.now)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    # Renovado pelo worker enquanto o job está reservado (core.fila.batimento)
+    batimento_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Job da Fila"
+        verbose_name_plural = "Jobs da Fila"
+        ordering = ['executar_apos', 'id']
+        indexes = [
+            models.Index(fields=['status', 'executar_apos'], name='core_job_fila_idx'),
+        ]
+        constraints = [
+            # Só pode existir um job pendente por chave de idempotência
+            models.UniqueConstraint(
+                fields=['chave_idempotencia'],
+                condition=models.Q(status='PENDENTE'),
+                name='core_job_chave_pendente_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tarefa} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,203 @@
+"""
+Orçamento de consultas SQL por requisição
+
+RegistroConsultas é instalado com connection.execute_wrapper e anota cada
+consulta: quantidade, tempo total, consultas repetidas (mesmo SQL com
+parâmetros diferentes, o sinal de um N+1) e as mais lentas.
+
+- OrcamentoConsultasMiddleware registra todas as requisições e escreve um
+  log em JSON (logger "xp360.consultas") quando uma delas passa do
+  orçamento definido em settings.XP360_ORCAMENTO_CONSULTAS.
+- limite_consultas(n) é usado nos testes, como context manager ou
+  decorator: falha se o bloco fizer mais de n consultas.
+"""
+
+import heapq
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('xp360.consultas')
+
+ORCAMENTO_PADRAO = {
+    'CONSULTAS': 30,  # consultas por requisição
+    'TEMPO_SQL_MS': 300,  # tempo total em SQL por requisição
+    'REPETICOES': 5,  # mesma consulta (parâmetros diferentes) dentro da requisição
+    'LENTAS': 5,  # quantas consultas mais lentas entram no log
+}
+
+
+def orcamento():
+    return {**ORCAMENTO_PADRAO, **getattr(settings, 'XP360_ORCAMENTO_CONSULTAS', {})}
+
+
+def impressao_digital(sql):
+    """SQL sem os valores: listas IN (%s, %s, ...) viram (...) e espaços são normalizados"""
+    sql = re.sub(r'\(\s*%s(?:\s*,\s*%s)*\s*\)', '(...)', sql)
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+\b', '?', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class RegistroConsultas:
+    """execute_wrapper que anota as consultas executadas"""
+
+    def __init__(self, lentas=5):
+        self.total = 0
+        self.tempo = 0.0  # segundos
+        self.digitais = Counter()
+        self.lentas = []  # heap de (segundos, sql) com as `lentas` mais lentas
+        self._maximo_lentas = lentas
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.total += 1
+            self.tempo += duracao
+            self.digitais[impressao_digital(sql)] += 1
+
+            item = (duracao, sql)
+            if len(self.lentas) < self._maximo_lentas:
+                heapq.heappush(self.lentas, item)
+            elif self._maximo_lentas:
+                heapq.heappushpop(self.lentas, item)
+
+    def repetidas(self, minimo=2):
+        """[(sql sem valores, vezes)] das consultas executadas `minimo` vezes ou mais"""
+        return [(sql, vezes) for sql, vezes in self.digitais.most_common() if vezes >= minimo]
+
+    def relatorio(self, minimo_repeticoes=2):
+        return {
+            'consultas': self.total,
+            'tempo_sql_ms': round(self.tempo * 1000, 2),
+            'repetidas': [
+                {'sql': sql[:500], 'vezes': vezes}
+                for sql, vezes in self.repetidas(minimo_repeticoes)[:10]
+            ],
+            'mais_lentas': [
+                {'sql': sql[:500], 'ms': round(duracao * 1000, 2)}
+                for duracao, sql in sorted(self.lentas, reverse=True)
+            ],
+        }
+
+    def registrar(self):
+        """Context manager que instala o registro em todas as conexões"""
+        pilha = ExitStack()
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(self))
+        return pilha
+
+
+# ==========================================
+# MIDDLEWARE
+# ==========================================
+
+class OrcamentoConsultasMiddleware:
+    """Loga em JSON as requisições que passam do orçamento de consultas"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        limites = orcamento()
+        registro = RegistroConsultas(lentas=limites['LENTAS'])
+        request.registro_consultas = registro  # lido pelo MetricasMiddleware
+
+        inicio = time.perf_counter()
+        with registro.registrar():
+            response = self.get_response(request)
+        self.avaliar(request, response, registro, limites, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        limites = orcamento()
+        registro = RegistroConsultas(lentas=limites['LENTAS'])
+        request.registro_consultas = registro
+
+        # O ORM async roda na thread de sync_to_async da requisição (thread_sensitive),
+        # que tem as suas próprias conexões: o registro é instalado nelas
+        inicio = time.perf_counter()
+        pilha = await sync_to_async(registro.registrar)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pilha.close)()
+        self.avaliar(request, response, registro, limites, time.perf_counter() - inicio)
+        return response
+
+    def avaliar(self, request, response, registro, limites, duracao):
+        estourou = [
+            motivo
+            for motivo, passou in (
+                ('consultas', registro.total > limites['CONSULTAS']),
+                ('tempo_sql', registro.tempo * 1000 > limites['TEMPO_SQL_MS']),
+                ('repeticoes', bool(registro.repetidas(limites['REPETICOES']))),
+            )
+            if passou
+        ]
+
+        if estourou:
+            logger.warning(json.dumps({
+                'evento': 'orcamento_consultas',
+                'metodo': request.method,
+                'caminho': request.path,
+                'view': getattr(request.resolver_match, 'view_name', None),
+                'status': response.status_code,
+                'estourou': estourou,
+                'tempo_ms': round(duracao * 1000, 2),
+                **registro.relatorio(limites['REPETICOES']),
+            }, ensure_ascii=False))
+
+
+# ==========================================
+# TESTES
+# ==========================================
+
+class limite_consultas(ContextDecorator):
+    """
+    Falha (AssertionError) se o bloco ou o teste decorado fizer mais de
+    `maximo` consultas. A mensagem traz as consultas repetidas e as mais lentas.
+
+        with limite_consultas(5):
+            self.client.get(url)
+
+        @limite_consultas(5)
+        def test_view(self): ...
+    """
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+
+    def __enter__(self):
+        self.registro = RegistroConsultas()
+        self._pilha = self.registro.registrar()
+        self._pilha.__enter__()
+        return self.registro
+
+    def __exit__(self, *exc_info):
+        self._pilha.__exit__(*exc_info)
+        if exc_info[0] is None and self.registro.total > self.maximo:
+            raise AssertionError(
+                f'{self.registro.total} consultas, orçamento de {self.maximo}:\n'
+                + json.dumps(self.registro.relatorio(), ensure_ascii=False, indent=2)
+            )
+        return False
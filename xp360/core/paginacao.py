@@ -0,0 +1,197 @@
+"""
+Paginação por cursor (keyset) para as APIs de histórico
+Em vez de OFFSET, cada página continua a partir dos valores da última linha
+da página anterior, então o custo é o mesmo na página 1 e na página 500.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+from datetime import date, datetime
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import F, Q
+
+from .metricas import CACHE
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def _serializar(valor):
+    # isoformat mantém os microssegundos (o DjangoJSONEncoder corta em milissegundos)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não suportado no cursor: {type(valor)}")
+
+
+def codificar_cursor(valores):
+    """Transforma os valores da última linha em um token opaco para a URL"""
+    dados = json.dumps(valores, default=_serializar, separators=(',', ':'))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token, quantidade):
+    """Lê um token gerado por codificar_cursor; levanta CursorInvalido se não for válido"""
+    try:
+        preenchimento = '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + preenchimento))
+    except (ValueError, binascii.Error) as erro:
+        raise CursorInvalido(str(erro))
+
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        raise CursorInvalido("Cursor com formato inesperado")
+
+    return valores
+
+
+def _depois_de(campos, valores):
+    """
+    Condição das linhas que vêm depois do cursor, numa ordenação
+    decrescente em todos os campos com NULLs primeiro
+    """
+    campo, valor = campos[0], valores[0]
+
+    if valor is None:
+        depois = Q(**{f'{campo}__isnull': False})
+        igual = Q(**{f'{campo}__isnull': True})
+    else:
+        depois = Q(**{f'{campo}__lt': valor})
+        igual = Q(**{campo: valor})
+
+    if len(campos) == 1:
+        return depois
+
+    return depois | (igual & _depois_de(campos[1:], valores[1:]))
+
+
+def _campo_do_modelo(modelo, campo):
+    partes = campo.split('__')
+    for parte in partes[:-1]:
+        modelo = modelo._meta.get_field(parte).related_model
+    return modelo._meta.get_field(partes[-1])
+
+
+def _converter(queryset, campo, valor):
+    """
+    Valor do cursor convertido para o tipo do campo (datas em ISO, ids
+    e relevância inteiros); levanta CursorInvalido se não bater
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, bool):
+        raise CursorInvalido(f"Valor inválido para {campo}")
+
+    if campo in queryset.query.annotations:
+        # Anotações do histórico (relevancia) são inteiras: um float voltando
+        # do JSON não compararia igual no desempate
+        if not isinstance(valor, int):
+            raise CursorInvalido(f"Valor inválido para {campo}")
+        return valor
+
+    campo_modelo = _campo_do_modelo(queryset.model, campo)
+    if isinstance(campo_modelo, (models.DateField, models.TimeField)):
+        tipos = (str,)
+    elif isinstance(campo_modelo, (models.IntegerField, models.AutoField)):
+        tipos = (int,)
+    else:
+        tipos = (str, int, float)
+    if not isinstance(valor, tipos):
+        raise CursorInvalido(f"Valor inválido para {campo}")
+
+    try:
+        return campo_modelo.to_python(valor)
+    except ValidationError as erro:
+        raise CursorInvalido(f"Valor inválido para {campo}: {erro.messages[0]}")
+
+
+def _valor(objeto, campo):
+    for parte in campo.split('__'):
+        objeto = getattr(objeto, parte)
+    return objeto
+
+
+def _pagina(queryset, campos, cursor, por_pagina):
+    """Queryset ordenado e filtrado pelo cursor, com uma linha a mais (para has_more)"""
+    queryset = queryset.order_by(*[F(campo).desc(nulls_first=True) for campo in campos])
+
+    if cursor:
+        valores = decodificar_cursor(cursor, len(campos))
+        valores = [_converter(queryset, campo, valor) for campo, valor in zip(campos, valores)]
+        queryset = queryset.filter(_depois_de(campos, valores))
+
+    return queryset[:por_pagina + 1]
+
+
+def _proximo(itens, campos, por_pagina):
+    """(itens da página, cursor da próxima página ou None)"""
+    tem_mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+
+    proximo = None
+    if tem_mais:
+        proximo = codificar_cursor([_valor(itens[-1], campo) for campo in campos])
+
+    return itens, proximo
+
+
+def paginar(queryset, campos, cursor=None, por_pagina=20):
+    """
+    Ordena por `campos` (todos decrescentes, NULLs primeiro) e retorna
+    (itens da página, cursor da próxima página ou None).
+
+    O último campo deve ser único (ex.: 'id') para desempatar.
+    has_more vem de buscar uma linha a mais, sem COUNT.
+    """
+    itens = list(_pagina(queryset, campos, cursor, por_pagina))
+    return _proximo(itens, campos, por_pagina)
+
+
+async def apaginar(queryset, campos, cursor=None, por_pagina=20):
+    """paginar() para views async (aiterator)"""
+    itens = [item async for item in _pagina(queryset, campos, cursor, por_pagina).aiterator()]
+    return _proximo(itens, campos, por_pagina)
+
+
+def _chave_total(prefixo, filtros):
+    assinatura = hashlib.md5(
+        json.dumps(filtros, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f'{prefixo}:total:{assinatura}'
+
+
+def total_em_cache(queryset, prefixo, filtros, timeout=60):
+    """
+    COUNT do queryset guardado em cache por alguns segundos.
+    `filtros` identifica a consulta (usuário + parâmetros da busca).
+    """
+    chave = _chave_total(prefixo, filtros)
+
+    total = cache.get(chave)
+    if total is None:
+        CACHE.inc(cache='contagem', resultado='falha')
+        total = queryset.count()
+        cache.set(chave, total, timeout)
+    else:
+        CACHE.inc(cache='contagem', resultado='acerto')
+
+    return total
+
+
+async def atotal_em_cache(queryset, prefixo, filtros, timeout=60):
+    """total_em_cache() para views async (acount)"""
+    chave = _chave_total(prefixo, filtros)
+
+    total = await cache.aget(chave)
+    if total is None:
+        CACHE.inc(cache='contagem', resultado='falha')
+        total = await queryset.acount()
+        await cache.aset(chave, total, timeout)
+    else:
+        CACHE.inc(cache='contagem', resultado='acerto')
+
+    return total
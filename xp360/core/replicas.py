@@ -0,0 +1,176 @@
+"""
+Leituras em réplicas do banco (DATABASE_ROUTERS)
+
+Só as views marcadas com @ler_da_replica (históricos, ranking, conquistas,
+análises) leem de uma das réplicas em settings.XP360_REPLICAS; todo o resto,
+e todas as escritas, usam o primário (default).
+
+Ler o que acabou de escrever: quando uma requisição grava algo no banco
+(concluir uma missão, responder uma questão...), o PrimarioAposEscritaMiddleware
+guarda na sessão um prazo de XP360_JANELA_PRIMARIO segundos. Até lá as views
+de réplica daquele usuário continuam lendo do primário, então o histórico e o
+ranking já mostram a conclusão mesmo com a réplica atrasada. Dentro da própria
+requisição, depois de uma escrita ou dentro de uma transação, as leituras
+também voltam para o primário.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+CHAVE_SESSAO = 'xp360_primario_ate'
+JANELA_PADRAO = 15  # segundos
+
+# Estado da requisição atual: {'replica': alias ou None, 'escreveu': bool}.
+# Um dicionário (e não vários ContextVar) para que as mudanças feitas dentro
+# de sync_to_async apareçam para o middleware.
+_requisicao = ContextVar('xp360_requisicao_banco', default=None)
+
+
+def replicas():
+    """Aliases de réplica configurados (e existentes em DATABASES)"""
+    return [alias for alias in getattr(settings, 'XP360_REPLICAS', []) if alias in settings.DATABASES]
+
+
+def janela_primario():
+    return getattr(settings, 'XP360_JANELA_PRIMARIO', JANELA_PADRAO)
+
+
+def primario_fixado(request):
+    """True se o usuário escreveu algo há menos de XP360_JANELA_PRIMARIO segundos"""
+    sessao = getattr(request, 'session', None)
+    return sessao is not None and sessao.get(CHAVE_SESSAO, 0) > time.time()
+
+
+class RoteadorReplicas:
+    def db_for_read(self, model, **hints):
+        estado = _requisicao.get()
+        if estado is None or estado['replica'] is None or estado['escreveu']:
+            return None
+
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Dentro de uma transação (select_for_update, leitura depois de escrita)
+            return None
+
+        return estado['replica']
+
+    def db_for_write(self, model, **hints):
+        estado = _requisicao.get()
+        if estado is not None:
+            estado['escreveu'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # As réplicas são cópias do primário: os objetos podem se relacionar
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o schema pela replicação
+        return db not in replicas()
+
+
+# ==========================================
+# VIEWS E MIDDLEWARE
+# ==========================================
+
+def _escolher_replica(request):
+    aliases = replicas()
+    if not aliases or primario_fixado(request):
+        return None
+    return random.choice(aliases)
+
+
+async def _aescolher_replica(request):
+    aliases = replicas()
+    if not aliases:
+        return None
+    sessao = getattr(request, 'session', None)
+    if sessao is not None and await sessao.aget(CHAVE_SESSAO, 0) > time.time():
+        return None
+    return random.choice(aliases)
+
+
+def ler_da_replica(view):
+    """
+    Decorator de views somente leitura: as consultas da view vão para uma
+    réplica (a mesma durante toda a requisição), salvo se o usuário está na
+    janela de leitura do primário
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def view_async(request, *args, **kwargs):
+            estado = _requisicao.get()
+            if estado is not None:
+                estado['replica'] = await _aescolher_replica(request)
+            return await view(request, *args, **kwargs)
+
+        return view_async
+
+    @wraps(view)
+    def view_sync(request, *args, **kwargs):
+        estado = _requisicao.get()
+        if estado is not None:
+            estado['replica'] = _escolher_replica(request)
+        return view(request, *args, **kwargs)
+
+    return view_sync
+
+
+class PrimarioAposEscritaMiddleware:
+    """
+    Cria o estado de roteamento da requisição e, se ela escreveu no banco,
+    abre a janela em que o usuário lê só do primário
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = _requisicao.set({'replica': None, 'escreveu': False})
+        try:
+            response = self.get_response(request)
+            escreveu = _requisicao.get()['escreveu']
+        finally:
+            _requisicao.reset(token)
+
+        usuario = getattr(request, 'user', None)
+        if escreveu and replicas() and usuario is not None and usuario.is_authenticated:
+            # Só regrava a sessão quando o prazo guardado já passou da metade
+            agora = time.time()
+            janela = janela_primario()
+            if request.session.get(CHAVE_SESSAO, 0) < agora + janela / 2:
+                request.session[CHAVE_SESSAO] = agora + janela
+
+        return response
+
+    async def __acall__(self, request):
+        token = _requisicao.set({'replica': None, 'escreveu': False})
+        try:
+            response = await self.get_response(request)
+            escreveu = _requisicao.get()['escreveu']
+        finally:
+            _requisicao.reset(token)
+
+        if escreveu and replicas() and hasattr(request, 'auser'):
+            usuario = await request.auser()
+            if usuario.is_authenticated:
+                agora = time.time()
+                janela = janela_primario()
+                if await request.session.aget(CHAVE_SESSAO, 0) < agora + janela / 2:
+                    await request.session.aset(CHAVE_SESSAO, agora + janela)
+
+        return response
@@ -0,0 +1,56 @@
+"""
+Tarefas executadas pela fila (core.fila)
+Registradas quando o app core é carregado
+"""
+
+import logging
+
+from .fila import tarefa
+from .atribuicoes import distribuir_missoes as _distribuir_missoes
+from .models import Missao
+
+
+logger = logging.getLogger(__name__)
+
+
+@tarefa('distribuir_missoes')
+def distribuir_missoes(missao_id=None, alunos_ids=None, turmas_ids=None):
+    """Cria as MissaoAluno de uma missão nova ou de um aluno que entrou em turmas"""
+    missao = None
+    if missao_id is not None:
+        missao = Missao.objects.filter(pk=missao_id).first()
+        if missao is None:
+            return  # Missão apagada antes do job rodar
+
+    criadas = _distribuir_missoes(missao=missao, alunos_ids=alunos_ids, turmas_ids=turmas_ids)
+    logger.info("Distribuição concluída: %s MissaoAluno criadas", criadas)
+
+
+@tarefa('avaliar_badges')
+def avaliar_badges(usuario_id, evento=None):
+    """Verifica e concede as badges que o evento pode ter liberado"""
+    from accounts.models import Usuario
+    from accounts.badges import verificar_e_conceder_badges
+
+    usuario = Usuario.objects.filter(pk=usuario_id).first()
+    if usuario is not None:
+        verificar_e_conceder_badges(usuario, evento)
+
+
+@tarefa('xp_alterado')
+def xp_alterado(usuario_id):
+    """Agenda a reconstrução do ranking das turmas do aluno e do geral"""
+    from accounts.models import Usuario
+    from accounts.ranking import xp_alterado as _xp_alterado
+
+    usuario = Usuario.objects.filter(pk=usuario_id).first()
+    if usuario is not None:
+        _xp_alterado(usuario)
+
+
+@tarefa('atualizar_ranking')
+def atualizar_ranking(turma_id=None):
+    """Recalcula as posições do ranking de uma turma (ou do geral)"""
+    from accounts.ranking import reconstruir_ranking
+
+    reconstruir_ranking(turma_id)
@@ -1,3 +1,1103 @@
-from django.test import TestCase
+import base64
+import re
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from math import sqrt
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Badge, BadgeUsuario, Usuario
+from accounts.ranking import reconstruir_ranking
+from . import benchmark, catalogo, fila
+from .analise_itens import analisar_missao, analisar_questoes, analisar_turma
+from .atribuicoes import distribuir_missoes, pares_faltantes
+from .busca import buscar_missoes, normalizar
+from .conclusao import concluir_missao_aluno
+from .mapa_calor import MatrizBits, mapa_conclusao
+from .estatisticas import (
+    reconstruir_disciplinas, reconstruir_xp_diario, reconstruir_turmas, recalcular_contadores,
+)
+from .eventos_xp import divergencias, reaplicar_consolidados
+from .massa_dados import Dimensoes, PREFIXO, gerar_escola, limpar_escola
+from .models import (
+    Disciplina, Turma, Missao, MissaoAluno, Alternativa,
+    XPDiario, DisciplinaAluno, ProgressoTurma, XPPeriodo, XPEvento, Job,
+)
+from .orcamento import RegistroConsultas, limite_consultas
+from .paginacao import codificar_cursor
+from .replicas import CHAVE_SESSAO
+
+
+# ==========================================
+# PLANOS DAS CONSULTAS MAIS USADAS
+# ==========================================
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Planos do PostgreSQL (o SQLite não usa colunas booleanas nem expressões com parâmetros nos índices)',
+)
+class PlanoConsultasTests(TestCase):
+    """
+    Garante que as consultas quentes das views continuam usando os índices
+    de Missao e MissaoAluno (EXPLAIN sobre uma massa de dados sintética,
+    com estatísticas atualizadas por ANALYZE).
+
+    Só roda no PostgreSQL: em outro banco a classe inteira é pulada.
+    """
+
+    TURMAS = 50
+    ALUNOS_POR_TURMA = 4
+    MISSOES_POR_TURMA = 200
+    DIAS = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        professor = Usuario.objects.create_user('professor_plano', password='x', tipo='PROFESSOR')
+        disciplina = Disciplina.objects.create(nome='Matemática', icone='📐')
+
+        turmas = Turma.objects.bulk_create([
+            Turma(nome=f'Turma {i}', serie='1º ano', ano_letivo=2026, professor=professor)
+            for i in range(cls.TURMAS)
+        ])
+
+        alunos = Usuario.objects.bulk_create([
+            Usuario(username=f'aluno_plano_{i}', tipo='ALUNO')
+            for i in range(cls.TURMAS * cls.ALUNOS_POR_TURMA)
+        ])
+
+        # Matrículas direto na tabela intermediária (sem os signals de distribuição)
+        Matricula = Usuario.turmas_aluno.through
+        Matricula.objects.bulk_create([
+            Matricula(usuario_id=aluno.pk, turma_id=turmas[i // cls.ALUNOS_POR_TURMA].pk)
+            for i, aluno in enumerate(alunos)
+        ])
+
+        missoes = Missao.objects.bulk_create([
+            Missao(
+                titulo=f'Missão {t}-{j}',
+                descricao='',
+                xp=10,
+                turma=turma,
+                disciplina=disciplina,
+                tipo='QUESTAO' if j % 3 == 0 else 'TAREFA',
+            )
+            for t, turma in enumerate(turmas)
+            for j in range(cls.MISSOES_POR_TURMA)
+        ])
+
+        # Espalha as missões pelos últimos DIAS dias (data_criacao é auto_now_add)
+        agora = timezone.now()
+        for dias_atras in range(cls.DIAS):
+            Missao.objects.filter(
+                pk__in=[missao.pk for missao in missoes[dias_atras::cls.DIAS]]
+            ).update(data_criacao=agora - timedelta(days=dias_atras))
+
+        hoje = timezone.localdate()
+        MissaoAluno.objects.bulk_create([
+            MissaoAluno(
+                aluno_id=aluno.pk,
+                missao_id=missao.pk,
+                concluida=(aluno.pk + missao.pk) % 5 < 3,
+                data_conclusao=hoje - timedelta(days=(aluno.pk + missao.pk) % 60) if (aluno.pk + missao.pk) % 5 < 3 else None,
+                acertou=(aluno.pk + missao.pk) % 2 == 0,
+            )
+            for i, aluno in enumerate(alunos)
+            for missao in missoes[
+                (i // cls.ALUNOS_POR_TURMA) * cls.MISSOES_POR_TURMA:
+                (i // cls.ALUNOS_POR_TURMA + 1) * cls.MISSOES_POR_TURMA
+            ]
+        ], batch_size=2000)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.turma = turmas[3]
+        cls.aluno = alunos[3 * cls.ALUNOS_POR_TURMA + 2]
+        cls.missao = missoes[3 * cls.MISSOES_POR_TURMA + 9]
+
+    def assertUsaIndice(self, queryset, indice):
+        plano = queryset.explain()
+        self.assertIn(indice, plano, msg=f'\n{queryset.query}\n{plano}')
+
+    def assertSemVarreduraCompleta(self, queryset, *tabelas):
+        """Nenhuma das tabelas é lida inteira (Seq Scan)"""
+        plano = queryset.explain()
+        for tabela in tabelas:
+            self.assertIsNone(
+                re.search(rf'Seq Scan on {tabela}\b', plano),
+                msg=f'\n{queryset.query}\n{plano}',
+            )
+
+    def test_historico_do_aluno(self):
+        # api_historico_aluno (?status=concluidas), ordenado pela data de conclusão
+        missoes = MissaoAluno.objects.filter(aluno=self.aluno, concluida=True).order_by('-data_conclusao')
+        self.assertUsaIndice(missoes, 'core_missaoaluno_historico_idx')
+
+    def test_questoes_respondidas_do_aluno(self):
+        # historico_aluno: questões concluídas e acertos
+        questoes = MissaoAluno.objects.filter(aluno=self.aluno, concluida=True, missao__tipo='QUESTAO')
+        self.assertUsaIndice(questoes, 'core_missaoaluno_historico_idx')
+        self.assertSemVarreduraCompleta(questoes, 'core_missaoaluno')
+
+    def test_missoes_da_turma(self):
+        # detalhes_turma / historico_professor: missões da turma, mais recentes primeiro
+        missoes = Missao.objects.filter(turma=self.turma).order_by('-data_criacao')
+        self.assertUsaIndice(missoes, 'core_missao_turma_data_idx')
+
+    def test_missoes_de_hoje(self):
+        # dashboard_aluno: missao__data_criacao__date=hoje
+        hoje = timezone.localdate()
+        self.assertUsaIndice(Missao.objects.filter(data_criacao__date=hoje), 'core_missao_dia_criacao_idx')
+
+        missoes_do_aluno = MissaoAluno.objects.filter(aluno=self.aluno, missao__data_criacao__date=hoje)
+        self.assertSemVarreduraCompleta(missoes_do_aluno, 'core_missaoaluno')
+
+    def test_respostas_de_uma_missao(self):
+        # detalhes_missao / análise das questões: conclusões e acertos de uma missão
+        respostas = MissaoAluno.objects.filter(missao=self.missao, concluida=True)
+        self.assertUsaIndice(respostas, 'core_missaoaluno_missao_idx')
+
+
+# ==========================================
+# ORÇAMENTO DE CONSULTAS DAS VIEWS
+# ==========================================
+
+@override_settings(XP360_FILA_SINCRONA=False)
+class DadosEscola(TestCase):
+    """
+    Turma com alunos, tarefas e questões (algumas já concluídas) para os
+    testes de orçamento de consultas. Os orçamentos não podem depender do
+    tamanho da turma: uma consulta por aluno ou por missão estoura o limite.
+
+    A fila fica assíncrona como em produção: os jobs só são gravados,
+    o trabalho deles não entra no orçamento da requisição.
+    """
+
+    ALUNOS = 8
+    TAREFAS = 4
+    QUESTOES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = Usuario.objects.create_user('professor', password='senha', tipo='PROFESSOR')
+        cls.disciplina = Disciplina.objects.create(nome='Matemática', icone='📐')
+        cls.turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=cls.professor)
+
+        cls.alunos = [
+            Usuario.objects.create_user(f'aluno{i}', password='senha', tipo='ALUNO')
+            for i in range(cls.ALUNOS)
+        ]
+        Matricula = Usuario.turmas_aluno.through
+        Matricula.objects.bulk_create([
+            Matricula(usuario_id=aluno.pk, turma_id=cls.turma.pk) for aluno in cls.alunos
+        ])
+
+        cls.missoes = []
+        for i in range(cls.TAREFAS + cls.QUESTOES):
+            questao = i >= cls.TAREFAS
+            missao = Missao.objects.create(
+                titulo=f'Missão {i}',
+                descricao='Descrição',
+                xp=10,
+                turma=cls.turma,
+                disciplina=cls.disciplina,
+                tipo='QUESTAO' if questao else 'TAREFA',
+            )
+            if questao:
+                Alternativa.objects.bulk_create([
+                    Alternativa(missao=missao, texto=f'Opção {ordem}', ordem=ordem, correta=ordem == 'B')
+                    for ordem in 'ABCD'
+                ])
+            cls.missoes.append(missao)
+        cls.tarefa = cls.missoes[0]
+        cls.questao = cls.missoes[-1]
+
+        distribuir_missoes()
+
+        # Metade dos alunos já concluiu metade das missões
+        for aluno in cls.alunos[:cls.ALUNOS // 2]:
+            for missao in cls.missoes[::2]:
+                missao_aluno = MissaoAluno.objects.get(aluno=aluno, missao=missao)
+                concluir_missao_aluno(aluno, missao_aluno.pk, resposta='AB'[aluno.pk % 2])
+
+        reconstruir_ranking(None)
+        reconstruir_ranking(cls.turma.pk)
+
+        cls.aluno = cls.alunos[0]
+
+    def setUp(self):
+        # Orçamentos medidos com os caches vazios (o pior caso)
+        cache.clear()
+
+    def entrar(self, usuario):
+        self.client.force_login(usuario)
+
+    def pendente(self, missao):
+        return MissaoAluno.objects.get(aluno=self.aluno, missao=missao, concluida=False)
+
+
+class OrcamentoViewsCoreTests(DadosEscola):
+
+    def test_criar_missao(self):
+        self.entrar(self.professor)
+        dados = {
+            'titulo': 'Nova', 'descricao': 'x', 'xp': 10, 'turma': self.turma.pk,
+            'disciplina': self.disciplina.pk, 'tipo': 'QUESTAO', 'resposta_correta': 'A',
+            'alternativa_a': '1', 'alternativa_b': '2', 'alternativa_c': '3', 'alternativa_d': '4',
+        }
+        with limite_consultas(12):
+            response = self.client.post(reverse('criar_missao'), dados)
+        self.assertEqual(response.status_code, 302)
+
+    def test_concluir_missao(self):
+        self.entrar(self.aluno)
+        missao_aluno = self.pendente(self.missoes[1])
+        with limite_consultas(28):
+            response = self.client.get(reverse('concluir_missao', args=[missao_aluno.pk]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_responder_questao_get(self):
+        self.entrar(self.aluno)
+        missao_aluno = self.pendente(self.missoes[-1])
+        with limite_consultas(5):
+            response = self.client.get(reverse('responder_questao', args=[missao_aluno.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_responder_questao_post(self):
+        self.entrar(self.aluno)
+        missao_aluno = self.pendente(self.missoes[-1])
+        with limite_consultas(28):
+            response = self.client.post(reverse('responder_questao', args=[missao_aluno.pk]), {'resposta': 'B'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_historico_aluno(self):
+        self.entrar(self.aluno)
+        with limite_consultas(7):
+            response = self.client.get(reverse('historico_aluno'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_historico_aluno(self):
+        self.entrar(self.aluno)
+        with limite_consultas(4):
+            response = self.client.get(reverse('api_historico_aluno'), {'total': '1'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_historico_professor(self):
+        self.entrar(self.professor)
+        with limite_consultas(7):
+            response = self.client.get(reverse('historico_professor'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_historico_professor(self):
+        self.entrar(self.professor)
+        with limite_consultas(4):
+            response = self.client.get(reverse('api_historico_professor'), {'total': '1'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_detalhes_missao(self):
+        self.entrar(self.professor)
+        with limite_consultas(9):
+            response = self.client.get(reverse('detalhes_missao', args=[self.questao.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_analise_turma(self):
+        self.entrar(self.professor)
+        with limite_consultas(5):
+            response = self.client.get(reverse('api_analise_turma', args=[self.turma.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_mapa_turma(self):
+        self.entrar(self.professor)
+        with limite_consultas(6):
+            response = self.client.get(reverse('api_mapa_turma', args=[self.turma.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(XP360_METRICAS_TOKEN='segredo')
+    def test_metricas(self):
+        # Lido pelo Prometheus sem sessão: nenhuma consulta
+        with limite_consultas(0):
+            response = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+
+
+# ==========================================
+# CONCLUSÃO DE MISSÕES
+# ==========================================
+
+class ConclusaoTests(DadosEscola):
+
+    def setUp(self):
+        super().setUp()
+        # Aluno que ainda não concluiu nada
+        self.aluno = Usuario.objects.get(pk=self.alunos[-1].pk)
+
+    def estado(self):
+        aluno = Usuario.objects.get(pk=self.aluno.pk)
+        return {
+            'xp_total': aluno.xp_total,
+            'streak_atual': aluno.streak_atual,
+            'total_concluidas': aluno.total_concluidas,
+            'eventos': XPEvento.objects.filter(aluno=aluno).count(),
+            'diario': list(XPDiario.objects.filter(aluno=aluno).values_list('xp', 'missoes_concluidas')),
+            'badges': list(BadgeUsuario.objects.filter(usuario=aluno).values_list('badge_id', flat=True)),
+        }
+
+    def preparar_streak(self, dias_desde_ultima, streak, melhor):
+        hoje = timezone.localdate()
+        Usuario.objects.filter(pk=self.aluno.pk).update(
+            streak_atual=streak,
+            melhor_streak=melhor,
+            ultima_missao_concluida=hoje - timedelta(days=dias_desde_ultima),
+        )
+        self.aluno.refresh_from_db()
+
+    @override_settings(XP360_FILA_SINCRONA=True)
+    def test_concluir_duas_vezes(self):
+        badge = Badge.objects.create(nome='Primeira', descricao='x', icone='🎯', tipo='MISSOES', condicao_valor=1)
+        missao_aluno = self.pendente(self.tarefa)
+
+        primeiro = concluir_missao_aluno(self.aluno, missao_aluno.pk)
+        depois = self.estado()
+        segundo = concluir_missao_aluno(self.aluno, missao_aluno.pk)
+
+        self.assertEqual(self.estado(), depois)
+        self.assertEqual(depois['xp_total'], 10)
+        self.assertEqual(depois['eventos'], 1)
+        self.assertEqual(depois['diario'], [(10, 1)])
+        self.assertEqual(depois['badges'], [badge.pk])
+
+        self.assertEqual((primeiro.concluida, primeiro.xp_ganho, primeiro.acertou), (True, 10, None))
+        self.assertEqual((segundo.concluida, segundo.xp_ganho), (False, 0))
+
+    def test_clique_duplo_na_view(self):
+        self.entrar(self.aluno)
+        missao_aluno = self.pendente(self.questao)
+        url = reverse('responder_questao', args=[missao_aluno.pk])
+
+        self.client.post(url, {'resposta': 'B'})
+        depois = self.estado()
+        self.client.post(url, {'resposta': 'B'})
+
+        self.assertEqual(self.estado(), depois)
+        self.assertEqual((depois['xp_total'], depois['eventos'], depois['total_concluidas']), (10, 1, 1))
+
+    def test_questao_errada(self):
+        self.preparar_streak(1, streak=2, melhor=2)
+        resultado = concluir_missao_aluno(self.aluno, self.pendente(self.questao).pk, resposta='A')
+
+        self.assertEqual((resultado.concluida, resultado.xp_ganho, resultado.acertou), (True, 0, False))
+        self.assertEqual((resultado.streak_atual, resultado.notificacao_streak()), (2, None))
+        estado = self.estado()
+        self.assertEqual((estado['xp_total'], estado['eventos'], estado['streak_atual']), (0, 0, 2))
+
+    def test_subiu_nivel(self):
+        Usuario.objects.filter(pk=self.aluno.pk).update(xp_total=95)
+        resultado = concluir_missao_aluno(self.aluno, self.pendente(self.tarefa).pk)
+        self.assertEqual((resultado.nivel, resultado.subiu_nivel), (2, True))
+        self.assertEqual(Usuario.objects.get(pk=self.aluno.pk).nivel, 2)
+
+    def test_streak_continua(self):
+        self.preparar_streak(1, streak=3, melhor=3)
+        resultado = concluir_missao_aluno(self.aluno, self.pendente(self.tarefa).pk)
+        self.assertEqual((resultado.streak_anterior, resultado.streak_atual, resultado.novo_recorde), (3, 4, True))
+        self.assertEqual(resultado.notificacao_streak(), {'dias': 4, 'tipo': 'novo_recorde'})
+
+    def test_streak_mesmo_dia(self):
+        self.preparar_streak(0, streak=2, melhor=5)
+        resultado = concluir_missao_aluno(self.aluno, self.pendente(self.tarefa).pk)
+        self.assertEqual((resultado.streak_atual, resultado.notificacao_streak()), (2, None))
+
+    def test_streak_perdido(self):
+        self.preparar_streak(3, streak=5, melhor=7)
+        resultado = concluir_missao_aluno(self.aluno, self.pendente(self.tarefa).pk)
+        self.assertEqual((resultado.streak_atual, resultado.novo_recorde), (1, False))
+        self.assertEqual(resultado.notificacao_streak(), {'dias': 5, 'tipo': 'perdeu'})
+        aluno = Usuario.objects.get(pk=self.aluno.pk)
+        self.assertEqual((aluno.streak_atual, aluno.melhor_streak), (1, 7))
+
+
+# ==========================================
+# CONSOLIDADOS AO APAGAR MISSÕES
+# ==========================================
+
+CONSOLIDADOS_XP = (
+    (XPDiario, ('aluno_id', 'data')),
+    (DisciplinaAluno, ('aluno_id', 'disciplina_id')),
+    (ProgressoTurma, ('aluno_id', 'turma_id')),
+    (XPPeriodo, ('aluno_id', 'periodo', 'inicio', 'disciplina_id')),
+)
+
+
+def xp_consolidado():
+    """XP de cada consolidado, para comparar com o replay do extrato"""
+    return {
+        model.__name__: sorted(model.objects.values_list(*chaves, 'xp'), key=repr)
+        for model, chaves in CONSOLIDADOS_XP
+    }
+
+
+class MissoesApagadasTests(DadosEscola):
+    # Contagens de cada consolidado: comparadas com as reconstruções a partir de MissaoAluno
+    CONTAGENS = (
+        (DisciplinaAluno, ('aluno_id', 'disciplina_id'), ('atribuidas', 'concluidas', 'questoes_respondidas', 'acertos')),
+        (XPDiario, ('aluno_id', 'data'), ('missoes_concluidas', 'questoes_respondidas', 'acertos')),
+        (ProgressoTurma, ('aluno_id', 'turma_id'), ('concluidas', 'xp')),
+        (Usuario, ('pk',), ('total_concluidas', 'total_questoes', 'total_acertos')),
+    )
+
+    def contagens(self):
+        return {
+            model.__name__: sorted(
+                # Linha sem nenhuma contagem: só guarda XP de toda a vida (ou nem existe na reconstrução)
+                linha for linha in model.objects.values_list(*chaves, *campos) if any(linha[len(chaves):])
+            )
+            for model, chaves, campos in self.CONTAGENS
+        }
+
+    def reconstruir(self):
+        alunos = [aluno.pk for aluno in self.alunos]
+        reconstruir_disciplinas()
+        reconstruir_xp_diario()
+        reconstruir_turmas()
+        recalcular_contadores(alunos)
+
+    def test_apagar_missao(self):
+        # Uma tarefa e uma questão, concluídas por metade dos alunos
+        for missao in (self.missoes[0], self.missoes[-2]):
+            missao.delete()
+        depois = self.contagens()
+        xp = xp_consolidado()
+
+        self.reconstruir()
+        self.assertEqual(depois, self.contagens())
+
+        # O XP que continua (diário, disciplina, períodos) é o do extrato
+        reaplicar_consolidados([aluno.pk for aluno in self.alunos])
+        self.assertEqual(xp, xp_consolidado())
+
+    def test_apagar_turma(self):
+        self.turma.delete()
+        depois = self.contagens()
+        self.assertEqual(depois['DisciplinaAluno'], [])
+        self.assertEqual(depois['XPDiario'], [])
+        self.assertEqual(depois['Usuario'], [])
+        self.assertFalse(ProgressoTurma.objects.exists())
+
+        self.reconstruir()
+        self.assertEqual(depois, self.contagens())
+
+
+# ==========================================
+# DISTRIBUIÇÃO DE MISSÕES
+# ==========================================
+
+class DistribuicaoTests(DadosEscola):
+
+    def atribuidas(self):
+        return sorted(DisciplinaAluno.objects.values_list('aluno_id', 'disciplina_id', 'atribuidas'))
+
+    def test_distribuir_duas_vezes(self):
+        antes = self.atribuidas()
+        self.assertEqual(distribuir_missoes(), 0)
+        self.assertEqual(self.atribuidas(), antes)
+
+    def test_distribuicao_concorrente(self):
+        # Job enfileirado, ainda não executado
+        missao = Missao.objects.create(
+            titulo='Nova', descricao='x', xp=10, turma=self.turma, disciplina=self.disciplina, tipo='TAREFA',
+        )
+        lidos = pares_faltantes(missao=missao)
+        self.assertEqual(distribuir_missoes(missao=missao), self.ALUNOS)
+        depois = self.atribuidas()
+
+        # Outra distribuição leu os mesmos pares antes das linhas existirem
+        with mock.patch('core.atribuicoes.pares_faltantes', return_value=lidos):
+            self.assertEqual(distribuir_missoes(missao=missao), 0)
+        self.assertEqual(self.atribuidas(), depois)
+        self.assertEqual(MissaoAluno.objects.filter(missao=missao).count(), self.ALUNOS)
+
+
+# ==========================================
+# EXTRATO DE XP (REPLAY)
+# ==========================================
+
+class ReplayXPTests(DadosEscola):
+
+    def test_replay_corrige_todos_os_consolidados(self):
+        esperado = xp_consolidado()
+        alunos = [aluno.pk for aluno in self.alunos]
+
+        for model, _ in CONSOLIDADOS_XP:
+            model.objects.filter(aluno_id__in=alunos).update(xp=F('xp') + 7)
+        reaplicar_consolidados(alunos)
+
+        self.assertEqual(xp_consolidado(), esperado)
+
+    def test_replay_recria_linhas_apagadas(self):
+        esperado = xp_consolidado()
+        aluno = self.alunos[0]
+
+        # Uma linha de cada consolidado some
+        for model, _ in CONSOLIDADOS_XP:
+            model.objects.filter(pk=model.objects.filter(aluno=aluno, xp__gt=0).order_by('pk')[0].pk).delete()
+        reaplicar_consolidados([aluno.pk])
+
+        self.assertEqual(xp_consolidado(), esperado)
+
+
+# ==========================================
+# BUSCA DE MISSÕES
+# ==========================================
+
+class BuscaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        professor = Usuario.objects.create_user('professor', password='x', tipo='PROFESSOR')
+        turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=professor)
+        cls.missoes = {
+            titulo: Missao.objects.create(titulo=titulo, descricao=descricao, xp=10, turma=turma, tipo='TAREFA')
+            for titulo, descricao in (
+                ('Ação e Reação', 'Leis de Newton'),
+                ('Frações', 'Soma de frações com denominadores diferentes'),
+                ('Fotossíntese', 'Como as plantas produzem energia'),
+            )
+        }
+
+    def buscar(self, termo):
+        return sorted(missao.titulo for missao in buscar_missoes(Missao.objects.all(), termo))
+
+    def test_normalizar(self):
+        self.assertEqual(normalizar('  Ação É REAÇÃO '), '  acao e reacao ')
+        self.assertEqual(normalizar(None), '')
+
+    def test_sem_acento_e_maiusculas(self):
+        self.assertEqual(self.buscar('REACAO'), ['Ação e Reação'])
+        self.assertEqual(self.buscar('fraçoes'), ['Frações'])
+        self.assertEqual(self.buscar('PLANTAS'), ['Fotossíntese'])
+
+    def test_todas_as_palavras(self):
+        self.assertEqual(self.buscar('acao newton'), ['Ação e Reação'])
+        self.assertEqual(self.buscar('acao energia'), [])
+
+    def test_termo_vazio(self):
+        self.assertEqual(len(self.buscar('   ')), len(self.missoes))
+
+    def test_texto_atualizado_ao_salvar(self):
+        missao = self.missoes['Frações']
+        missao.titulo = 'Números Decimais'
+        missao.save(update_fields=['titulo'])
+        self.assertEqual(self.buscar('decimais'), ['Números Decimais'])
+        self.assertEqual(self.buscar('fracoes denominadores'), ['Números Decimais'])
+
+
+# ==========================================
+# CATÁLOGOS EM CACHE
+# ==========================================
+
+class CatalogoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = Usuario.objects.create_user('professor', password='x', tipo='PROFESSOR')
+        cls.matematica = Disciplina.objects.create(nome='Matemática', icone='📐')
+        cls.turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=cls.professor)
+
+    def setUp(self):
+        cache.clear()
+        catalogo._em_memoria.clear()
+
+    def test_sem_consultas_sem_mudancas(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(catalogo.disciplinas(), [self.matematica])
+        with self.assertNumQueries(0):
+            self.assertEqual(catalogo.disciplinas(), [self.matematica])
+            self.assertEqual(catalogo.disciplina(self.matematica.pk), self.matematica)
+            self.assertIsNone(catalogo.disciplina(0))
+
+    def test_disciplina_salva_e_apagada(self):
+        catalogo.disciplinas()
+        ciencias = Disciplina.objects.create(nome='Ciências', icone='🔬')
+        self.assertEqual(catalogo.disciplinas(), [ciencias, self.matematica])
+
+        ciencias.nome = 'Zoologia'
+        ciencias.save()
+        self.assertEqual([d.nome for d in catalogo.disciplinas()], ['Matemática', 'Zoologia'])
+
+        ciencias.delete()
+        self.assertEqual(catalogo.disciplinas(), [self.matematica])
+
+    def test_turma_salva_e_apagada(self):
+        self.assertEqual(catalogo.turmas(), [self.turma])
+        turma_b = Turma.objects.create(nome='Turma B', serie='1º ano', ano_letivo=2026, professor=self.professor)
+        self.assertEqual(catalogo.turmas(), [self.turma, turma_b])
+
+        self.turma.delete()
+        self.assertEqual(catalogo.turmas(), [turma_b])
+
+    def test_badge_salva(self):
+        self.assertEqual(catalogo.badges_por_tipo()['MISSOES'], [])
+        badge = Badge.objects.create(nome='Primeira', descricao='x', icone='🏅', tipo='MISSOES', condicao_valor=1)
+        self.assertEqual(catalogo.badges_por_tipo()['MISSOES'], [badge])
+
+    def test_invalidado_por_outro_processo(self):
+        catalogo.disciplinas()
+        # Outro processo só muda a versão no cache compartilhado: a cópia em memória daqui fica velha
+        Disciplina.objects.filter(pk=self.matematica.pk).update(nome='Álgebra')
+        with self.assertNumQueries(0):
+            self.assertEqual(catalogo.disciplinas()[0].nome, 'Matemática')
+
+        cache.set(catalogo._chave_versao('disciplinas'), 'outra', timeout=None)
+        self.assertEqual(catalogo.disciplinas()[0].nome, 'Álgebra')
+
+    def test_cache_limpo(self):
+        catalogo.turmas()
+        cache.clear()
+        with self.assertNumQueries(1):
+            catalogo.turmas()
+
+
+# ==========================================
+# ANÁLISE DAS QUESTÕES
+# ==========================================
+
+class AnaliseItensTests(TestCase):
+    """
+    Cinco respostas a uma questão (correta: B). A nota de cada aluno nas
+    outras questões vem dos contadores: (total_acertos - acertou) / (total_questoes - 1).
+    """
+
+    # (resposta, total_questoes, total_acertos) -> nota sem a questão
+    RESPOSTAS = (
+        ('B', 5, 5),  # 1.0
+        ('B', 5, 4),  # 0.75
+        ('A', 5, 2),  # 0.5
+        ('C', 5, 1),  # 0.25
+        ('A', 1, 0),  # só respondeu esta: fora da discriminação
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        professor = Usuario.objects.create_user('professor', password='x', tipo='PROFESSOR')
+        cls.turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=professor)
+
+        def questao(titulo):
+            missao = Missao.objects.create(titulo=titulo, descricao='x', xp=10, turma=cls.turma, tipo='QUESTAO')
+            Alternativa.objects.bulk_create([
+                Alternativa(missao=missao, texto=f'Opção {ordem}', ordem=ordem, correta=ordem == 'B')
+                for ordem in 'ABCD'
+            ])
+            return missao
+
+        cls.questao = questao('Questão 1')
+        cls.facil = questao('Questão 2')
+        cls.sem_respostas = questao('Questão 3')
+
+        respostas = []
+        for i, (resposta, questoes, acertos) in enumerate(cls.RESPOSTAS):
+            aluno = Usuario.objects.create_user(
+                f'aluno{i}', password='x', tipo='ALUNO', total_questoes=questoes, total_acertos=acertos,
+            )
+            respostas.append(MissaoAluno(
+                aluno=aluno, missao=cls.questao, concluida=True,
+                resposta_escolhida=resposta, acertou=resposta == 'B',
+            ))
+            if i < 2:
+                respostas.append(MissaoAluno(
+                    aluno=aluno, missao=cls.facil, concluida=True, resposta_escolhida='B', acertou=True,
+                ))
+        # Atribuída e não respondida: não conta
+        respostas.append(MissaoAluno(aluno=aluno, missao=cls.sem_respostas))
+        MissaoAluno.objects.bulk_create(respostas)
+
+    def test_dificuldade_e_distribuicao(self):
+        analise = analisar_missao(self.questao)
+        self.assertEqual((analise.respondidas, analise.acertos), (5, 2))
+        self.assertEqual(analise.dificuldade, 0.4)
+        self.assertEqual(analise.distribuicao, {'A': 2, 'B': 2, 'C': 1, 'D': 0})
+        self.assertEqual(analise.percentuais(), {'A': 40, 'B': 40, 'C': 20, 'D': 0})
+
+    def test_discriminacao(self):
+        # Correlação de Pearson entre acertou (1, 1, 0, 0) e nota (1, .75, .5, .25)
+        self.assertAlmostEqual(analisar_missao(self.questao).discriminacao, 2 / sqrt(5))
+
+    def test_sem_variacao_ou_sem_respostas(self):
+        facil = analisar_missao(self.facil)
+        self.assertEqual(facil.dificuldade, 1.0)
+        self.assertIsNone(facil.discriminacao)
+
+        vazia = analisar_missao(self.sem_respostas)
+        self.assertEqual(vazia.respondidas, 0)
+        self.assertIsNone(vazia.dificuldade)
+        self.assertEqual(vazia.percentuais(), dict.fromkeys('ABCD', 0))
+
+    def test_turma_em_duas_consultas(self):
+        self.assertEqual(set(analisar_questoes(missao__turma=self.turma)), {self.questao.pk, self.facil.pk})
+        with self.assertNumQueries(2):
+            analises = analisar_turma(self.turma)
+        self.assertEqual([missao for missao, _ in analises], [self.sem_respostas, self.facil, self.questao])
+        self.assertEqual({missao.correta for missao, _ in analises}, {'B'})
+        self.assertEqual(analises[2][1].como_dict()['acertos'], 2)
+
+
+# ==========================================
+# MAPA DE CALOR
+# ==========================================
+
+class MapaCalorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        professor = Usuario.objects.create_user('professor', password='x', tipo='PROFESSOR')
+        cls.turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=professor)
+        ana, bia, caio, dani = (
+            Usuario.objects.create_user(nome, password='x', tipo='ALUNO')
+            for nome in ('ana', 'bia', 'caio', 'dani')
+        )
+        # dani saiu da turma, mas ainda tem as missões dela
+        cls.turma.alunos.add(caio, bia, ana)
+
+        cls.missoes = [
+            Missao.objects.create(titulo=f'Missão {i}', descricao='x', xp=10, turma=cls.turma, tipo=tipo)
+            for i, tipo in enumerate(('TAREFA', 'QUESTAO', 'QUESTAO'))
+        ]
+        tarefa, questao1, questao2 = cls.missoes
+        # Células sob medida no lugar das atribuições automáticas
+        MissaoAluno.objects.all().delete()
+        MissaoAluno.objects.bulk_create([
+            MissaoAluno(aluno=ana, missao=tarefa, concluida=True),
+            MissaoAluno(aluno=ana, missao=questao1, concluida=True, acertou=True),
+            MissaoAluno(aluno=ana, missao=questao2, concluida=True, acertou=False),
+            MissaoAluno(aluno=bia, missao=tarefa),
+            MissaoAluno(aluno=bia, missao=questao2, concluida=True, acertou=True),
+            MissaoAluno(aluno=dani, missao=tarefa, concluida=True),
+        ])
+
+    def test_bits_linha_a_linha(self):
+        # 3 × 5 = 15 bits em 2 bytes, bit menos significativo primeiro
+        matriz = MatrizBits(3, 5)
+        for celula in ((0, 0), (1, 2), (2, 4)):
+            matriz.marcar(*celula)
+
+        self.assertEqual(matriz.bits, bytearray([0b10000001, 0b01000000]))
+        self.assertEqual(matriz.base64(), 'gUA=')
+        self.assertTrue(matriz[1, 2])
+        self.assertFalse(matriz[2, 2])
+        self.assertEqual(MatrizBits(0, 0).base64(), '')
+
+    def test_celulas_e_totais(self):
+        with self.assertNumQueries(3):
+            mapa = mapa_conclusao(self.turma)
+
+        self.assertEqual([aluno['username'] for aluno in mapa['alunos']], ['ana', 'bia', 'caio'])
+        self.assertEqual([missao['id'] for missao in mapa['missoes']], [missao.pk for missao in self.missoes])
+        self.assertEqual((mapa['linhas'], mapa['colunas']), (3, 3))
+
+        # Células 0-2: ana, 3-5: bia, 6-8: caio
+        self.assertEqual(base64.b64decode(mapa['atribuidas']), bytes([0b00101111, 0]))
+        self.assertEqual(base64.b64decode(mapa['concluidas']), bytes([0b00100111, 0]))
+        self.assertEqual(base64.b64decode(mapa['acertos']), bytes([0b00100010, 0]))
+
+        self.assertEqual(mapa['concluidas_por_aluno'], [3, 1, 0])
+        self.assertEqual(mapa['concluidas_por_missao'], [1, 1, 2])
+
+
+# ==========================================
+# VIEWS ASSÍNCRONAS (ASGI)
+# ==========================================
+
+class HistoricoAsyncTests(DadosEscola):
+    """APIs de histórico chamadas como no ASGI (AsyncClient)"""
+
+    async def paginas(self, url, **filtros):
+        itens, cursor = [], None
+        while True:
+            response = await self.async_client.get(url, {**filtros, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            dados = response.json()
+            itens.extend(dados['missoes'])
+            if not dados['has_more']:
+                return itens, dados
+            cursor = dados['next']
+
+    async def test_api_historico_aluno(self):
+        await self.async_client.aforce_login(self.aluno)
+        itens, _ = await self.paginas(reverse('api_historico_aluno'))
+        esperado = await MissaoAluno.objects.filter(aluno=self.aluno).acount()
+        self.assertEqual(len({item['id'] for item in itens}), esperado)
+
+        response = await self.async_client.get(reverse('api_historico_aluno'), {'status': 'concluidas', 'total': '1'})
+        self.assertEqual(
+            response.json()['total'],
+            await MissaoAluno.objects.filter(aluno=self.aluno, concluida=True).acount(),
+        )
+
+    async def test_api_historico_professor(self):
+        await self.async_client.aforce_login(self.professor)
+        itens, dados = await self.paginas(reverse('api_historico_professor'), total='1')
+        self.assertEqual(len(itens), len(self.missoes))
+        self.assertEqual(dados['total'], len(self.missoes))
+        self.assertEqual(itens[0]['total_alunos'], self.ALUNOS)
+
+    async def test_busca_com_empates(self):
+        # Todas com a mesma relevância: o desempate por id não pode pular nem repetir linhas
+        empatadas = [
+            (await Missao.objects.acreate(
+                titulo='Frações equivalentes', descricao='Descrição', xp=10,
+                turma=self.turma, disciplina=self.disciplina, tipo='TAREFA',
+            )).pk
+            for _ in range(45)
+        ]
+        await self.async_client.aforce_login(self.professor)
+        itens, _ = await self.paginas(reverse('api_historico_professor'), busca='fracoes')
+        self.assertEqual(sorted(item['id'] for item in itens), empatadas)
+
+    async def test_cursor_invalido(self):
+        await self.async_client.aforce_login(self.aluno)
+        cursores = [
+            '???',
+            # Base64 válido com valores do tipo errado
+            codificar_cursor(['abc', 'x', 1]),
+            codificar_cursor([{'a': 1}, None, 1]),
+            codificar_cursor([None, '2026-01-01T00:00:00+00:00', 'um']),
+        ]
+        for cursor in cursores:
+            response = await self.async_client.get(reverse('api_historico_aluno'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, msg=cursor)
+
+    async def test_exige_login(self):
+        response = await self.async_client.get(reverse('api_historico_professor'))
+        self.assertEqual(response.status_code, 302)
+
+
+# ==========================================
+# FILA DE TAREFAS
+# ==========================================
+
+CHAMADAS_FILA = []
+
+
+@fila.tarefa('teste_fila')
+def tarefa_de_teste(valor=None, falhar=False):
+    CHAMADAS_FILA.append(valor)
+    if falhar:
+        raise RuntimeError('falhou')
+
+
+@override_settings(XP360_FILA_SINCRONA=False)
+class FilaTests(TestCase):
+
+    def setUp(self):
+        CHAMADAS_FILA.clear()
+
+    def test_chave_de_idempotencia(self):
+        primeiro = fila.enfileirar('teste_fila', {'valor': 1}, chave='teste:1')
+        self.assertIsNotNone(primeiro)
+        self.assertIsNone(fila.enfileirar('teste_fila', {'valor': 2}, chave='teste:1'))
+        self.assertIsNotNone(fila.enfileirar('teste_fila', {'valor': 3}, chave='teste:2'))
+        self.assertEqual(Job.objects.count(), 2)
+
+        # Concluído o job, a chave volta a valer
+        self.assertEqual(fila.processar(), 2)
+        self.assertEqual(sorted(CHAMADAS_FILA), [1, 3])
+        self.assertIsNotNone(fila.enfileirar('teste_fila', {'valor': 4}, chave='teste:1'))
+
+    def test_tarefa_nao_registrada(self):
+        with self.assertRaises(ValueError):
+            fila.enfileirar('nao_existe')
+
+    def test_atraso(self):
+        fila.enfileirar('teste_fila', {'valor': 1}, atraso=60)
+        self.assertEqual(fila.processar(), 0)
+        self.assertEqual(CHAMADAS_FILA, [])
+
+    def test_novas_tentativas_e_falha(self):
+        job = fila.enfileirar('teste_fila', {'valor': 1, 'falhar': True}, max_tentativas=3)
+
+        for tentativa in (1, 2):
+            antes = timezone.now()
+            self.assertEqual(fila.processar(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.tentativas), ('PENDENTE', tentativa))
+            self.assertIn('RuntimeError', job.erro)
+
+            # Backoff exponencial: 5 s, 10 s (mais até 25% de jitter)
+            espera = (job.executar_apos - antes).total_seconds()
+            base = fila.BACKOFF_BASE * 2 ** (tentativa - 1)
+            self.assertTrue(base <= espera <= base * 1.25 + 1, espera)
+
+            # Pronto para a próxima tentativa
+            Job.objects.filter(pk=job.pk).update(executar_apos=timezone.now())
+
+        self.assertEqual(fila.processar(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.tentativas), ('FALHOU', 3))
+        self.assertEqual(fila.processar(), 0)
+        self.assertEqual(CHAMADAS_FILA, [1, 1, 1])
+
+    def test_backoff_limitado(self):
+        self.assertLessEqual(fila.calcular_backoff(50), fila.BACKOFF_MAXIMO * 1.25)
+
+    def test_recuperar_travados(self):
+        morto = fila.enfileirar('teste_fila', {'valor': 1}, chave='teste:morto')
+        vivo = fila.enfileirar('teste_fila', {'valor': 2})
+        fila.reservar()
+
+        # O worker de `vivo` continua batendo; o de `morto` parou há 20 minutos
+        Job.objects.update(batimento_em=timezone.now() - timedelta(minutes=20), iniciado_em=F('batimento_em'))
+        self.assertEqual(fila.renovar([vivo.pk]), 1)
+
+        self.assertEqual(fila.recuperar_travados(timeout=600), 1)
+        self.assertEqual(Job.objects.get(pk=morto.pk).status, 'PENDENTE')
+        self.assertEqual(Job.objects.get(pk=vivo.pk).status, 'EXECUTANDO')
+
+        self.assertEqual(fila.processar(), 1)
+        self.assertEqual(CHAMADAS_FILA, [1])
+
+    def test_recuperar_com_chave_pendente(self):
+        # Travado enquanto outro job com a mesma chave já espera na fila
+        travado = fila.enfileirar('teste_fila', {'valor': 1}, chave='teste:1')
+        fila.reservar()
+        Job.objects.filter(pk=travado.pk).update(batimento_em=timezone.now() - timedelta(minutes=20))
+        fila.enfileirar('teste_fila', {'valor': 2}, chave='teste:1')
+
+        self.assertEqual(fila.recuperar_travados(timeout=600), 0)
+        self.assertEqual(Job.objects.get(pk=travado.pk).status, 'CONCLUIDO')
+        self.assertEqual(Job.objects.filter(status='PENDENTE').count(), 1)
+
+    @override_settings(XP360_FILA_SINCRONA=True)
+    def test_modo_sincrono(self):
+        self.assertIsNone(fila.enfileirar('teste_fila', {'valor': 1}, chave='teste:1'))
+        self.assertIsNone(fila.enfileirar('teste_fila', {'valor': 2}, chave='teste:1'))
+        self.assertEqual(CHAMADAS_FILA, [1, 2])
+        self.assertFalse(Job.objects.exists())
+
+        with self.assertRaises(RuntimeError):
+            fila.enfileirar('teste_fila', {'falhar': True})
+
+
+# ==========================================
+# MASSA DE DADOS E BENCHMARK
+# ==========================================
+
+@override_settings(XP360_FILA_SINCRONA=False)
+class MassaDadosTests(TestCase):
+    DIMENSOES = Dimensoes(
+        professores=2, turmas_por_professor=2, alunos=12,
+        turmas_por_aluno=2, missoes_por_turma=6, dias=10,
+    )
+
+    def historico(self):
+        return list(
+            MissaoAluno.objects.filter(aluno__username__startswith=PREFIXO)
+            .order_by('aluno__username', 'missao__titulo')
+            .values_list('aluno__username', 'missao__titulo', 'concluida', 'data_conclusao', 'acertou')
+        )
+
+    def test_mesma_semente_mesmos_dados(self):
+        criadas = gerar_escola(self.DIMENSOES, semente=7)
+        primeira = self.historico()
+        xp = dict(Usuario.objects.filter(username__startswith=PREFIXO).values_list('username', 'xp_total'))
+
+        limpar_escola()
+        self.assertEqual(gerar_escola(self.DIMENSOES, semente=7), criadas)
+        self.assertEqual(self.historico(), primeira)
+        self.assertEqual(
+            dict(Usuario.objects.filter(username__startswith=PREFIXO).values_list('username', 'xp_total')),
+            xp,
+        )
+        self.assertEqual(criadas['missoes_aluno'], len(primeira))
+
+    def test_consolidados_batem_com_o_extrato(self):
+        gerar_escola(self.DIMENSOES, semente=7)
+        alunos = list(Usuario.objects.filter(username__startswith=PREFIXO, tipo='ALUNO').values_list('pk', flat=True))
+        self.assertEqual(divergencias(alunos), [])
+
+    def test_benchmark_cobre_todas_as_urls(self):
+        gerar_escola(self.DIMENSOES, semente=7)
+        relatorio = benchmark.executar(repeticoes=1, aquecimento=0)
+
+        self.assertEqual(relatorio['sem_cenario'], [])
+        for nome, medida in relatorio['urls'].items():
+            self.assertLess(max(medida['status']), 500, msg=nome)
+
+        # Tudo roda em transações desfeitas: a massa continua igual
+        self.assertEqual(relatorio['massa'], benchmark.tamanho_massa())
+
+        self.assertEqual(benchmark.comparar(relatorio, relatorio), [])
+        pior = {'urls': {'login': {**relatorio['urls']['login'], 'consultas': 0}}}
+        self.assertEqual(len(benchmark.comparar(relatorio, pior)), 1)
+
+
+# ==========================================
+# RÉPLICA DE LEITURA
+# ==========================================
+
+@override_settings(XP360_FILA_SINCRONA=False, XP360_REPLICAS=['replica'])
+class ReplicasTests(TransactionTestCase):
+    """
+    Roteamento com dois aliases ('replica' espelha 'default' nos testes).
+    TransactionTestCase: a conexão da réplica só enxerga dados confirmados.
+    """
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.aluno = Usuario.objects.create_user('aluno', password='senha', tipo='ALUNO')
+        professor = Usuario.objects.create_user('professor', password='senha', tipo='PROFESSOR')
+        turma = Turma.objects.create(nome='Turma A', serie='1º ano', ano_letivo=2026, professor=professor)
+        Usuario.turmas_aluno.through.objects.create(usuario_id=self.aluno.pk, turma_id=turma.pk)
+        Missao.objects.create(titulo='Tarefa', descricao='x', xp=10, turma=turma, tipo='TAREFA')
+        distribuir_missoes()
+        self.missao_aluno = MissaoAluno.objects.get(aluno=self.aluno)
+        self.client.force_login(self.aluno)
+
+    def consultas_por_banco(self, url):
+        registros = {alias: RegistroConsultas() for alias in self.databases}
+        with ExitStack() as pilha:
+            for alias, registro in registros.items():
+                pilha.enter_context(connections[alias].execute_wrapper(registro))
+            response = self.client.get(url)
+        self.assertLess(response.status_code, 400)
+        return {alias: registro.total for alias, registro in registros.items()}
+
+    def test_historico_le_da_replica(self):
+        consultas = self.consultas_por_banco(reverse('historico_aluno'))
+        self.assertGreater(consultas['replica'], 0)
+
+    def test_api_async_le_da_replica(self):
+        consultas = self.consultas_por_banco(reverse('api_historico_aluno'))
+        self.assertGreater(consultas['replica'], 0)
+        self.assertEqual(consultas['default'], 2)  # só a sessão e o usuário (antes da view)
+
+    def test_dashboard_fica_no_primario(self):
+        consultas = self.consultas_por_banco(reverse('dashboard_aluno'))
+        self.assertEqual(consultas['replica'], 0)
+
+    def test_primario_depois_de_escrever(self):
+        self.consultas_por_banco(reverse('concluir_missao', args=[self.missao_aluno.pk]))
+        self.assertGreater(self.client.session[CHAVE_SESSAO], time.time())
+
+        # Dentro da janela o histórico já mostra a conclusão, lido do primário
+        consultas = self.consultas_por_banco(reverse('historico_aluno'))
+        self.assertEqual(consultas['replica'], 0)
+
+        # Depois da janela volta para a réplica
+        sessao = self.client.session
+        sessao[CHAVE_SESSAO] = time.time() - 1
+        sessao.save()
+        consultas = self.consultas_por_banco(reverse('historico_aluno'))
+        self.assertGreater(consultas['replica'], 0)
+
+    @override_settings(XP360_REPLICAS=[])
+    def test_sem_replicas(self):
+        consultas = self.consultas_por_banco(reverse('historico_aluno'))
+        self.assertEqual(consultas['replica'], 0)
@@ -15,4 +15,6 @@ urlpatterns = [
     path('historico/professor/', views.historico_professor, name='historico_professor'),
     path('api/historico/professor/', views.api_historico_professor, name='api_historico_professor'),
     path('missao/<int:missao_id>/detalhes/', views.detalhes_missao, name='detalhes_missao'),
+    path('api/turma/<int:turma_id>/analise-questoes/', views.api_analise_turma, name='api_analise_turma'),
+    path('api/turma/<int:turma_id>/mapa/', views.api_mapa_turma, name='api_mapa_turma'),
 ]
\ No newline at end of file
@@ -2,8 +2,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 import json
-from django.http import JsonResponse
-from django.db.models import Q
+import hmac
+from django.conf import settings
+from django.http import JsonResponse, Http404, HttpResponse
+from django.db.models import Q, Count
+from .paginacao import apaginar, atotal_em_cache, CursorInvalido
+from .busca import buscar_missoes, busca_ranqueada
+from .analise_itens import analisar_missao, analisar_turma
+from .mapa_calor import mapa_conclusao
+from . import catalogo, metricas as registro_metricas
+from .replicas import ler_da_replica
 
 # =============================
 # CRIAR MISSÃO
@@ -11,8 +19,7 @@ from django.db.models import Q
 @login_required
 def criar_missao(request):
     if request.method == "POST":
-        from .models import Turma, Missao, MissaoAluno, Disciplina, Alternativa
-        from accounts.models import Usuario
+        from .models import Turma, Missao, Disciplina, Alternativa
 
         # Dados básicos
         titulo = request.POST.get("titulo")
@@ -56,27 +63,22 @@ def criar_missao(request):
                     {'ordem': 'D', 'texto': alternativa_d},
                 ]
 
-                for alt_data in alternativas_data:
-                    Alternativa.objects.create(
+                Alternativa.objects.bulk_create([
+                    Alternativa(
                         missao=missao,
                         texto=alt_data['texto'],
                         ordem=alt_data['ordem'],
                         correta=(alt_data['ordem'] == resposta_correta)
                     )
+                    for alt_data in alternativas_data
+                ])
 
                 print(f"✅ QUESTÃO CRIADA: {missao.titulo} com 4 alternativas. Correta: {resposta_correta}")
             else:
                 print(f"✅ TAREFA CRIADA: {missao.titulo}")
 
-            # Atribuir a missão para todos os alunos da turma
-            alunos = Usuario.objects.filter(tipo="ALUNO", turma=turma)
-            for aluno in alunos:
-                MissaoAluno.objects.create(
-                    aluno=aluno,
-                    missao=missao
-                )
-
-            print(f"✅ Missão atribuída para {alunos.count()} alunos")
+            # A atribuição para os alunos da turma é feita pelo signal
+            # post_save de Missao (core.atribuicoes.distribuir_missoes)
 
         except Exception as e:
             print(f"❌ ERRO AO CRIAR MISSÃO: {e}")
@@ -91,65 +93,29 @@ def criar_missao(request):
 # =============================
 # CONCLUIR MISSÃO - VERSÃO UNIFICADA COM NOTIFICAÇÕES
 # =============================
+def _notificar_conclusao(request, resultado):
+    """Guarda na sessão os toasts de nível e streak exibidos no dashboard"""
+    # ⭐ Notificar se subiu de nível
+    if resultado.subiu_nivel:
+        request.session['nivel_novo'] = resultado.nivel
+    
+    # 🔥 Notificar sobre streak
+    streak = resultado.notificacao_streak()
+    if streak:
+        request.session['streak_info'] = json.dumps(streak)
+
+
 @login_required
 def concluir_missao(request, missao_aluno_id):
     from .models import MissaoAluno
-    from accounts.models import Usuario
-    from accounts.badges import verificar_e_conceder_badges
+    from .conclusao import concluir_missao_aluno
 
-    missao_aluno = get_object_or_404(
-        MissaoAluno,
-        id=missao_aluno_id,
-        aluno=request.user
-    )
+    try:
+        resultado = concluir_missao_aluno(request.user, missao_aluno_id)
+    except MissaoAluno.DoesNotExist:
+        raise Http404("Missão não encontrada")
 
-    if not missao_aluno.concluida:
-        usuario = request.user
-        
-        # 🎯 Guardar estado ANTES das mudanças
-        nivel_anterior = usuario.nivel
-        streak_anterior = usuario.streak_atual
-        
-        # Marcar como concluída
-        missao_aluno.concluida = True
-        missao_aluno.data_conclusao = timezone.now().date()
-        missao_aluno.save()
-
-        # Adicionar XP e verificar se subiu de nível
-        xp_ganho = missao_aluno.missao.xp
-        subiu_nivel = usuario.adicionar_xp(xp_ganho)
-        
-        # Atualizar streak
-        usuario.atualizar_streak_missao()
-        
-        # 🏆 VERIFICAR E CONCEDER BADGES
-        badges_novas = verificar_e_conceder_badges(usuario)
-        
-        # 🎉 PREPARAR NOTIFICAÇÕES
-        if badges_novas:
-            request.session['badges_novas'] = [
-                {'nome': badge.nome, 'icone': badge.icone} 
-                for badge in badges_novas
-            ]
-        
-        # ⭐ Notificar se subiu de nível
-        if subiu_nivel:
-            request.session['nivel_novo'] = usuario.nivel
-        
-        # 🔥 Notificar sobre streak
-        if usuario.streak_atual > streak_anterior:
-            # Streak aumentou
-            tipo_streak = 'novo_recorde' if usuario.streak_atual > usuario.melhor_streak else 'manteve'
-            request.session['streak_info'] = json.dumps({
-                'dias': usuario.streak_atual,
-                'tipo': tipo_streak
-            })
-        elif usuario.streak_atual == 0 and streak_anterior > 0:
-            # Streak quebrou
-            request.session['streak_info'] = json.dumps({
-                'dias': streak_anterior,
-                'tipo': 'perdeu'
-            })
+    _notificar_conclusao(request, resultado)
 
     return redirect("dashboard_aluno")
 
@@ -159,70 +125,28 @@ def concluir_missao(request, missao_aluno_id):
 # =============================
 @login_required
 def responder_questao(request, missao_aluno_id):
-    from .models import MissaoAluno, Alternativa
-    from accounts.badges import verificar_e_conceder_badges
-
-    missao_aluno = get_object_or_404(
-        MissaoAluno,
-        id=missao_aluno_id,
-        aluno=request.user
-    )
+    from .models import MissaoAluno
+    from .conclusao import concluir_missao_aluno
 
     if request.method == "POST":
-        usuario = request.user
-        
-        # 🎯 Guardar estado ANTES das mudanças
-        nivel_anterior = usuario.nivel
-        streak_anterior = usuario.streak_atual
-        
         resposta = request.POST.get("resposta")  # A, B, C ou D
         
-        # Buscar a alternativa correta
-        alternativa_correta = Alternativa.objects.get(
-            missao=missao_aluno.missao,
-            correta=True
-        )
+        # Corrige, dá XP e atualiza tudo em uma transação (clique duplo não dá XP duas vezes)
+        try:
+            resultado = concluir_missao_aluno(request.user, missao_aluno_id, resposta=resposta)
+        except MissaoAluno.DoesNotExist:
+            raise Http404("Missão não encontrada")
 
-        # Verificar se acertou
-        acertou = (resposta == alternativa_correta.ordem)
-
-        # Atualizar MissaoAluno
-        missao_aluno.resposta_escolhida = resposta
-        missao_aluno.acertou = acertou
-        missao_aluno.concluida = True
-        missao_aluno.data_conclusao = timezone.now().date()
-        missao_aluno.save()
-
-        # Dar XP e verificar badges APENAS se acertar
-        if acertou:
-            xp_ganho = missao_aluno.missao.xp
-            subiu_nivel = usuario.adicionar_xp(xp_ganho)
-            usuario.atualizar_streak_missao()
-            
-            # 🏆 VERIFICAR BADGES
-            badges_novas = verificar_e_conceder_badges(usuario)
-            
-            # 🎉 PREPARAR NOTIFICAÇÕES
-            if badges_novas:
-                request.session['badges_novas'] = [
-                    {'nome': badge.nome, 'icone': badge.icone} 
-                    for badge in badges_novas
-                ]
-            
-            # ⭐ Notificar se subiu de nível
-            if subiu_nivel:
-                request.session['nivel_novo'] = usuario.nivel
-            
-            # 🔥 Notificar sobre streak
-            if usuario.streak_atual > streak_anterior:
-                tipo_streak = 'novo_recorde' if usuario.streak_atual > usuario.melhor_streak else 'manteve'
-                request.session['streak_info'] = json.dumps({
-                    'dias': usuario.streak_atual,
-                    'tipo': tipo_streak
-                })
+        _notificar_conclusao(request, resultado)
 
         return redirect("dashboard_aluno")
 
+    missao_aluno = get_object_or_404(
+        MissaoAluno.objects.select_related('missao'),
+        id=missao_aluno_id,
+        aluno=request.user
+    )
+
     # GET: Mostrar a questão
     alternativas = missao_aluno.missao.alternativas.all().order_by('ordem')
     
@@ -237,9 +161,10 @@ def responder_questao(request, missao_aluno_id):
 
 
 @login_required
+@ler_da_replica
 def historico_aluno(request):
     """Página de histórico de missões do aluno"""
-    from .models import MissaoAluno, Disciplina
+    from .models import MissaoAluno
     
     # Buscar todas as missões do aluno (concluídas e pendentes)
     todas_missoes = MissaoAluno.objects.filter(
@@ -258,7 +183,7 @@ def historico_aluno(request):
     taxa_acerto = int((acertos / total_questoes * 100)) if total_questoes > 0 else 0
     
     # Disciplinas disponíveis para filtro
-    disciplinas = Disciplina.objects.all()
+    disciplinas = catalogo.disciplinas()
     
     context = {
         'titulo': 'Histórico de Missões',
@@ -278,10 +203,17 @@ def historico_aluno(request):
 # API: BUSCAR MISSÕES (AJAX)
 # =============================
 @login_required
-def api_historico_aluno(request):
-    """API para buscar missões do aluno com filtros"""
+@ler_da_replica
+async def api_historico_aluno(request):
+    """
+    API para buscar missões do aluno com filtros
+    Assíncrona: chamada a cada rolagem da página, não prende uma thread do
+    servidor ASGI enquanto espera o banco
+    """
     from .models import MissaoAluno
     
+    usuario = await request.auser()
+    
     # Parâmetros de filtro
     filtro_status = request.GET.get('status', 'todas')  # todas, concluidas, pendentes
     filtro_disciplina = request.GET.get('disciplina', '')
@@ -290,7 +222,7 @@ def api_historico_aluno(request):
     
     # Query base
     missoes = MissaoAluno.objects.filter(
-        aluno=request.user
+        aluno_id=usuario.pk
     ).select_related('missao', 'missao__disciplina', 'missao__turma')
     
     # Aplicar filtros
@@ -305,23 +237,22 @@ def api_historico_aluno(request):
     if filtro_tipo:
         missoes = missoes.filter(missao__tipo=filtro_tipo)
     
+    # Paginação por cursor: pendentes primeiro, depois as mais recentes
+    campos = ['data_conclusao', 'missao__data_criacao', 'id']
+    
     if busca:
-        missoes = missoes.filter(
-            Q(missao__titulo__icontains=busca) |
-            Q(missao__descricao__icontains=busca)
+        missoes = buscar_missoes(missoes, busca, prefixo='missao__')
+        if busca_ranqueada():
+            campos = ['relevancia', 'id']
+    
+    try:
+        missoes_page, proximo = await apaginar(
+            missoes,
+            campos,
+            cursor=request.GET.get('cursor'),
         )
-    
-    # Ordenar
-    missoes = missoes.order_by('-data_conclusao', '-missao__data_criacao')
-    
-    # Limitar resultados (paginação simples)
-    page = int(request.GET.get('page', 1))
-    per_page = 20
-    start = (page - 1) * per_page
-    end = start + per_page
-    
-    missoes_page = missoes[start:end]
-    has_more = missoes.count() > end
+    except CursorInvalido:
+        return JsonResponse({'erro': 'Cursor inválido'}, status=400)
     
     # Serializar dados
     data = []
@@ -346,20 +277,33 @@ def api_historico_aluno(request):
             'resposta_escolhida': m.resposta_escolhida if m.missao.tipo == 'QUESTAO' else None,
         })
     
-    return JsonResponse({
+    resposta = {
         'missoes': data,
-        'has_more': has_more,
-        'total': missoes.count(),
-    })
+        'has_more': proximo is not None,
+        'next': proximo,
+    }
+    
+    # O total só é calculado quando pedido (COUNT é caro em históricos grandes)
+    if request.GET.get('total') == '1':
+        resposta['total'] = await atotal_em_cache(missoes, 'historico_aluno', {
+            'usuario': usuario.pk,
+            'status': filtro_status,
+            'disciplina': filtro_disciplina,
+            'tipo': filtro_tipo,
+            'busca': busca,
+        })
+    
+    return JsonResponse(resposta)
 
 
 # =============================
 # HISTÓRICO DO PROFESSOR
 # =============================
 @login_required
+@ler_da_replica
 def historico_professor(request):
     """Página de histórico de missões criadas pelo professor"""
-    from .models import Missao, MissaoAluno, Disciplina
+    from .models import Missao, MissaoAluno
     
     # Buscar todas as missões criadas pelo professor
     turmas = request.user.turmas_professor.all()
@@ -384,7 +328,7 @@ def historico_professor(request):
     taxa_conclusao = int((total_conclusoes / total_atribuicoes * 100)) if total_atribuicoes > 0 else 0
     
     # Disciplinas
-    disciplinas = Disciplina.objects.all()
+    disciplinas = catalogo.disciplinas()
     
     context = {
         'titulo': 'Histórico de Missões Criadas',
@@ -403,9 +347,12 @@ def historico_professor(request):
 # API: MISSÕES DO PROFESSOR (AJAX)
 # =============================
 @login_required
-def api_historico_professor(request):
-    """API para buscar missões criadas pelo professor"""
-    from .models import Missao, MissaoAluno
+@ler_da_replica
+async def api_historico_professor(request):
+    """API para buscar missões criadas pelo professor (assíncrona, como api_historico_aluno)"""
+    from .models import Missao
+    
+    usuario = await request.auser()
     
     # Filtros
     filtro_turma = request.GET.get('turma', '')
@@ -414,8 +361,7 @@ def api_historico_professor(request):
     busca = request.GET.get('busca', '')
     
     # Query base
-    turmas = request.user.turmas_professor.all()
-    missoes = Missao.objects.filter(turma__in=turmas).select_related(
+    missoes = Missao.objects.filter(turma__professor_id=usuario.pk).select_related(
         'disciplina', 'turma'
     )
     
@@ -429,33 +375,42 @@ def api_historico_professor(request):
     if filtro_tipo:
         missoes = missoes.filter(tipo=filtro_tipo)
     
-    if busca:
-        missoes = missoes.filter(
-            Q(titulo__icontains=busca) |
-            Q(descricao__icontains=busca)
-        )
+    # Paginação por cursor: mais recentes primeiro
+    campos = ['data_criacao', 'id']
     
-    # Ordenar
-    missoes = missoes.order_by('-data_criacao')
-    
-    # Paginação
-    page = int(request.GET.get('page', 1))
-    per_page = 20
-    start = (page - 1) * per_page
-    end = start + per_page
+    if busca:
+        missoes = buscar_missoes(missoes, busca)
+        if busca_ranqueada():
+            campos = ['relevancia', 'id']
+    
+    # Totais de cada missão calculados na mesma consulta da página
+    concluida = Q(missaoaluno__concluida=True)
+    missoes_com_totais = missoes.annotate(
+        total_alunos=Count('missaoaluno'),
+        total_concluidas=Count('missaoaluno', filter=concluida),
+        total_acertos=Count('missaoaluno', filter=concluida & Q(missaoaluno__acertou=True)),
+    )
     
-    missoes_page = missoes[start:end]
-    has_more = missoes.count() > end
+    try:
+        missoes_page, proximo = await apaginar(
+            missoes_com_totais,
+            campos,
+            cursor=request.GET.get('cursor'),
+        )
+    except CursorInvalido:
+        return JsonResponse({'erro': 'Cursor inválido'}, status=400)
     
     # Serializar
     data = []
     for missao in missoes_page:
-        # Contar conclusões
-        atribuicoes = MissaoAluno.objects.filter(missao=missao)
-        total_alunos = atribuicoes.count()
-        concluidas = atribuicoes.filter(concluida=True).count()
+        total_alunos = missao.total_alunos
+        concluidas = missao.total_concluidas
         taxa = int((concluidas / total_alunos * 100)) if total_alunos > 0 else 0
         
+        taxa_acerto = None
+        if missao.tipo == 'QUESTAO':
+            taxa_acerto = int((missao.total_acertos / concluidas * 100)) if concluidas > 0 else 0
+        
         data.append({
             'id': missao.id,
             'titulo': missao.titulo,
@@ -473,19 +428,32 @@ def api_historico_professor(request):
             'total_alunos': total_alunos,
             'concluidas': concluidas,
             'taxa_conclusao': taxa,
+            'taxa_acerto': taxa_acerto,
         })
     
-    return JsonResponse({
+    resposta = {
         'missoes': data,
-        'has_more': has_more,
-        'total': missoes.count(),
-    })
+        'has_more': proximo is not None,
+        'next': proximo,
+    }
+    
+    if request.GET.get('total') == '1':
+        resposta['total'] = await atotal_em_cache(missoes, 'historico_professor', {
+            'usuario': usuario.pk,
+            'turma': filtro_turma,
+            'disciplina': filtro_disciplina,
+            'tipo': filtro_tipo,
+            'busca': busca,
+        })
+    
+    return JsonResponse(resposta)
 
 
 # =============================
 # DETALHES DA MISSÃO (PROFESSOR)
 # =============================
 @login_required
+@ler_da_replica
 def detalhes_missao(request, missao_id):
     """Ver quem completou uma missão específica"""
     from .models import Missao, MissaoAluno
@@ -501,19 +469,25 @@ def detalhes_missao(request, missao_id):
         missao=missao
     ).select_related('aluno').order_by('-concluida', 'aluno__username')
     
-    # Estatísticas
-    total_alunos = alunos_missao.count()
-    concluidas = alunos_missao.filter(concluida=True).count()
+    # Estatísticas (uma consulta)
+    totais = alunos_missao.aggregate(
+        total=Count('id'),
+        concluidas=Count('id', filter=Q(concluida=True)),
+    )
+    total_alunos = totais['total']
+    concluidas = totais['concluidas']
     pendentes = total_alunos - concluidas
     
-    # Se for questão, calcular taxa de acerto
+    # Se for questão: taxa de acerto, alternativas escolhidas, dificuldade e discriminação
     acertos = None
     taxa_acerto = None
+    analise = None
+    correta = None
     if missao.tipo == 'QUESTAO':
-        respondidas = alunos_missao.filter(concluida=True, missao__tipo='QUESTAO')
-        total_respondidas = respondidas.count()
-        acertos = respondidas.filter(acertou=True).count()
-        taxa_acerto = int((acertos / total_respondidas * 100)) if total_respondidas > 0 else 0
+        analise = analisar_missao(missao)
+        acertos = analise.acertos
+        taxa_acerto = int(analise.dificuldade * 100) if analise.respondidas else 0
+        correta = missao.alternativas.filter(correta=True).values_list('ordem', flat=True).first()
     
     context = {
         'titulo': f'Detalhes: {missao.titulo}',
@@ -524,6 +498,66 @@ def detalhes_missao(request, missao_id):
         'pendentes': pendentes,
         'acertos': acertos,
         'taxa_acerto': taxa_acerto,
+        'analise': analise,
+        'correta': correta,
     }
     
-    return render(request, 'core/detalhes_missao.html', context)
\ No newline at end of file
+    return render(request, 'core/detalhes_missao.html', context)
+
+
+# =============================
+# API: ANÁLISE DAS QUESTÕES DA TURMA (PROFESSOR)
+# =============================
+@login_required
+@ler_da_replica
+def api_analise_turma(request, turma_id):
+    """Distribuição das respostas, dificuldade e discriminação de todas as questões da turma"""
+    from .models import Turma
+    
+    turma = get_object_or_404(Turma, id=turma_id, professor=request.user)
+    
+    questoes = []
+    for missao, analise in analisar_turma(turma):
+        questoes.append({
+            **analise.como_dict(),
+            'titulo': missao.titulo,
+            'disciplina': missao.disciplina.nome if missao.disciplina else None,
+            'correta': missao.correta,
+            'data_criacao': missao.data_criacao.strftime('%d/%m/%Y'),
+        })
+    
+    return JsonResponse({
+        'turma': {'id': turma.id, 'nome': turma.nome},
+        'questoes': questoes,
+    })
+
+
+# =============================
+# API: MAPA DE CONCLUSÃO DA TURMA (PROFESSOR)
+# =============================
+@login_required
+@ler_da_replica
+def api_mapa_turma(request, turma_id):
+    """Alunos × missões da turma em matrizes de bits (base64), para o mapa de calor"""
+    from .models import Turma
+    
+    turma = get_object_or_404(Turma, id=turma_id, professor=request.user)
+    
+    return JsonResponse(mapa_conclusao(turma))
+
+
+# =============================
+# MÉTRICAS (PROMETHEUS)
+# =============================
+def metricas(request):
+    """Métricas de todos os processos no formato texto do Prometheus"""
+    token = getattr(settings, 'XP360_METRICAS_TOKEN', None)
+    if token:
+        recebido = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(recebido, f'Bearer {token}'):
+            return HttpResponse(status=403)
+
+    return HttpResponse(
+        registro_metricas.texto_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
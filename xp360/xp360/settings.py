@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'accounts',
     'core',
 ]
@@ -44,11 +46,14 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'accounts.Usuario'
 
 MIDDLEWARE = [
+    'core.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.orcamento.OrcamentoConsultasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.PrimarioAposEscritaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,6 +92,19 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura (core.replicas): históricos, ranking, conquistas e análises
+# leem dela. Sem XP360_REPLICA_HOST a réplica é o próprio banco principal, o que
+# permite testar o roteamento localmente com dois aliases.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': os.environ.get('XP360_REPLICA_HOST', DATABASES['default']['HOST']),
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['core.replicas.RoteadorReplicas']
+XP360_REPLICAS = ['replica']
+# Depois de gravar algo, o usuário lê só do primário por estes segundos
+XP360_JANELA_PRIMARIO = 15
+
 
 
 # Password validation
@@ -138,3 +156,30 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Fila de tarefas em segundo plano (core.fila)
+# Em modo síncrono as tarefas rodam dentro da própria requisição, o que é
+# prático em desenvolvimento. Em produção (DEBUG = False) os jobs ficam no
+# banco e são executados por `python manage.py run_xp360_worker`.
+XP360_FILA_SINCRONA = DEBUG
+
+
+# Orçamento de consultas por requisição (core.orcamento)
+# Requisições acima de qualquer limite são logadas em JSON no logger "xp360.consultas"
+XP360_ORCAMENTO_CONSULTAS = {
+    'CONSULTAS': 30,
+    'TEMPO_SQL_MS': 300,
+    'REPETICOES': 5,
+    'LENTAS': 5,
+}
+
+
+# Métricas no formato do Prometheus em /metrics (core.metricas)
+# Com vários processos (gunicorn, workers da fila) aponte XP360_METRICAS_DIR
+# para uma pasta compartilhada, esvaziada a cada deploy: cada processo grava
+# nela as suas métricas e /metrics soma todas. Sem a pasta, /metrics mostra
+# só o processo que atendeu. Com XP360_METRICAS_TOKEN, /metrics exige
+# o cabeçalho "Authorization: Bearer <token>".
+XP360_METRICAS_DIR = os.environ.get('XP360_METRICAS_DIR')
+XP360_METRICAS_TOKEN = os.environ.get('XP360_METRICAS_TOKEN')
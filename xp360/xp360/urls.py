@@ -2,11 +2,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from core import views as core_views
 
 urlpatterns = [
     path("accounts/", include("accounts.urls")),
     path("core/", include("core.urls")),
     path("admin/", admin.site.urls),
+    path("metrics", core_views.metricas, name="metricas"),
 ]
 
 # Servir arquivos estáticos em desenvolvimento